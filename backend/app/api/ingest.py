@@ -1,14 +1,41 @@
-from fastapi import APIRouter, UploadFile, File
-from app.ingestion.docx_ingest import ingest_docx
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import List
+from app.ingestion.jobs import submit_ingest_job, get_job
+from app.config import UPLOAD_CHUNK_SIZE
+import os
+import shutil
 import tempfile
-from app.weaviate_client.client import get_client
 
 router = APIRouter()
 
-@router.post("/ingest")
+def save_upload_to_temp(file: UploadFile):
+    """Stream an upload to a temp file in fixed-size chunks instead of reading it into memory."""
+    suffix = os.path.splitext(file.filename or "")[1] or ".docx"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        try:
+            shutil.copyfileobj(file.file, tmp, UPLOAD_CHUNK_SIZE)
+        except Exception:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+        return tmp.name
+
+def queue_upload(file: UploadFile):
+    tmp_path = save_upload_to_temp(file)
+    job = submit_ingest_job(tmp_path, file.filename)
+    return {"status": "queued", "job_id": job.id, "filename": file.filename}
+
+@router.post("/ingest", status_code=202)
 def ingest_docx_api(file: UploadFile = File(...)):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-        tmp.write(file.file.read())
-        tmp_path = tmp.name
-    ingest_docx(tmp_path)
-    return {"status": "success", "filename": file.filename} 
\ No newline at end of file
+    return queue_upload(file)
+
+@router.post("/ingest/batch", status_code=202)
+def ingest_docx_batch_api(files: List[UploadFile] = File(...)):
+    return {"status": "queued", "jobs": [queue_upload(f) for f in files]}
+
+@router.get("/ingest/{job_id}")
+def ingest_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return job.to_dict()
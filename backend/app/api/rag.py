@@ -1,38 +1,37 @@
-from fastapi import APIRouter, Query, Body
+from fastapi import APIRouter, Query, Body, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from app.weaviate_client.client import get_client
-from app.ollama.client import get_embedding, get_llm_completion
+from app.ollama.client import get_embedding, get_llm_completion, ChatSession, ProviderUnavailable
 from weaviate.collections.classes.filters import Filter
+from weaviate.classes.aggregate import GroupByAggregate
 import re
+import json
+import time
 from collections import Counter
-try:
-    from ragas import evaluate
-    from ragas.metrics import faithfulness, context_relevance, answer_relevance, answer_correctness, answer_completeness
-except ImportError:
-    evaluate = None
-import sqlite3
 from datetime import datetime
 from fastapi.responses import StreamingResponse, JSONResponse
 import csv
 import io
+import zlib
 from rapidfuzz import process as fuzz_process
-
-SEARCH_SYNONYMS = {
-    "expansion": ["expand", "growth", "client expansion", "expansion process", "process of expansion"],
-    "downsizing": ["downsize", "reduce", "client downsizing", "downsizing process", "process of downsizing"],
-    "closure": ["close", "account closure", "client closure", "closure process"],
-    # Add more as needed
-}
-
-def expand_keywords(query):
-    words = set(query.lower().split())
-    expansions = set([query])
-    for word in words:
-        if word in SEARCH_SYNONYMS:
-            expansions.update(SEARCH_SYNONYMS[word])
-    return list(expansions)
-
+from app.rag.agent_tools import AgentToolExecutor
+from app.rag.agent_actions import ACTION_FORMAT_HELP, REPAIR_PROMPT, parse_action
+from app.rag.agent_context import AgentContext
+from app.config import AGENT_DEADLINE_SECONDS
+from app.rag.context import pack_context
+from app.rag.evaluation import load_ragas, ragas_scores
+from app.rag.retrieval import section_search
+from app.profile_store import get_profile_store
+from app.feedback_store import get_feedback_store, TABLES as FEEDBACK_TABLES
+from app import metrics
+from app.log import truncate, debug_enabled
+import logging
+from app.rag.search import SECTION_PROPERTIES, filter_by_access, format_context
+from app.rag.expansion import get_query_expander
+from app.rag.chunk import Chunk, to_chunks, chunks_to_json
+
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 class QueryRequest(BaseModel):
@@ -42,34 +41,9 @@ class QueryRequest(BaseModel):
     top_k: int = 10
     department: Optional[str] = None
     sop: Optional[str] = None
+    trace: bool = False  # include per-stage timings and counters in the response
+    evaluate: bool = True  # score the answer with RAGAS inline (the batch evaluator turns this off)
 
-# --- Feedback DB setup ---
-FEEDBACK_DB = "rag_feedback.db"
-def init_feedback_db():
-    conn = sqlite3.connect(FEEDBACK_DB)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS feedback (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        question TEXT,
-        answer TEXT,
-        context TEXT,
-        rating INTEGER,
-        comments TEXT
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS evaluation (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        question TEXT,
-        answer TEXT,
-        context TEXT,
-        faithfulness REAL,
-        context_relevance REAL,
-        completeness REAL
-    )''')
-    conn.commit()
-    conn.close()
-init_feedback_db()
 
 class FeedbackRequest(BaseModel):
     question: str
@@ -80,24 +54,19 @@ class FeedbackRequest(BaseModel):
 
 @router.post("/feedback")
 async def rag_feedback(payload: FeedbackRequest):
-    conn = sqlite3.connect(FEEDBACK_DB)
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO feedback (timestamp, question, answer, context, rating, comments) VALUES (?, ?, ?, ?, ?, ?)",
-        (datetime.utcnow().isoformat(), payload.question, payload.answer, "\n".join(payload.context), payload.rating, payload.comments)
+    get_feedback_store().add_feedback(
+        timestamp=datetime.utcnow().isoformat(), question=payload.question, answer=payload.answer,
+        context="\n".join(payload.context), rating=payload.rating, comments=payload.comments
     )
-    conn.commit()
-    conn.close()
     return {"status": "ok"}
 
 # --- Modify /query to run evaluation and log ---
 @router.post("/query")
 async def rag_query(query: QueryRequest):
-    client = get_client()
+    search = section_search(get_client)
     user_ctx = get_user_context(query.user_id, query.profile)
     try:
-        section_collection = client.collections.get("Section")
-        print(f"[RAG] Running hybrid search for: {query.question}")
+        logger.info("Running hybrid search for: %s", truncate(query.question, 300))
         filter_expr = None
         if query.department:
             filter_expr = Filter.by_property("department").equal(query.department)
@@ -107,86 +76,47 @@ async def rag_query(query: QueryRequest):
 
         # 1. True hybrid search (alpha=0.5)
         query_vector = get_embedding(query.question)
-        results = section_collection.query.hybrid(
-            query=query.question,
-            vector=query_vector,
-            alpha=0.5,
-            limit=query.top_k,
-            filters=filter_expr,
-            return_properties=["title", "content", "section", "summary", "sop", "tags", "embedding", "department"]
-        )
-        candidates = [
-            {
-                "title": obj.properties.get("title"),
-                "content": obj.properties.get("content"),
-                "section": obj.properties.get("section"),
-                "summary": obj.properties.get("summary"),
-                "sop": obj.properties.get("sop"),
-                "tags": obj.properties.get("tags"),
-                "embedding": obj.properties.get("embedding"),
-                "score": getattr(obj.metadata, "score", None) if obj.metadata else None
-            }
-            for obj in results.objects
-        ]
-        candidates = filter_by_access(candidates, user_ctx)
-        # 2. Fallback: If no good results, try pure keyword search
-        if not candidates:
-            results = section_collection.query.hybrid(
+        with metrics.stage("retrieval.hybrid"):
+            results = search.hybrid(
                 query=query.question,
-                vector=None,
-                alpha=0.0,
+                vector=query_vector,
+                alpha=0.5,
                 limit=query.top_k,
                 filters=filter_expr,
-                return_properties=["title", "content", "section", "summary", "sop", "tags", "embedding", "department"]
+                return_properties=SECTION_PROPERTIES
             )
-            candidates = [
-                {
-                    "title": obj.properties.get("title"),
-                    "content": obj.properties.get("content"),
-                    "section": obj.properties.get("section"),
-                    "summary": obj.properties.get("summary"),
-                    "sop": obj.properties.get("sop"),
-                    "tags": obj.properties.get("tags"),
-                    "embedding": obj.properties.get("embedding"),
-                    "score": getattr(obj.metadata, "score", None) if obj.metadata else None
-                }
-                for obj in results.objects
-            ]
-            candidates = filter_by_access(candidates, user_ctx)
-        # 3. Fallback: If still no results, expand query with synonyms and merge
+        candidates = filter_by_access(to_chunks(results.objects), user_ctx)
+        # 2. Fallback: If no good results, try pure keyword search
         if not candidates:
-            expanded_queries = expand_keywords(query.question)
-            seen = set()
-            all_candidates = []
-            for q in expanded_queries:
-                results = section_collection.query.hybrid(
-                    query=q,
-                    vector=get_embedding(q),
-                    alpha=0.5,
+            with metrics.stage("retrieval.keyword"):
+                results = search.hybrid(
+                    query=query.question,
+                    vector=None,
+                    alpha=0.0,
                     limit=query.top_k,
                     filters=filter_expr,
-                    return_properties=["title", "content", "section", "summary", "sop", "tags", "embedding", "department"]
+                    return_properties=SECTION_PROPERTIES
                 )
-                for obj in results.objects:
-                    key = (obj.properties.get("title"), obj.properties.get("content"))
-                    if key not in seen:
-                        seen.add(key)
-                        all_candidates.append({
-                            "title": obj.properties.get("title"),
-                            "content": obj.properties.get("content"),
-                            "section": obj.properties.get("section"),
-                            "summary": obj.properties.get("summary"),
-                            "sop": obj.properties.get("sop"),
-                            "tags": obj.properties.get("tags"),
-                            "embedding": obj.properties.get("embedding"),
-                            "score": getattr(obj.metadata, "score", None) if obj.metadata else None
-                        })
-            candidates = filter_by_access(all_candidates, user_ctx)
-
-        print(f"[RAG] Hybrid search returned {len(candidates)} candidates after access control.")
-        print("[DEBUG] Top 3 retrieved chunks after access control:")
-        for i, c in enumerate(candidates[:3]):
-            print(f"[{i+1}] title: {c.get('title')}, content: {c.get('content')}")
+            candidates = filter_by_access(to_chunks(results.objects), user_ctx)
+        # 3. Fallback: If still no results, search once more with the synonym expansion
+        if not candidates:
+            expansion = get_query_expander().expand(query.question)
+            if expansion.phrases:
+                with metrics.stage("retrieval.expanded"):
+                    results = search.hybrid(
+                        query=expansion.text,
+                        vector=expansion.fuse(query_vector),
+                        alpha=0.5,
+                        limit=query.top_k,
+                        filters=filter_expr,
+                        return_properties=SECTION_PROPERTIES
+                    )
+                candidates = filter_by_access(to_chunks(results.objects), user_ctx)
+
+        logger.info("Hybrid search returned %d candidates after access control", len(candidates))
+        if debug_enabled(logger):
+            for i, c in enumerate(candidates[:3]):
+                logger.debug("Retrieved %d. %s | %s", i + 1, c.title, truncate(c.content, 200))
 
         # LLM-based reranking: rate each chunk for relevance
         def llm_rerank(query_text, chunks):
@@ -194,27 +124,34 @@ async def rag_query(query: QueryRequest):
             for c in chunks:
                 prompt = (
                     f"Rate the relevance of the following chunk to the user question on a scale of 1 (not relevant) to 5 (highly relevant).\n"
-                    f"Question: {query_text}\nChunk: {c['content']}\nRelevance (1-5):"
+                    f"Question: {query_text}\nChunk: {c.content}\nRelevance (1-5):"
                 )
-                try:
-                    score_str = get_llm_completion(prompt)
-                    score = int(re.search(r"[1-5]", score_str).group())
-                except Exception:
-                    score = 1
+                # Backend failures propagate (ProviderUnavailable -> 503) instead of looking like irrelevant chunks
+                score_str = get_llm_completion(prompt)
+                match = re.search(r"[1-5]", score_str)
+                if match is None:
+                    logger.debug("Unparseable rerank score %r, using 1", truncate(score_str, 100))
+                score = int(match.group()) if match else 1
                 scored.append((score, c))
             scored.sort(reverse=True, key=lambda x: x[0])
             return [c for score, c in scored]
 
-        reranked = llm_rerank(query.question, candidates)
-        print(f"[RAG] Reranked top 5 chunks:")
-        for i, c in enumerate(reranked[:5]):
-            print(f"[RAG] [RERANKED] {i+1}. {c['title']} | {c['content'][:120] if c['content'] else ''}")
-
-        # Use more top chunks for context (increase to 8)
-        context_chunks = reranked[:8]
-        context = "\n\n".join(f"[{c['title']}] {c['content']}" for c in context_chunks if c['content'])
-        first_chunk = context_chunks[0]["content"] if context_chunks and context_chunks[0].get("content") else ""
-        print(f"[RAG] Final context sent to LLM (first 500 chars):\n{context[:500]}")
+        with metrics.stage("rerank"):
+            reranked = llm_rerank(query.question, candidates)
+        if debug_enabled(logger):
+            for i, c in enumerate(reranked[:5]):
+                logger.debug("Reranked %d. %s | %s", i + 1, c.title, truncate(c.content or "", 120))
+
+        # Pack up to CONTEXT_MAX_CHUNKS chunks into the model's token budget (near-duplicates collapsed, parts merged)
+        with metrics.stage("pack_context"):
+            packed = pack_context(reranked)
+        context_chunks = packed.chunks
+        context = packed.text
+        logger.info("Packed context: %d chunks, %d tokens (%d saved, %d duplicates, %d parts merged)",
+                    packed.stats["packed_chunks"], packed.stats["tokens_after"], packed.stats["tokens_saved"],
+                    packed.stats["duplicates_collapsed"], packed.stats["parts_merged"])
+        if debug_enabled(logger):
+            logger.debug("Context sent to LLM: %s", truncate(context, 500))
         prompt = (
             "Based on the provided context below, answer the question as thoroughly, comprehensively, and in as much detail as possible. "
             "Use the FIRST context chunk as your primary source. Reproduce its structure, details, and stepwise instructions in full. Then, supplement with any additional relevant information from the remaining context. Do not omit important steps or details. "
@@ -222,8 +159,10 @@ async def rag_query(query: QueryRequest):
             "If the answer is not in the context, say 'Not found in knowledge base.'\n"
             f"Context:\n{context}\n\nQuestion: {query.question}\nAnswer:"
         )
-        llm_answer = get_llm_completion(prompt, max_tokens=2048)
-        print("[RAG] LLM raw output:", llm_answer)
+        with metrics.stage("generate"):
+            llm_answer = get_llm_completion(prompt, max_tokens=2048)
+        if debug_enabled(logger):
+            logger.debug("LLM answer: %s", truncate(llm_answer))
         # Add direct context answer for frontend
         direct_context_answer = context
 
@@ -231,40 +170,34 @@ async def rag_query(query: QueryRequest):
         summary_prompt = (
             f"Summarize the following context in detail for the user.\nContext:\n{context}"
         )
-        context_summary = get_llm_completion(summary_prompt, max_tokens=512)
+        with metrics.stage("summary"):
+            context_summary = get_llm_completion(summary_prompt, max_tokens=512)
 
         # --- Automated evaluation with RAGAS ---
         eval_metrics = None
-        if evaluate is not None:
-            eval_data = [{
-                "question": query.question,
-                "answer": llm_answer,
-                "contexts": [c["content"] for c in context_chunks if c["content"]]
-            }]
+        ragas = load_ragas() if query.evaluate else None
+        if ragas is not None:
             try:
-                results = evaluate(
-                    eval_data,
-                    metrics=[faithfulness, context_relevance, answer_completeness]
+                with metrics.stage("evaluation"):
+                    eval_metrics = ragas_scores(ragas, query.question, llm_answer, [c.content for c in context_chunks if c.content])
+                # Written behind by the feedback store's writer thread
+                get_feedback_store().add_evaluation(
+                    timestamp=datetime.utcnow().isoformat(), question=query.question, answer=llm_answer,
+                    context="\n".join([c.content for c in context_chunks if c.content]), **eval_metrics
                 )
-                eval_metrics = {
-                    "faithfulness": results[0]["faithfulness"],
-                    "context_relevance": results[0]["context_relevance"],
-                    "completeness": results[0]["answer_completeness"]
-                }
-                # Store in DB
-                conn = sqlite3.connect(FEEDBACK_DB)
-                c = conn.cursor()
-                c.execute(
-                    "INSERT INTO evaluation (timestamp, question, answer, context, faithfulness, context_relevance, completeness) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (datetime.utcnow().isoformat(), query.question, llm_answer, "\n".join([c["content"] for c in context_chunks if c["content"]]), eval_metrics["faithfulness"], eval_metrics["context_relevance"], eval_metrics["completeness"])
-                )
-                conn.commit()
-                conn.close()
             except Exception as e:
                 eval_metrics = {"error": str(e)}
         # Only include title/content in response context
-        response_context = [{"title": c["title"], "content": c["content"]} for c in context_chunks]
-        return {"answer": llm_answer, "context_summary": context_summary, "matches": response_context, "evaluation": eval_metrics, "direct_context_answer": direct_context_answer}
+        response_context = [{"title": c.title, "content": c.content} for c in context_chunks]
+        # The packed context is sent twice (answer and summary prompts)
+        metadata = {"context": packed.stats, "prompt_tokens_saved": packed.stats["tokens_saved"] * 2}
+        response = {"answer": llm_answer, "context_summary": context_summary, "matches": response_context, "evaluation": eval_metrics, "direct_context_answer": direct_context_answer, "metadata": metadata}
+        if query.trace and metrics.current_trace():
+            response["trace"] = metrics.current_trace().to_dict()
+        return response
+    except ProviderUnavailable as e:
+        logger.error("Query failed, model backends unavailable: %s", e)
+        return JSONResponse({"error": str(e)}, status_code=503)
     except Exception as e:
         return {"error": str(e)}
 
@@ -274,178 +207,222 @@ class AgenticQueryRequest(BaseModel):
     profile: Optional[Dict[str, Any]] = None
     top_k: int = 10
     max_steps: int = 5
-
-# --- Simple user context store (in-memory for demo) ---
-USER_PROFILES = {}
+    include_reasoning_summary: bool = True
+    trace: bool = False
 
 def get_user_context(user_id, profile):
-    if user_id:
-        if user_id in USER_PROFILES:
-            ctx = USER_PROFILES[user_id].copy()
-            if profile:
-                ctx.update(profile)
-            return ctx
-        else:
-            USER_PROFILES[user_id] = profile or {}
-            return USER_PROFILES[user_id]
-    return profile or {}
-
-# --- Access control utility ---
-def filter_by_access(chunks, user_ctx):
-    user_roles = set()
-    if user_ctx:
-        if isinstance(user_ctx.get("role"), list):
-            user_roles.update([r.lower() for r in user_ctx["role"]])
-        elif user_ctx.get("role"):
-            user_roles.add(user_ctx["role"].lower())
-    filtered = []
-    for c in chunks:
-        tags = c.get("tags")
-        # Patch: treat None or empty tags as public
-        if not tags:
-            filtered.append(c)
-            continue
-        if isinstance(tags, str):
-            tags = [t.strip().lower() for t in tags.split(",") if t.strip()]
-        elif isinstance(tags, list):
-            tags = [str(t).lower() for t in tags]
-        else:
-            tags = []
-        # If tags is now empty, treat as public
-        if not tags or user_roles.intersection(tags):
-            filtered.append(c)
-    return filtered
+    return get_profile_store().user_context(user_id, profile)
 
 # --- Agentic/Multi-hop RAG endpoint (with access control and more tools) ---
 @router.post("/agentic_query")
 async def agentic_query(payload: AgenticQueryRequest):
     user_ctx = get_user_context(payload.user_id, payload.profile)
-    question = payload.question
-    top_k = payload.top_k
-    max_steps = payload.max_steps
     steps = []
-    context_chunks = []
-    answer = None
+    tools = AgentToolExecutor(user_ctx, payload.top_k, timeout=AGENT_DEADLINE_SECONDS)
+    try:
+        final_answer, reasoning_summary, timed_out, usage = _run_agent_loop(
+            payload.question, user_ctx, payload.max_steps, tools, steps,
+            include_reasoning_summary=payload.include_reasoning_summary
+        )
+    except ProviderUnavailable as e:
+        logger.error("Agentic query failed, model backends unavailable: %s", e)
+        return JSONResponse({"error": str(e), "steps": _steps_json(steps)}, status_code=503)
+    finally:
+        tools.close()
+    response = {
+        "answer": final_answer,
+        "reasoning_summary": reasoning_summary,
+        "steps": _steps_json(steps),
+        "timed_out": timed_out,
+        "tool_cache_hits": tools.cache_hits,
+        "usage": usage
+    }
+    if payload.trace and metrics.current_trace():
+        response["trace"] = metrics.current_trace().to_dict()
+    return response
+
+@router.post("/agentic_query/stream")
+def agentic_query_stream(payload: AgenticQueryRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    """Stream the agent trace: one event per step as it completes, then the answer tokens,
+    the final answer, the optional reasoning summary and a closing 'done' event."""
+    user_ctx = get_user_context(payload.user_id, payload.profile)
+
+    def events():
+        tools = AgentToolExecutor(user_ctx, payload.top_k, timeout=AGENT_DEADLINE_SECONDS)
+        try:
+            for event in iter_agent_events(
+                payload.question, user_ctx, payload.max_steps, tools, [],
+                stream_answer=True, include_reasoning_summary=payload.include_reasoning_summary
+            ):
+                yield _format_event(event, format)
+        except Exception as e:
+            yield _format_event({"event": "error", "error": str(e)}, format)
+        finally:
+            tools.close()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+def _format_event(event, fmt):
+    data = json.dumps(event, default=str)
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+def _steps_json(steps):
+    """Agent steps with retrieved chunks in their JSON shape."""
+    return [dict(step, result=chunks_to_json(step["result"])) for step in steps]
+
+def _summarize_step_result(result):
+    """Short, client-friendly view of a step result for streamed events."""
+    if isinstance(result, list):
+        titles = [c.title if isinstance(c, Chunk) else str(c) for c in result]
+        return {"count": len(result), "items": titles[:5]}
+    text = str(result or "")
+    return text[:200] + ("..." if len(text) > 200 else "")
+
+def _step_event(index, step, elapsed):
+    return {
+        "event": "step",
+        "step": index,
+        "action": step["action"],
+        "input": step["input"],
+        "result_summary": _summarize_step_result(step["result"]),
+        "elapsed_ms": round(elapsed * 1000, 1),
+    }
+
+AGENT_SYSTEM_PROMPT = (
+    "You are an expert assistant with access to a knowledge base of Standard Operating Procedures (SOPs). "
+    "Your job is to answer user questions by searching, synthesizing, and summarizing information from the SOPs. "
+    "You can use the following tools: SEARCH (to find relevant SOP content), SUMMARIZE (to synthesize an answer), FINAL_ANSWER (to provide the final answer), LIST_SOPS (to list available SOPs), and GET_SOP_SECTION (to fetch a specific SOP section). "
+    "Always ground your answers in the provided SOP context. If the answer is not directly in the context, combine related information, reason step by step, and suggest best practices or next steps. "
+    "Do NOT just echo the search or say 'I could not find an answer.' "
+    "Be concise, assertive, and use bullet points or stepwise instructions when possible.\n"
+    "If you need to look up information, use SEARCH. Use LIST_SOPS to see available SOPs. Use GET_SOP_SECTION to fetch a specific SOP section. When ready, use FINAL_ANSWER.\n"
+    "Tool results are returned to you as 'Observation' messages. " + ACTION_FORMAT_HELP
+)
+
+def _run_agent_loop(question, user_ctx, max_steps, tools, steps, include_reasoning_summary=True):
+    """Run the agent to completion. Returns (answer, reasoning_summary, timed_out, usage)."""
+    final_answer = reasoning_summary = usage = None
+    timed_out = False
+    for event in iter_agent_events(question, user_ctx, max_steps, tools, steps, include_reasoning_summary=include_reasoning_summary):
+        if event["event"] == "answer":
+            final_answer = event["answer"]
+            timed_out = event["timed_out"]
+        elif event["event"] == "reasoning_summary":
+            reasoning_summary = event["reasoning_summary"]
+        elif event["event"] == "done":
+            usage = event["usage"]
+    return final_answer, reasoning_summary, timed_out, usage
+
+def _agent_usage(session, context, wasted_generations, repairs):
+    """Per-request LLM usage: calls, tokens actually prefilled, prompt size and wasted generations."""
+    return {
+        "llm_calls": session.calls,
+        "prefill_tokens": session.prompt_eval_tokens,
+        "completion_tokens": session.completion_tokens,
+        "max_prompt_tokens": context.max_prompt_tokens,
+        "prompt_budget_tokens": context.budget_tokens,
+        "compactions": context.compactions,
+        "compaction_passes": context.compaction_passes,
+        "repairs": repairs,
+        "wasted_generations": wasted_generations,
+    }
+
+def iter_agent_events(question, user_ctx, max_steps, tools, steps, stream_answer=False, include_reasoning_summary=True):
+    """Run the agent until FINAL_ANSWER, max_steps or the deadline, yielding events as it goes.
+
+    Events: 'step' after each tool action, 'answer_token' while the final answer
+    streams (stream_answer=True), 'answer', then 'reasoning_summary' (if
+    requested) and 'done' (with per-request usage). Completed steps are also
+    appended to `steps`.
+
+    All steps share one chat session: the instructions and earlier turns stay a
+    fixed prefix and each step only appends the latest observation, so the
+    prompt is prefilled once per request rather than once per step. The
+    session is kept under AGENT_PROMPT_BUDGET_TOKENS by compacting older
+    observations (see app.rag.agent_context).
+    """
+    session = ChatSession(AGENT_SYSTEM_PROMPT)
+    context = AgentContext(session)
+    message = f"Question: {question}\nStart with a SEARCH for the question."
     last_context_chunks = []
+    timed_out = False
+    wasted_generations = repairs = 0
+
     for step in range(max_steps):
-        # Build agent prompt with user question, context, and tool instructions
-        agent_prompt = (
-            "You are an expert assistant with access to a knowledge base of Standard Operating Procedures (SOPs). "
-            "Your job is to answer user questions by searching, synthesizing, and summarizing information from the SOPs. "
-            "You can use the following tools: SEARCH (to find relevant SOP content), SUMMARIZE (to synthesize an answer), FINAL_ANSWER (to provide the final answer), LIST_SOPS (to list available SOPs), and GET_SOP_SECTION (to fetch a specific SOP section). "
-            "Always ground your answers in the provided SOP context. If the answer is not directly in the context, combine related information, reason step by step, and suggest best practices or next steps. "
-            "Do NOT just echo the search or say 'I could not find an answer.' "
-            "Be concise, assertive, and use bullet points or stepwise instructions when possible.\n"
-            f"Question: {question}\n"
-            "You can issue actions in the following format:\n"
-            "SEARCH: <query>\nSUMMARIZE: <text>\nLIST_SOPS: <filter>\nGET_SOP_SECTION: <sop>, <section>\nFINAL_ANSWER: <answer>\n"
-            "If you need to look up information, use SEARCH. Use LIST_SOPS to see available SOPs. Use GET_SOP_SECTION to fetch a specific SOP section. When ready, use FINAL_ANSWER.\n"
-            f"First, SEARCH: {question}"
-        )
-        if step > 0 and last_context_chunks:
-            # For SUMMARIZE or FINAL_ANSWER, include context
-            context_str = "\n\n".join(f"[{c['title']}] {c['content']}" for c in last_context_chunks if c.get('content'))
-            agent_prompt += f"\n\nHere are the most relevant SOP sections I found:\n{context_str}\n"
-        llm_out = get_llm_completion(agent_prompt)
-        print(f"[AGENTIC] Step {step+1} LLM output:\n{llm_out}")
-        # Parse action
-        if llm_out.strip().startswith("SEARCH:"):
-            search_query = llm_out.strip()[7:].strip()
-            expanded_queries = expand_keywords(search_query)
-            client = get_client()
-            section_collection = client.collections.get("Section")
-            all_candidates = []
-            seen = set()
-            for q in expanded_queries:
-                hybrid_result = section_collection.query.hybrid(
-                    query=q,
-                    vector=get_embedding(q),
-                    limit=top_k,
-                    return_properties=["title", "content", "section", "summary", "sop", "tags", "embedding"]
-                )
-                for obj in hybrid_result.objects:
-                    key = (obj.properties.get("title"), obj.properties.get("content"))
-                    if key not in seen:
-                        seen.add(key)
-                        all_candidates.append({
-                            "title": obj.properties.get("title"),
-                            "content": obj.properties.get("content"),
-                            "section": obj.properties.get("section"),
-                            "summary": obj.properties.get("summary"),
-                            "sop": obj.properties.get("sop"),
-                            "tags": obj.properties.get("tags"),
-                            "embedding": obj.properties.get("embedding"),
-                            "score": getattr(obj.metadata, "score", None) if obj.metadata else None
-                        })
-            # --- Access control: filter by user_ctx ---
-            candidates = filter_by_access(all_candidates, user_ctx)
-            last_context_chunks = candidates[:top_k]
-            context_chunks = last_context_chunks
-            steps.append({"action": "SEARCH", "input": search_query, "result": context_chunks})
-        elif llm_out.strip().startswith("SUMMARIZE:"):
-            text = llm_out.strip()[10:].strip()
-            # Always include context in the summary prompt
-            context_str = "\n\n".join(f"[{c['title']}] {c['content']}" for c in last_context_chunks if c.get('content'))
-            summary_prompt = f"Based on the following context, summarize for the user (context: {user_ctx}):\n{context_str}\n\n{text}"
-            summary = get_llm_completion(summary_prompt)
-            steps.append({"action": "SUMMARIZE", "input": text, "result": summary})
-        elif llm_out.strip().startswith("LIST_SOPS:"):
-            filter_str = llm_out.strip()[10:].strip()
-            client = get_client()
-            section_collection = client.collections.get("Section")
-            # List unique SOPs, optionally filter by tag
-            query = {
-                "limit": 100,
-                "return_properties": ["sop", "tags"]
-            }
-            sops = set()
-            for obj in section_collection.query.hybrid(query=filter_str, vector=None, limit=100, return_properties=["sop", "tags"]).objects:
-                tags = obj.properties.get("tags") or []
-                if isinstance(tags, str):
-                    tags = [t.strip().lower() for t in tags.split(",") if t.strip()]
-                else:
-                    tags = [t.lower() for t in tags]
-                # Access control
-                if not tags or (user_ctx and user_ctx.get("role") and user_ctx["role"].lower() in tags):
-                    sops.add(obj.properties.get("sop"))
-            steps.append({"action": "LIST_SOPS", "input": filter_str, "result": list(sops)})
-        elif llm_out.strip().startswith("GET_SOP_SECTION:"):
-            args = llm_out.strip()[16:].strip().split(",")
-            sop = args[0].strip() if len(args) > 0 else None
-            section = args[1].strip() if len(args) > 1 else None
-            client = get_client()
-            section_collection = client.collections.get("Section")
-            # Query for the specific SOP and section
-            filter_query = f"sop == '{sop}' and section == '{section}'"
-            result = section_collection.query.hybrid(query=section, vector=get_embedding(section), limit=3, return_properties=["title", "content", "section", "summary", "sop", "tags"])
-            candidates = []
-            for obj in result.objects:
-                candidates.append({
-                    "title": obj.properties.get("title"),
-                    "content": obj.properties.get("content"),
-                    "section": obj.properties.get("section"),
-                    "summary": obj.properties.get("summary"),
-                    "sop": obj.properties.get("sop"),
-                    "tags": obj.properties.get("tags")
-                })
-            candidates = filter_by_access(candidates, user_ctx)
-            steps.append({"action": "GET_SOP_SECTION", "input": f"{sop}, {section}", "result": candidates})
-        elif llm_out.strip().startswith("FINAL_ANSWER:"):
-            # Always include context in the final answer prompt
-            context_str = "\n\n".join(f"[{c['title']}] {c['content']}" for c in last_context_chunks if c.get('content'))
-            final_prompt = f"Based on the following context, answer the user's question as thoroughly and in as much detail as possible.\n{context_str}\n\nQuestion: {question}\nAnswer:"
-            answer = get_llm_completion(final_prompt, max_tokens=2048)
+        if tools.expired():
+            logger.warning("Agent deadline reached before step %d, returning best answer so far", step + 1)
+            timed_out = True
+            break
+        started = time.perf_counter()
+        with metrics.stage("agent.llm"):
+            llm_out = context.send(message)
+        if debug_enabled(logger):
+            logger.debug("Agent step %d LLM output: %s", step + 1, truncate(llm_out, 500))
+        action = parse_action(llm_out)
+        if action is None:
+            # One repair retry; the unparseable generation is wasted either way
+            wasted_generations += 1
+            repairs += 1
+            metrics.AGENT_WASTED_GENERATIONS.inc()
+            with metrics.stage("agent.llm"):
+                llm_out = context.send(REPAIR_PROMPT)
+            action = parse_action(llm_out)
+        if action is None:
+            # Still no action: take the reply itself as the answer instead of paying for another completion
+            wasted_generations += 1
+            metrics.AGENT_WASTED_GENERATIONS.inc()
+            metrics.AGENT_STEPS.inc(action="FINAL_ANSWER")
+            answer = llm_out.strip()
+            if stream_answer and answer:
+                yield {"event": "answer_token", "token": answer}
             steps.append({"action": "FINAL_ANSWER", "input": question, "result": answer})
+            yield _step_event(step + 1, steps[-1], time.perf_counter() - started)
             break
+        metrics.AGENT_STEPS.inc(action=action.name)
+        if action.name == "SEARCH":
+            with metrics.stage("agent.search"):
+                last_context_chunks = tools.search(action.input)
+            steps.append({"action": "SEARCH", "input": action.input, "result": last_context_chunks})
+            message = context.observation("SEARCH results", last_context_chunks)
+        elif action.name == "SUMMARIZE":
+            # The retrieved context is already in the session
+            with metrics.stage("agent.summarize"):
+                summary = context.send(f"Based on the SOP sections above, summarize for the user (context: {user_ctx}):\n{action.input}")
+            steps.append({"action": "SUMMARIZE", "input": action.input, "result": summary})
+            message = "Observation: summary written. Next action?"
+        elif action.name == "LIST_SOPS":
+            with metrics.stage("agent.list_sops"):
+                sops = tools.list_sops(action.input)
+            steps.append({"action": "LIST_SOPS", "input": action.input, "result": sops})
+            message = context.observation("LIST_SOPS", text=", ".join(sops) or "No SOPs found.")
+        elif action.name == "GET_SOP_SECTION":
+            sop, section = action.input
+            with metrics.stage("agent.get_sop_section"):
+                candidates = tools.get_sop_section(sop, section)
+            steps.append({"action": "GET_SOP_SECTION", "input": f"{sop}, {section}", "result": candidates})
+            message = context.observation("GET_SOP_SECTION", candidates, text="Section not found.")
         else:
-            # Fallback: treat as answer, include context
-            context_str = "\n\n".join(f"[{c['title']}] {c['content']}" for c in last_context_chunks if c.get('content'))
-            final_prompt = f"Based on the following context, answer the user's question as accurately and concisely as possible.\n{context_str}\n\nQuestion: {question}\nAnswer:"
-            answer = get_llm_completion(final_prompt)
+            prompt = f"Based on the SOP sections above, answer the user's question as thoroughly and in as much detail as possible.\nQuestion: {question}\nAnswer:"
+            if stream_answer:
+                parts = []
+                answer_started = time.perf_counter()
+                for token in context.stream(prompt, max_tokens=2048):
+                    parts.append(token)
+                    yield {"event": "answer_token", "token": token}
+                metrics.STAGE_SECONDS.observe(time.perf_counter() - answer_started, stage="agent.answer")
+                answer = "".join(parts).strip()
+            else:
+                with metrics.stage("agent.answer"):
+                    answer = context.send(prompt, max_tokens=2048)
             steps.append({"action": "FINAL_ANSWER", "input": question, "result": answer})
+            yield _step_event(step + 1, steps[-1], time.perf_counter() - started)
             break
+        yield _step_event(step + 1, steps[-1], time.perf_counter() - started)
 
-    # After agent loop, extract the final answer and summarize reasoning
+    # After agent loop, extract the final answer
     final_answer = None
     for step in reversed(steps):
         if step['action'] == 'FINAL_ANSWER' and step['result']:
@@ -457,62 +434,159 @@ async def agentic_query(payload: AgenticQueryRequest):
             if step['action'] == 'SUMMARIZE' and step['result']:
                 final_answer = step['result']
                 break
-    if not final_answer:
-        final_answer = None
 
-    # Add a more detailed LLM-generated summary of the agent's reasoning
-    reasoning_text = '\n'.join(f"Step {i+1}: {s['action']} - {str(s['result'])[:200]}" for i, s in enumerate(steps))
-    summary_prompt = (
-        f"Summarize the following agent reasoning steps in detail for the user.\nSteps:\n{reasoning_text}"
-    )
-    reasoning_summary = get_llm_completion(summary_prompt, max_tokens=512)
+    if timed_out:
+        # Out of time: no further LLM calls, fall back to the retrieved context
+        if not final_answer and last_context_chunks:
+            final_answer = format_context(last_context_chunks[:3])
+        yield {"event": "answer", "answer": final_answer or "No answer found before the time limit, but see reasoning steps for details.", "timed_out": True}
+        yield {"event": "done", "steps": len(steps), "timed_out": True, "usage": _agent_usage(session, context, wasted_generations, repairs)}
+        return
+
+    def reasoning_summary_event():
+        # A more detailed LLM-generated summary of the agent's reasoning
+        reasoning_text = '\n'.join(f"Step {i+1}: {s['action']} - {str(chunks_to_json(s['result'], include_embedding=False))[:200]}" for i, s in enumerate(steps))
+        summary_prompt = (
+            f"Summarize the following agent reasoning steps in detail for the user.\nSteps:\n{reasoning_text}"
+        )
+        with metrics.stage("agent.reasoning_summary"):
+            return {"event": "reasoning_summary", "reasoning_summary": context.send(summary_prompt, max_tokens=512)}
 
-    # Backend fallback: always return a non-null, user-friendly answer
+    summary_event = None
     if not final_answer or not str(final_answer).strip():
-        if reasoning_summary and str(reasoning_summary).strip():
-            final_answer = reasoning_summary
-        elif steps and steps[0].get('result'):
-            # Fallback to the first step's result (usually a summary or context chunk)
-            chunk = steps[0]['result']
-            if isinstance(chunk, dict) and chunk.get('content'):
-                final_answer = chunk['content']
-            elif isinstance(chunk, str):
-                final_answer = chunk
+        # No answer from the agent: the reasoning summary (if requested) stands in for it
+        if include_reasoning_summary:
+            summary_event = reasoning_summary_event()
+            reasoning_summary = summary_event["reasoning_summary"]
+            if reasoning_summary and str(reasoning_summary).strip():
+                final_answer = reasoning_summary
+        # Backend fallback: always return a non-null, user-friendly answer
+        if not final_answer or not str(final_answer).strip():
+            if steps and steps[0].get('result'):
+                # Fallback to the first step's result (usually a summary or context chunk)
+                chunk = steps[0]['result']
+                if isinstance(chunk, dict) and chunk.get('content'):
+                    final_answer = chunk['content']
+                elif isinstance(chunk, str):
+                    final_answer = chunk
+                else:
+                    final_answer = "No answer found, but see reasoning steps for details."
             else:
                 final_answer = "No answer found, but see reasoning steps for details."
-        else:
-            final_answer = "No answer found, but see reasoning steps for details."
 
+    yield {"event": "answer", "answer": final_answer, "timed_out": False}
+    # The reasoning summary runs only after the answer has been delivered
+    if include_reasoning_summary:
+        yield summary_event or reasoning_summary_event()
+    usage = _agent_usage(session, context, wasted_generations, repairs)
+    logger.info("Agent finished: %d chat calls, %d prompt tokens prefilled, max prompt %d tokens, %d wasted generations",
+                usage["llm_calls"], usage["prefill_tokens"], usage["max_prompt_tokens"], usage["wasted_generations"])
+    yield {"event": "done", "steps": len(steps), "timed_out": False, "usage": usage}
+
+DEBUG_SECTIONS_PAGE_MAX = 1000
+DEBUG_SECTION_PROPERTIES = ["title", "content", "sop"]
+
+
+def _debug_section(obj, content_chars):
+    content = obj.properties.get("content")
     return {
-        "answer": final_answer,
-        "reasoning_summary": reasoning_summary,
-        "steps": steps
+        "uuid": str(obj.uuid),
+        "sop": obj.properties.get("sop"),
+        "title": obj.properties.get("title"),
+        "content": content[:content_chars] if content else "",
     }
 
+
+def _sop_section_counts(collection, sop=None):
+    """Sections per SOP from one server-side group-by aggregate."""
+    result = collection.aggregate.over_all(
+        group_by=GroupByAggregate(prop="sop"),
+        total_count=True,
+        filters=Filter.by_property("sop").equal(sop) if sop else None,
+    )
+    metrics.record_weaviate("aggregate")
+    return sorted(({"sop": g.grouped_by.value, "sections": g.total_count} for g in result.groups), key=lambda a: a["sop"] or "")
+
+
+def _sop_ids(collection, sop):
+    """Sorted UUIDs of one SOP's sections, from a cursor pass over the sop property."""
+    cache_size = 1000
+    seen = 0
+    ids = []
+    for obj in collection.iterator(return_properties=["sop"], cache_size=cache_size):
+        seen += 1
+        if obj.properties.get("sop") == sop:
+            ids.append(str(obj.uuid))
+    metrics.record_weaviate("iterator", seen // cache_size + 1)
+    return sorted(ids)
+
+
+def _stream_sections(client, sop, content_chars, aggregate):
+    """NDJSON over the whole collection via the cursor iterator; with aggregate, a final per-SOP summary line."""
+    totals = {}
+    cache_size = 500
+    seen = 0
+    try:
+        for obj in client.collections.get("Section").iterator(return_properties=DEBUG_SECTION_PROPERTIES, cache_size=cache_size):
+            seen += 1
+            props = obj.properties
+            if sop and props.get("sop") != sop:
+                continue
+            if aggregate:
+                entry = totals.setdefault(props.get("sop"), [0, 0])
+                entry[0] += 1
+                entry[1] += len(props.get("content") or "")
+            yield json.dumps(_debug_section(obj, content_chars), ensure_ascii=False) + "\n"
+        metrics.record_weaviate("iterator", seen // cache_size + 1)
+        if aggregate:
+            summary = [{"sop": name, "sections": n, "avg_content_length": round(chars / n, 1)}
+                       for name, (n, chars) in sorted(totals.items(), key=lambda item: item[0] or "")]
+            yield json.dumps({"aggregate": summary}, ensure_ascii=False) + "\n"
+    finally:
+        client.close()
+
+
 @router.get("/debug/sections")
-async def list_sections(sop: Optional[str] = None):
-    """List all section titles and first 200 chars of content for a given SOP (or all if not specified)."""
+def list_sections(
+    sop: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=DEBUG_SECTIONS_PAGE_MAX),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    aggregate: bool = False,
+    content_chars: int = Query(200, ge=0),
+):
+    """Audit the Section collection: section titles and the first `content_chars` of content, optionally for one SOP.
+
+    JSON pages follow Weaviate's UUID cursor: pass `next_after` back as `after`. format=ndjson streams
+    every section instead (constant memory). aggregate=true adds per-SOP section counts.
+    """
     client = get_client()
-    section_collection = client.collections.get("Section")
-    filters = None
-    if sop:
-        filters = Filter.by_property("sop").equal(sop)
-    results = section_collection.query.fetch_objects(
-        limit=200,
-        filters=filters,
-        return_properties=["title", "content", "sop"]
-    )
-    out = []
-    for obj in results.objects:
-        title = obj.properties.get("title")
-        content = obj.properties.get("content")
-        sop_title = obj.properties.get("sop")
-        out.append({
-            "sop": sop_title,
-            "title": title,
-            "content": content[:200] if content else ""
-        })
-    return {"sections": out}
+    if format == "ndjson":
+        return StreamingResponse(_stream_sections(client, sop, content_chars, aggregate), media_type="application/x-ndjson")
+    try:
+        collection = client.collections.get("Section")
+        if sop:
+            # Weaviate's cursor cannot be combined with filters: page over the SOP's IDs, read from the index itself
+            ids = [uid for uid in _sop_ids(collection, sop) if after is None or uid > after][:limit]
+            objects = []
+            if ids:
+                result = collection.query.fetch_objects(
+                    filters=Filter.by_id().contains_any(ids), limit=len(ids), return_properties=DEBUG_SECTION_PROPERTIES
+                )
+                objects = sorted(result.objects, key=lambda obj: str(obj.uuid))
+            # The cursor position is the page's last ID, even if that object was deleted in between
+            next_after = ids[-1] if len(ids) == limit else None
+        else:
+            result = collection.query.fetch_objects(after=after, limit=limit, return_properties=DEBUG_SECTION_PROPERTIES)
+            objects = result.objects
+            next_after = str(objects[-1].uuid) if len(objects) == limit else None
+        metrics.record_weaviate("fetch_objects")
+        response = {"sections": [_debug_section(obj, content_chars) for obj in objects], "next_after": next_after}
+        if aggregate:
+            response["sops"] = _sop_section_counts(collection, sop)
+        return response
+    finally:
+        client.close()
 
 def extract_keywords(text):
     stopwords = {"the", "is", "in", "at", "which", "on", "for", "a", "an", "to", "of", "and", "i", "what", "should", "with", "as", "by", "from", "this", "that", "it", "be", "or", "are", "was", "were", "but", "if", "so", "do", "does", "did", "can", "could", "would", "will", "shall", "may", "might", "must", "not", "have", "has", "had", "you", "your", "about", "into", "than", "then", "them", "they", "their", "there", "here", "how", "when", "where", "who", "whom", "why"}
@@ -525,75 +599,99 @@ class EvaluationRequest(BaseModel):
     context_chunks: List[str]
 
 @router.post("/evaluate")
-async def rag_evaluate(payload: EvaluationRequest):
-    if evaluate is None:
+def rag_evaluate(payload: EvaluationRequest):
+    ragas = load_ragas()
+    if ragas is None:
         return {"error": "RAGAS is not installed. Please run 'pip install ragas'"}
-    # Prepare RAGAS input
-    question = payload.question
-    answer = payload.answer
-    context = payload.context_chunks
-    # RAGAS expects a list of dicts
-    data = [{
-        "question": question,
-        "answer": answer,
-        "contexts": context
-    }]
-    # Evaluate
-    results = evaluate(
-        data,
-        metrics=[faithfulness, context_relevance, answer_completeness]
-    )
-    return {
-        "faithfulness": results[0]["faithfulness"],
-        "context_relevance": results[0]["context_relevance"],
-        "completeness": results[0]["answer_completeness"]
-    }
+    return ragas_scores(ragas, payload.question, payload.answer, payload.context_chunks)
 
 # --- Admin endpoints for feedback/evaluation logs ---
+# JSON views are keyset-paginated, newest first: pass the X-Next-After-Id
+# response header back as after_id for the next page. since/until filter on
+# the ISO timestamp (since inclusive, until exclusive). The CSV/NDJSON
+# exports stream the whole matching range in batches, optionally gzipped.
+
+ADMIN_PAGE_MAX = 1000
+
+
+def _check_timestamp(name, value):
+    if value:
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or timestamp")
+    return value
+
+
+def _admin_page(table, after_id, limit, since, until):
+    rows = get_feedback_store().page(
+        table, after_id=after_id, limit=limit,
+        since=_check_timestamp("since", since), until=_check_timestamp("until", until)
+    )
+    headers = {"X-Next-After-Id": str(rows[-1]["id"])} if len(rows) == limit else {}
+    return JSONResponse(rows, headers=headers)
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _export(table, fmt, after_id, since, until, gzip_output):
+    since, until = _check_timestamp("since", since), _check_timestamp("until", until)
+    columns = ["id"] + FEEDBACK_TABLES[table]
+    rows = get_feedback_store().iter_rows(table, after_id=after_id, since=since, until=until)
+
+    def csv_chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for i, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if i % 200 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def ndjson_chunks():
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+
+    chunks = csv_chunks() if fmt == "csv" else ndjson_chunks()
+    filename = f"{table}.{fmt}"
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    if gzip_output:
+        chunks, filename, media_type = _gzip_stream(chunks), filename + ".gz", "application/gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
 @router.get("/admin/feedback")
-def get_feedback():
-    conn = sqlite3.connect(FEEDBACK_DB)
-    c = conn.cursor()
-    c.execute("SELECT id, timestamp, question, answer, context, rating, comments FROM feedback ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    keys = ["id", "timestamp", "question", "answer", "context", "rating", "comments"]
-    return JSONResponse([{k: row[i] for i, k in enumerate(keys)} for row in rows])
+def get_feedback(after_id: Optional[int] = None, limit: int = Query(100, ge=1, le=ADMIN_PAGE_MAX),
+                 since: Optional[str] = None, until: Optional[str] = None):
+    return _admin_page("feedback", after_id, limit, since, until)
 
 @router.get("/admin/evaluation")
-def get_evaluation():
-    conn = sqlite3.connect(FEEDBACK_DB)
-    c = conn.cursor()
-    c.execute("SELECT id, timestamp, question, answer, context, faithfulness, context_relevance, completeness FROM evaluation ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    keys = ["id", "timestamp", "question", "answer", "context", "faithfulness", "context_relevance", "completeness"]
-    return JSONResponse([{k: row[i] for i, k in enumerate(keys)} for row in rows])
+def get_evaluation(after_id: Optional[int] = None, limit: int = Query(100, ge=1, le=ADMIN_PAGE_MAX),
+                   since: Optional[str] = None, until: Optional[str] = None):
+    return _admin_page("evaluation", after_id, limit, since, until)
 
 @router.get("/admin/feedback/csv")
-def download_feedback_csv():
-    conn = sqlite3.connect(FEEDBACK_DB)
-    c = conn.cursor()
-    c.execute("SELECT id, timestamp, question, answer, context, rating, comments FROM feedback ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["id", "timestamp", "question", "answer", "context", "rating", "comments"])
-    writer.writerows(rows)
-    output.seek(0)
-    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=feedback.csv"})
+def download_feedback_csv(after_id: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None, gzip: bool = False):
+    return _export("feedback", "csv", after_id, since, until, gzip)
 
 @router.get("/admin/evaluation/csv")
-def download_evaluation_csv():
-    conn = sqlite3.connect(FEEDBACK_DB)
-    c = conn.cursor()
-    c.execute("SELECT id, timestamp, question, answer, context, faithfulness, context_relevance, completeness FROM evaluation ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["id", "timestamp", "question", "answer", "context", "faithfulness", "context_relevance", "completeness"])
-    writer.writerows(rows)
-    output.seek(0)
-    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=evaluation.csv"}) 
\ No newline at end of file
+def download_evaluation_csv(after_id: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None, gzip: bool = False):
+    return _export("evaluation", "csv", after_id, since, until, gzip)
+
+@router.get("/admin/feedback/ndjson")
+def download_feedback_ndjson(after_id: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None, gzip: bool = False):
+    return _export("feedback", "ndjson", after_id, since, until, gzip)
+
+@router.get("/admin/evaluation/ndjson")
+def download_evaluation_ndjson(after_id: Optional[int] = None, since: Optional[str] = None, until: Optional[str] = None, gzip: bool = False):
+    return _export("evaluation", "ndjson", after_id, since, until, gzip) 
\ No newline at end of file
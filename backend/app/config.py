@@ -5,3 +5,81 @@ OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "nomic-embed-text")
 # LLM_MODEL = os.getenv("LLM_MODEL", "qwen3:14b")  # To use Qwen3-14B, uncomment this line and comment the next line
 LLM_MODEL = os.getenv("LLM_MODEL", "llama3")  # Default: llama3 (production baseline)
+
+# Model backend resilience (app/ollama/resilience.py)
+LLM_BACKEND_ORDER = os.getenv("LLM_BACKEND_ORDER", "openai,ollama")  # completion/chat failover order; openai is skipped without OPENAI_API_KEY
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3"))  # seconds to establish a connection
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # read timeout for generate/chat (between chunks when streaming)
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "30"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))  # retries per backend for transient errors (connection, timeout, 429/5xx)
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.2"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "2"))
+EMBED_HEDGE_DELAY = float(os.getenv("EMBED_HEDGE_DELAY", "0"))  # send a duplicate embedding request after this many seconds; 0 = off
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # consecutive failures that open a backend's circuit
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))  # open circuit waits this long before a probe call
+
+# Ingestion job queue
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_JOB_TTL = int(os.getenv("INGEST_JOB_TTL", "3600"))  # seconds to keep finished jobs queryable
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # bytes per streamed write
+
+# Chunking (token counts use TOKENIZER_ENCODING, falling back to a word/punctuation estimate)
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "300"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "450"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+
+# Semantic ingestion (LLM chunking/summaries)
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "2"))  # sustained LLM requests per second
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "4"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "4096"))
+
+# Query expansion (app/rag/expansion.py): synonym table as JSON {"term": ["synonym", ...]}, reloaded when the file changes
+SYNONYMS_FILE = os.getenv("SYNONYMS_FILE", os.path.join(os.path.dirname(__file__), "rag", "synonyms.json"))
+SYNONYMS_RELOAD_SECONDS = float(os.getenv("SYNONYMS_RELOAD_SECONDS", "5"))  # how often the file's mtime is checked
+EXPANSION_WEIGHT = float(os.getenv("EXPANSION_WEIGHT", "0.3"))  # share of the fused query vector given to matched synonyms
+
+# Agentic loop
+AGENT_DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", "90"))  # wall-clock budget across all steps
+AGENT_PROMPT_BUDGET_TOKENS = int(os.getenv("AGENT_PROMPT_BUDGET_TOKENS", "3000"))  # chat history kept under this; older observations get compacted
+AGENT_COMPACT_TARGET = float(os.getenv("AGENT_COMPACT_TARGET", "0.7"))  # share of the budget compaction frees down to, so it runs rarely
+
+# Answer-prompt context packing (token budget per model; CONTEXT_TOKEN_BUDGET overrides)
+CONTEXT_TOKEN_BUDGETS = {"llama3": 3000, "qwen3:14b": 6000, "gpt-4o-mini": 8000}
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0")) or None
+CONTEXT_MAX_CHUNKS = int(os.getenv("CONTEXT_MAX_CHUNKS", "8"))
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.95"))  # cosine at or above this collapses chunks
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_MAX_CHARS = int(os.getenv("LOG_MAX_CHARS", "2000"))  # longer messages are truncated
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))  # share of requests whose DEBUG records are kept
+
+# Retrieval backend for Section hybrid search: weaviate | local (in-process vector + BM25 index)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "weaviate")
+LOCAL_INDEX_SNAPSHOT = os.getenv("LOCAL_INDEX_SNAPSHOT", "")  # load the local index from this snapshot instead of syncing from Weaviate (standalone)
+
+# SOP catalog for the agent tools: rebuilt in the background once older than this (0 = only after ingestion jobs)
+CATALOG_MAX_AGE_SECONDS = float(os.getenv("CATALOG_MAX_AGE_SECONDS", "300"))
+
+# Background warm-up: failed attempts (e.g. Weaviate not up yet) retry with backoff capped at this many seconds
+STARTUP_RETRY_MAX_SECONDS = float(os.getenv("STARTUP_RETRY_MAX_SECONDS", "30"))
+
+# Feedback/evaluation store (SQLite, WAL, write-behind)
+FEEDBACK_DB = os.getenv("FEEDBACK_DB", "rag_feedback.db")
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "100"))  # max rows per transaction
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "0.5"))  # seconds a partial batch waits before committing
+FEEDBACK_QUEUE_MAX = int(os.getenv("FEEDBACK_QUEUE_MAX", "10000"))
+
+# Offline batch evaluation (python -m app.rag.batch_eval)
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "4"))  # questions answered at once
+EVAL_PROCESSES = int(os.getenv("EVAL_PROCESSES", "2"))  # RAGAS worker processes (0 scores in-process)
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "8"))  # answers per RAGAS evaluate() call
+
+# User profiles (SQLite shared by all workers, per-worker LRU/TTL cache)
+PROFILE_DB = os.getenv("PROFILE_DB", "user_profiles.db")
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "1024"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))  # seconds before a worker re-reads a profile
@@ -0,0 +1,264 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from app.config import FEEDBACK_DB, FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL, FEEDBACK_QUEUE_MAX
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Write-behind store for feedback and evaluation rows (FEEDBACK_DB) ---
+# Request handlers only enqueue; one writer thread drains the queue and
+# commits up to FEEDBACK_BATCH_SIZE rows per transaction, waiting at most
+# FEEDBACK_FLUSH_INTERVAL for a batch to fill. The database runs in WAL mode,
+# so the admin endpoints read without blocking the writer. The schema is
+# created on first use, and flush() / close() (called on shutdown and at
+# exit) commit everything queued so far.
+
+TABLES = {
+    "feedback": ["timestamp", "question", "answer", "context", "rating", "comments"],
+    "evaluation": ["timestamp", "question", "answer", "context", "faithfulness", "context_relevance", "completeness",
+                   "run_id", "config", "latency_ms", "stages_ms"],
+}
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        question TEXT,
+        answer TEXT,
+        context TEXT,
+        rating INTEGER,
+        comments TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS evaluation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        question TEXT,
+        answer TEXT,
+        context TEXT,
+        faithfulness REAL,
+        context_relevance REAL,
+        completeness REAL,
+        run_id TEXT,
+        config TEXT,
+        latency_ms REAL,
+        stages_ms TEXT
+    )''',
+    "CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_feedback_rating ON feedback (rating)",
+    "CREATE INDEX IF NOT EXISTS idx_evaluation_timestamp ON evaluation (timestamp)",
+]
+
+# Columns added after the first release, added in place to existing databases
+ADDED_COLUMNS = {
+    "evaluation": [("run_id", "TEXT"), ("config", "TEXT"), ("latency_ms", "REAL"), ("stages_ms", "TEXT")],
+}
+
+FEEDBACK_ROWS = metrics.REGISTRY.counter("feedback_store_rows_total", "Rows committed by the feedback store", ["table"])
+FEEDBACK_BATCH_ROWS = metrics.REGISTRY.histogram("feedback_store_batch_rows", "Rows per feedback store transaction", buckets=(1, 5, 10, 25, 50, 100, 250, 500))
+FEEDBACK_DROPPED = metrics.REGISTRY.counter("feedback_store_dropped_total", "Rows dropped (queue full or failed transaction)", ["table"])
+
+EXPORT_BATCH_ROWS = 500
+
+_STOP = object()
+
+
+class FeedbackStore:
+    def __init__(self, path=None, batch_size=None, flush_interval=None, queue_max=None):
+        self.path = path or FEEDBACK_DB
+        self.batch_size = batch_size or FEEDBACK_BATCH_SIZE
+        self.flush_interval = FEEDBACK_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._queue = queue.Queue(maxsize=queue_max or FEEDBACK_QUEUE_MAX)
+        self._writer = None
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _init_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            conn = sqlite3.connect(self.path)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                for table, columns in ADDED_COLUMNS.items():
+                    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                    for name, kind in columns:
+                        if name not in existing:
+                            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluation_run ON evaluation (run_id)")
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def connect(self, **kwargs):
+        """Read connection for admin queries (WAL: readers never block the writer)."""
+        self._init_schema()
+        return sqlite3.connect(self.path, **kwargs)
+
+    # --- Admin reads (newest first, keyset-paginated on id) ---
+
+    def _where(self, after_id=None, since=None, until=None):
+        clauses, params = [], []
+        if after_id is not None:
+            clauses.append("id < ?")
+            params.append(after_id)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def page(self, table, after_id=None, since=None, until=None, limit=100):
+        """Up to `limit` rows as dicts, newest first, starting below `after_id`; pass the last id back for the next page."""
+        columns = ["id"] + TABLES[table]
+        where, params = self._where(after_id, since, until)
+        with closing(self.connect()) as conn:
+            rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def iter_rows(self, table, after_id=None, since=None, until=None, batch_size=None):
+        """Every matching row as a tuple (id first), fetched in keyset batches so memory stays flat."""
+        columns = ["id"] + TABLES[table]
+        batch_size = batch_size or EXPORT_BATCH_ROWS
+        # Streaming responses advance the generator from worker threads, one at a time
+        with closing(self.connect(check_same_thread=False)) as conn:
+            while True:
+                where, params = self._where(after_id, since, until)
+                rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY id DESC LIMIT ?", params + [batch_size]).fetchall()
+                if not rows:
+                    return
+                yield from rows
+                after_id = rows[-1][0]
+
+    # --- Request path ---
+
+    def add(self, table, _replace_run=None, **values):
+        """Queue one row for `table`; never blocks (called from async handlers), drops the row when the queue is full."""
+        row = tuple(values.get(column) for column in TABLES[table])
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((table, row, _replace_run))
+        except queue.Full:
+            FEEDBACK_DROPPED.inc(table=table)
+            logger.error("Feedback store queue full, dropped a %s row", table)
+
+    def add_feedback(self, **values):
+        self.add("feedback", **values)
+
+    def add_evaluation(self, **values):
+        self.add("evaluation", **values)
+
+    def set_run_aggregate(self, run_id, **values):
+        """Queue the aggregate evaluation row (question NULL) of `run_id`, replacing any earlier one in the same transaction."""
+        self.add("evaluation", _replace_run=run_id, run_id=run_id, **dict(values, question=None))
+
+    # --- Writer thread ---
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        self._init_schema()
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while True:
+                item = self._queue.get()
+                batch, waiters, stop = [], [], False
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    # A flush request commits what is queued now instead of waiting for a full batch
+                    if stop or waiters or len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                self._commit(conn, batch)
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        if not batch:
+            return
+        by_table, aggregates = {}, {}
+        for table, row, replace_run in batch:
+            if replace_run is None:
+                by_table.setdefault(table, []).append(row)
+            else:
+                aggregates[(table, replace_run)] = row  # the latest one wins
+        for (table, _), row in aggregates.items():
+            by_table.setdefault(table, []).append(row)
+        try:
+            with conn:
+                for table, run_id in aggregates:
+                    conn.execute(f"DELETE FROM {table} WHERE run_id = ? AND question IS NULL", (run_id,))
+                for table, rows in by_table.items():
+                    columns = TABLES[table]
+                    conn.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+                    )
+        except sqlite3.Error as e:
+            logger.error("Feedback store transaction of %d rows failed: %s", len(batch), e)
+            for table, rows in by_table.items():
+                FEEDBACK_DROPPED.inc(len(rows), table=table)
+            return
+        FEEDBACK_BATCH_ROWS.observe(len(batch))
+        for table, rows in by_table.items():
+            FEEDBACK_ROWS.inc(len(rows), table=table)
+
+    def flush(self, timeout=10.0):
+        """Block until every row queued before this call is committed. Returns False on timeout."""
+        if self._writer is None or not self._writer.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        """Commit what is queued and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None and writer.is_alive():
+            self._queue.put(_STOP)
+            writer.join(timeout)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feedback_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeedbackStore()
+                atexit.register(_store.close)
+    return _store
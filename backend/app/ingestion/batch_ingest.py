@@ -1,16 +1,20 @@
+import logging
 import os
 from pathlib import Path
 from app.weaviate_client.client import get_client
 from app.ingestion.docx_ingest import ingest_docx
+from app.log import setup_logging
+
+logger = logging.getLogger(__name__)
 
 def clear_section_collection():
     client = get_client()
     if "Section" in client.collections.list_all().keys():
-        print("Dropping Section collection...")
+        logger.info("Dropping Section collection...")
         client.collections.delete("Section")
-        print("Section collection dropped.")
+        logger.info("Section collection dropped")
     else:
-        print("Section collection does not exist.")
+        logger.info("Section collection does not exist")
 
 def batch_ingest_all():
     base_dirs = ["Docs/BDM", "Docs/PreSales"]
@@ -18,12 +22,13 @@ def batch_ingest_all():
         for fname in os.listdir(base_dir):
             if fname.endswith(".docx"):
                 fpath = os.path.join(base_dir, fname)
-                print(f"Ingesting {fpath} ...")
+                logger.info("Ingesting %s ...", fpath)
                 ingest_docx(fpath)
-    print("Batch ingestion complete.")
+    logger.info("Batch ingestion complete")
 
 if __name__ == "__main__":
     import sys
+    setup_logging()
     if len(sys.argv) > 1 and sys.argv[1] == "clear":
         clear_section_collection()
     batch_ingest_all() 
\ No newline at end of file
@@ -0,0 +1,138 @@
+import logging
+import re
+from collections import namedtuple
+from app.config import CHUNK_TARGET_TOKENS, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+from app.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# --- Token-budgeted chunker ---
+# Packs sentences into chunks of roughly `target_tokens`, never more than
+# `max_tokens`, and repeats up to `overlap_tokens` worth of trailing sentences
+# at the start of the next chunk. Chunks always end on a sentence boundary
+# unless a single sentence is longer than `max_tokens`.
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?;])\s+")
+HISTOGRAM_BINS = (64, 128, 256, 512, 1024)
+
+_Unit = namedtuple("_Unit", ["text", "tokens", "para"])
+
+
+def split_sentences(text):
+    return [s for s in (p.strip() for p in SENTENCE_SPLIT_PATTERN.split(text)) if s]
+
+
+def _hard_split(sentence, max_tokens):
+    """Split an over-long sentence on word boundaries."""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for word in sentence.split():
+        n = count_tokens(word)
+        if current and current_tokens + n > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(word)
+        current_tokens += n
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _sentence_units(paragraphs, max_tokens):
+    for idx, para in enumerate(paragraphs):
+        for sentence in split_sentences(para):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield _Unit(sentence, tokens, idx)
+            else:
+                for piece in _hard_split(sentence, max_tokens):
+                    yield _Unit(piece, count_tokens(piece), idx)
+
+
+def _join(units):
+    parts = []
+    prev_para = None
+    for unit in units:
+        if prev_para is not None:
+            parts.append(" " if unit.para == prev_para else "\n")
+        parts.append(unit.text)
+        prev_para = unit.para
+    return "".join(parts)
+
+
+def _overlap_tail(units, overlap_tokens):
+    """Trailing whole sentences of a chunk that fit in the overlap budget (never the whole chunk)."""
+    tail = []
+    tokens = 0
+    for unit in reversed(units[1:]):
+        if tokens + unit.tokens > overlap_tokens:
+            break
+        tail.insert(0, unit)
+        tokens += unit.tokens
+    return tail
+
+
+def chunk_paragraphs(paragraphs, target_tokens=None, max_tokens=None, overlap_tokens=None):
+    """Group paragraphs into token-budgeted chunks. Returns a list of chunk strings."""
+    target_tokens = target_tokens or CHUNK_TARGET_TOKENS
+    max_tokens = max(max_tokens or CHUNK_MAX_TOKENS, target_tokens)
+    overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+
+    chunks = []  # (units, index of first non-overlap unit)
+    current = []
+    current_tokens = 0
+    fresh_start = 0
+    for unit in _sentence_units(paragraphs, max_tokens):
+        has_fresh = len(current) > fresh_start
+        if has_fresh and (current_tokens + unit.tokens > max_tokens or current_tokens >= target_tokens):
+            chunks.append((current, fresh_start))
+            current = _overlap_tail(current, overlap_tokens)
+            current_tokens = sum(u.tokens for u in current)
+            if current_tokens + unit.tokens > max_tokens:
+                current = []
+                current_tokens = 0
+            fresh_start = len(current)
+        current.append(unit)
+        current_tokens += unit.tokens
+    if len(current) > fresh_start:
+        chunks.append((current, fresh_start))
+
+    # Fold a small trailing remainder back into the previous chunk when it fits
+    if len(chunks) > 1:
+        last_units, last_fresh = chunks[-1]
+        prev_units, prev_fresh = chunks[-2]
+        fresh_units = last_units[last_fresh:]
+        fresh_tokens = sum(u.tokens for u in fresh_units)
+        if fresh_tokens < target_tokens // 4 and sum(u.tokens for u in prev_units) + fresh_tokens <= max_tokens:
+            chunks[-2] = (prev_units + fresh_units, prev_fresh)
+            chunks.pop()
+
+    return [_join(units) for units, _ in chunks]
+
+
+def token_histogram(sizes, bins=HISTOGRAM_BINS):
+    """Count chunk sizes per bin. Returns a list of (label, count)."""
+    counts = [0] * (len(bins) + 1)
+    for size in sizes:
+        for i, upper in enumerate(bins):
+            if size <= upper:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={upper}" for upper in bins] + [f">{bins[-1]}"]
+    return list(zip(labels, counts))
+
+
+def report_chunk_sizes(label, chunks):
+    """Log a token-size summary (and, at DEBUG, a histogram) for a list of chunk strings."""
+    sizes = [count_tokens(c) for c in chunks]
+    if not sizes:
+        logger.info("%s: no chunks", label)
+        return sizes
+    logger.info("%s: %d chunks, tokens min=%d avg=%d max=%d", label, len(sizes), min(sizes), sum(sizes) // len(sizes), max(sizes))
+    for bin_label, count in token_histogram(sizes):
+        logger.debug("  %6s %4d %s", bin_label, count, "#" * min(count, 50))
+    return sizes
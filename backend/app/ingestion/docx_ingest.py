@@ -1,8 +1,13 @@
-from docx import Document
+import logging
 from pathlib import Path
-import re
 from app.weaviate_client.client import get_client, create_schema
 from app.ollama.client import get_embedding
+from app.ingestion.docx_stream import iter_docx_blocks
+from app.ingestion.chunker import chunk_paragraphs, report_chunk_sizes
+from app import metrics
+from app.log import setup_logging, truncate, debug_enabled
+
+logger = logging.getLogger(__name__)
 
 DEPARTMENT_KEYWORDS = [
     "BDM", "Leasing", "Projects", "Facilities", "IT", "Sales", "Operations", "Marketing", "Finance", "Accounting"
@@ -58,6 +63,7 @@ def store_section_in_weaviate(section_data):
     # v4.x: Use collection API to insert
     # Before inserting into Weaviate, force tags to string
     section_data["tags"] = ",".join(section_data["tags"]) if isinstance(section_data["tags"], list) else str(section_data["tags"])
+    metrics.record_weaviate("insert")
     try:
         client.collections.get("Section").data.insert(
             properties={
@@ -69,8 +75,10 @@ def store_section_in_weaviate(section_data):
                 "department": section_data["department"]
             }
         )
+        return True
     except Exception as e:
-        print(f"Weaviate insert error: {e}")
+        logger.error("Weaviate insert error: %s", e)
+        return False
 
 def extract_tags(text):
     tags = []
@@ -79,68 +87,56 @@ def extract_tags(text):
             tags.append(dept)
     return tags
 
-def ingest_docx(docx_path):
-    print(f"[DEBUG] ingest_docx called with: {docx_path}")
-    doc = Document(docx_path)
+def split_section(header, content):
+    """Chunk a section's paragraphs by token budget; multi-chunk sections get '(Part n)' headers."""
+    chunks = chunk_paragraphs(content)
+    if len(chunks) <= 1:
+        return [{"header": header, "content": "\n".join(content)}]
+    return [{"header": f"{header} (Part {i+1})", "content": chunk} for i, chunk in enumerate(chunks)]
+
+def ingest_docx(docx_path, progress=None):
+    """Parse, embed and store a DOCX file. `progress(stage, count)` is called with 'parsed', 'embedded' and 'stored'."""
+    logger.info("Ingesting %s", docx_path)
     department = extract_department_from_path(docx_path)
     sop_title = Path(docx_path).stem
     sections = []
     current_section = None
     current_content = []
-    section_header_pattern = re.compile(r"^([A-Z][A-Za-z0-9\s\-]+):?$")
-    buffer_size = 4  # chunk size for long sections
+    all_blocks = []  # kept for the no-header fallback
     found_headers = False
 
-    # Automatically extract the first non-empty paragraph as 'Overview'
-    overview = None
-    for para in doc.paragraphs:
-        text = para.text.strip()
-        if text:
-            overview = text
-            break
-    if overview:
-        sections.append({"header": "Overview", "content": overview})
-
-    # Main section extraction
-    for para in doc.paragraphs:
-        text = para.text.strip()
-        if not text:
-            continue
-        if section_header_pattern.match(text):
+    # Single pass: the first non-empty paragraph becomes 'Overview', headings
+    # (heading styles or the header regex) open sections, and table rows are
+    # treated as section content.
+    for block in iter_docx_blocks(docx_path):
+        if not sections and block.kind != "table_row":
+            # Long opening paragraphs are capped to one chunk
+            sections.append({"header": "Overview", "content": chunk_paragraphs([block.text])[0]})
+        all_blocks.append(block.text)
+        if block.kind == "heading":
             found_headers = True
             if current_section:
-                # Chunk long sections
-                if len(current_content) > buffer_size:
-                    for i in range(0, len(current_content), buffer_size):
-                        chunk = current_content[i:i+buffer_size]
-                        chunk_header = f"{current_section} (Part {i//buffer_size+1})" if len(current_content) > buffer_size else current_section
-                        sections.append({"header": chunk_header, "content": "\n".join(chunk)})
-                else:
-                    sections.append({"header": current_section, "content": "\n".join(current_content)})
-            current_section = text.rstrip(":")
+                sections.extend(split_section(current_section, current_content))
+            current_section = block.text.rstrip(":")
             current_content = []
         else:
-            current_content.append(text)
+            current_content.append(block.text)
     if current_section:
-        if len(current_content) > buffer_size:
-            for i in range(0, len(current_content), buffer_size):
-                chunk = current_content[i:i+buffer_size]
-                chunk_header = f"{current_section} (Part {i//buffer_size+1})" if len(current_content) > buffer_size else current_section
-                sections.append({"header": chunk_header, "content": "\n".join(chunk)})
-        else:
-            sections.append({"header": current_section, "content": "\n".join(current_content)})
+        sections.extend(split_section(current_section, current_content))
 
     # If no headers found, treat every paragraph as a section
     if not found_headers:
-        print("[DEBUG] No headers found, extracting every paragraph as a section.")
-        for para in doc.paragraphs:
-            text = para.text.strip()
-            if text:
-                sections.append({"header": "Paragraph", "content": text})
+        logger.info("No headers found, extracting every paragraph as a section")
+        for chunk in chunk_paragraphs(all_blocks):
+            sections.append({"header": "Paragraph", "content": chunk})
 
-    print(f"[DEBUG] Number of sections extracted: {len(sections)}")
-    for sec in sections:
-        print(f"[DEBUG] Section: {sec['header']}\n{sec['content'][:200]}\n---")
+    logger.info("%s: %d sections extracted", sop_title, len(sections))
+    report_chunk_sizes(sop_title, [sec["content"] for sec in sections])
+    if debug_enabled(logger):
+        for sec in sections:
+            logger.debug("Section %s: %s", sec["header"], truncate(sec["content"], 200))
+    if progress:
+        progress("parsed", len(sections))
     client = get_client()
     create_schema(client)
     upsert_department(client, department)
@@ -148,8 +144,10 @@ def ingest_docx(docx_path):
     for sec in sections:
         if not sec["content"].strip():
             continue  # Skip empty sections
-        print(f"[DEBUG] Storing section: {sec['header']}")
+        logger.debug("Storing section: %s", sec["header"])
         embedding = get_embedding(sec["content"])
+        if progress:
+            progress("embedded")
         tags = extract_tags(sec["content"])
         section_obj = {
             "title": sec["header"],
@@ -159,10 +157,12 @@ def ingest_docx(docx_path):
             "tags": tags,
             "department": department
         }
-        store_section_in_weaviate(section_obj)
+        if store_section_in_weaviate(section_obj) and progress:
+            progress("stored")
 
 if __name__ == "__main__":
     import sys
+    setup_logging()
     if len(sys.argv) < 2:
         print("Usage: python3 app/ingestion/docx_ingest.py <path-to-docx>")
     else:
@@ -0,0 +1,126 @@
+import re
+import zipfile
+from collections import namedtuple
+from xml.etree.ElementTree import iterparse
+
+# --- Single-pass DOCX reader ---
+# Streams word/document.xml straight out of the zip instead of building the
+# python-docx object model, and emits body paragraphs, headings and table rows
+# in document order.
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+SECTION_HEADER_PATTERN = re.compile(r"^([A-Z][A-Za-z0-9\s\-]+):?$")
+HEADING_STYLE_PATTERN = re.compile(r"^(?:heading\s*(\d+)|title)$", re.IGNORECASE)
+
+# kind is 'heading', 'paragraph' or 'table_row'; level is the heading level
+# (0 for Title, None for regex-detected headings and non-headings)
+Block = namedtuple("Block", ["kind", "text", "level"])
+
+_P = W_NS + "p"
+_T = W_NS + "t"
+_TAB = W_NS + "tab"
+_BR = W_NS + "br"
+_CR = W_NS + "cr"
+_PSTYLE = W_NS + "pStyle"
+_TBL = W_NS + "tbl"
+_TR = W_NS + "tr"
+_TC = W_NS + "tc"
+_BODY = W_NS + "body"
+_VAL = W_NS + "val"
+_STYLE = W_NS + "style"
+_NAME = W_NS + "name"
+_STYLE_ID = W_NS + "styleId"
+
+
+def load_style_names(zf):
+    """Map style IDs to style names (IDs are localized/custom, names like 'heading 1' are stable)."""
+    try:
+        data = zf.open("word/styles.xml")
+    except KeyError:
+        return {}
+    names = {}
+    with data:
+        for _, elem in iterparse(data):
+            if elem.tag == _STYLE:
+                name = elem.find(_NAME)
+                if name is not None:
+                    names[elem.get(_STYLE_ID)] = name.get(_VAL)
+                elem.clear()
+    return names
+
+
+def heading_level(style_name):
+    if not style_name:
+        return None
+    match = HEADING_STYLE_PATTERN.match(style_name.strip())
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else 0
+
+
+def iter_docx_blocks(docx_path, header_pattern=SECTION_HEADER_PATTERN):
+    """Yield Block tuples for every non-empty paragraph and table row in document order."""
+    with zipfile.ZipFile(docx_path) as zf:
+        style_names = load_style_names(zf)
+        with zf.open("word/document.xml") as xml:
+            body = None
+            table_depth = 0
+            # Paragraphs can nest (text boxes), so keep one [parts, style] entry per open paragraph
+            paras = []
+            # One entry per open table: [cells of current row, paragraphs of current cell]
+            tables = []
+            for event, elem in iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == _BODY:
+                        body = elem
+                    elif tag == _TBL:
+                        table_depth += 1
+                        tables.append([[], []])
+                    elif tag == _P:
+                        paras.append([[], None])
+                    continue
+
+                if tag == _T:
+                    if elem.text and paras:
+                        paras[-1][0].append(elem.text)
+                elif tag == _TAB:
+                    if paras:
+                        paras[-1][0].append("\t")
+                elif tag in (_BR, _CR):
+                    if paras:
+                        paras[-1][0].append("\n")
+                elif tag == _PSTYLE:
+                    if paras:
+                        paras[-1][1] = elem.get(_VAL)
+                elif tag == _P:
+                    para_parts, para_style = paras.pop()
+                    text = "".join(para_parts).strip()
+                    if table_depth:
+                        if text:
+                            tables[-1][1].append(text)
+                    elif text:
+                        level = heading_level(style_names.get(para_style, para_style))
+                        if level is not None:
+                            yield Block("heading", text, level)
+                        elif header_pattern is not None and header_pattern.match(text):
+                            yield Block("heading", text, None)
+                        else:
+                            yield Block("paragraph", text, None)
+                elif tag == _TC:
+                    cells, cell_parts = tables[-1]
+                    cells.append(" ".join(cell_parts))
+                    tables[-1][1] = []
+                elif tag == _TR:
+                    cells = tables[-1][0]
+                    row_text = " | ".join(c for c in cells if c)
+                    tables[-1][0] = []
+                    if row_text:
+                        yield Block("table_row", row_text, None)
+                elif tag == _TBL:
+                    table_depth -= 1
+                    tables.pop()
+
+                # Drop finished top-level elements so memory stays flat on large files
+                if body is not None and not table_depth and not paras and tag in (_P, _TBL):
+                    del body[:]
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app.config import INGEST_WORKERS, INGEST_JOB_TTL
+from app.rag.catalog import get_catalog
+from app.rag.local_index import get_local_index
+from app.rag.retrieval import local_index_enabled
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Background ingestion jobs ---
+# Uploads are written to a temp file by the API and handed to this queue, so the
+# request returns immediately and ingestion runs on a small worker pool.
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class IngestJob:
+    def __init__(self, path, filename):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.filename = filename
+        self.status = "queued"
+        self.error = None
+        self.sections_parsed = 0
+        self.sections_embedded = 0
+        self.sections_stored = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def progress(self, stage, count=1):
+        """Progress callback passed to the ingest function ('parsed', 'embedded' or 'stored')."""
+        metrics.INGEST_SECTIONS.inc(count, stage=stage)
+        if stage == "parsed":
+            self.sections_parsed += count
+        elif stage == "embedded":
+            self.sections_embedded += count
+        elif stage == "stored":
+            self.sections_stored += count
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "sections_parsed": self.sections_parsed,
+            "sections_embedded": self.sections_embedded,
+            "sections_stored": self.sections_stored,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _default_ingest(path, progress=None):
+    # Resolved at call time so the ingest function can be swapped (e.g. in tests)
+    from app.ingestion import docx_ingest
+    return docx_ingest.ingest_docx(path, progress=progress)
+
+
+def _run_job(job, ingest_fn):
+    job.status = "running"
+    job.started_at = time.time()
+    metrics.INGEST_JOBS_RUNNING.inc()
+    try:
+        ingest_fn(job.path, progress=job.progress)
+        # New sections must be visible to LIST_SOPS / GET_SOP_SECTION (and local-index searches) before the job reports completion
+        get_catalog().refresh()
+        if local_index_enabled():
+            get_local_index().refresh()
+        job.status = "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        logger.exception("Ingest job %s (%s) failed: %s", job.id, job.filename, e)
+    finally:
+        job.finished_at = time.time()
+        metrics.INGEST_JOBS_RUNNING.dec()
+        metrics.INGEST_JOBS.inc(status=job.status)
+        metrics.INGEST_JOB_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+        try:
+            os.unlink(job.path)
+        except OSError:
+            pass
+
+
+def _prune_finished_jobs():
+    cutoff = time.time() - INGEST_JOB_TTL
+    with _jobs_lock:
+        expired = [jid for jid, job in _jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for jid in expired:
+            del _jobs[jid]
+
+
+def submit_ingest_job(path, filename, ingest_fn=None):
+    """Queue `path` for ingestion and return the job. The file is deleted once the job finishes."""
+    _prune_finished_jobs()
+    job = IngestJob(path, filename)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    _executor.submit(_run_job, job, ingest_fn or _default_ingest)
+    return job
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
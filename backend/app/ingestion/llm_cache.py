@@ -0,0 +1,43 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from app.config import LLM_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# --- On-disk cache for LLM ingestion results ---
+# Keyed by a hash of everything that determines the output (task, model,
+# prompt version, inputs), so re-running ingestion over unchanged documents
+# skips the LLM entirely.
+
+def cache_key(kind, *parts):
+    digest = hashlib.sha256(json.dumps([kind, *parts], ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{kind}/{digest[:2]}/{digest}"
+
+def _cache_path(key, cache_dir=None):
+    return os.path.join(cache_dir or LLM_CACHE_DIR, key + ".json")
+
+def cache_get(key, cache_dir=None):
+    try:
+        with open(_cache_path(key, cache_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def cache_put(key, value, cache_dir=None):
+    path = _cache_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so concurrent workers never read a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not write %s: %s", path, e)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
@@ -1,77 +1,151 @@
+import logging
 import os
 from pathlib import Path
-from docx import Document
+from concurrent.futures import ThreadPoolExecutor
 from app.weaviate_client.client import get_client
 from app.ollama.client import get_embedding, get_llm_completion
-import openai
-import time
+from app.ollama.ratelimit import TokenBucket
+from app.ingestion.docx_stream import iter_docx_blocks
+from app.ingestion.chunker import chunk_paragraphs, report_chunk_sizes
+from app.ingestion.llm_cache import cache_key, cache_get, cache_put
+from app.tokenizer import count_tokens
+from app import metrics
+from app.log import setup_logging, truncate
+from app.config import CHUNK_MAX_TOKENS, LLM_RATE_LIMIT, LLM_RATE_BURST, SUMMARY_CONCURRENCY, LLM_CONTEXT_TOKENS
+try:
+    import openai
+except ImportError:
+    openai = None
+
+logger = logging.getLogger(__name__)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 
+# Bump when the prompts change so cached results are not reused
+PROMPT_VERSION = "1"
+# The chunking answer restates its input, so a window gets half the context after the prompt overhead
+CHUNK_WINDOW_TOKENS = max(256, (LLM_CONTEXT_TOKENS - 256) // 2)
+
+# Shared across worker threads; replaces the fixed per-chunk sleep
+llm_rate_limiter = TokenBucket(LLM_RATE_LIMIT, LLM_RATE_BURST)
+
 # --- LLM chunking helper ---
-def llm_semantic_chunk(text, sop_title):
-    """Use LLM to split text into semantic, self-contained chunks."""
-    if OPENAI_API_KEY:
-        openai.api_key = OPENAI_API_KEY
-        prompt = (
-            f"Split the following SOP section into semantically meaningful, self-contained chunks (ideally 200-500 words each). "
-            f"Return a numbered list, each item being a chunk.\n\nSOP Title: {sop_title}\n\nText:\n{text}\n"
+def _llm_chunk_window(text, sop_title):
+    """Ask the LLM to chunk one window of text. Returns None when the LLM is unavailable or fails."""
+    prompt = (
+        f"Split the following SOP section into semantically meaningful, self-contained chunks (ideally 200-500 words each). "
+        f"Return a numbered list, each item being a chunk.\n\nSOP Title: {sop_title}\n\nText:\n{text}\n"
+    )
+    try:
+        llm_rate_limiter.acquire()
+        response = openai.ChatCompletion.create(
+            model=OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=2048,
         )
-        try:
-            response = openai.ChatCompletion.create(
-                model=OPENAI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                max_tokens=2048,
-            )
-            answer = response.choices[0].message["content"]
-            # Parse numbered list
-            chunks = []
-            for line in answer.split("\n"):
-                if line.strip().startswith(("1.", "2.", "3.", "4.", "5.", "6.", "7.", "8.", "9.", "10.")):
-                    chunk = line.split(".", 1)[-1].strip()
-                    if chunk:
-                        chunks.append(chunk)
+        answer = response.choices[0].message["content"]
+        # Parse numbered list
+        chunks = []
+        for line in answer.split("\n"):
+            if line.strip().startswith(("1.", "2.", "3.", "4.", "5.", "6.", "7.", "8.", "9.", "10.")):
+                chunk = line.split(".", 1)[-1].strip()
+                if chunk:
+                    chunks.append(chunk)
+        return chunks or None
+    except Exception as e:
+        logger.warning("LLM chunking failed (OpenAI): %s", e)
+        return None
+
+def split_into_windows(text, window_tokens=CHUNK_WINDOW_TOKENS):
+    """Split text on paragraph/sentence boundaries into pieces that fit the LLM context."""
+    if count_tokens(text) <= window_tokens:
+        return [text]
+    return chunk_paragraphs(text.split("\n"), target_tokens=window_tokens, max_tokens=window_tokens, overlap_tokens=0)
+
+def llm_semantic_chunk_window(text, sop_title):
+    if OPENAI_API_KEY and openai is not None:
+        openai.api_key = OPENAI_API_KEY
+        key = cache_key("chunk", OPENAI_MODEL, PROMPT_VERSION, sop_title, text)
+        chunks = cache_get(key)
+        if chunks is None:
+            chunks = _llm_chunk_window(text, sop_title)
             if chunks:
-                return chunks
-        except Exception as e:
-            print(f"[LLM Chunking] OpenAI error: {e}")
-    # Fallback: split by paragraphs
-    return [p.strip() for p in text.split("\n") if p.strip()]
+                cache_put(key, chunks)
+        if chunks:
+            return chunks
+    # Fallback: token-budgeted chunks over the paragraphs
+    return chunk_paragraphs(text.split("\n"))
+
+def llm_semantic_chunk(text, sop_title, executor=None):
+    """Use LLM to split text into semantic, self-contained chunks, one context-sized window at a time."""
+    windows = split_into_windows(text)
+    if len(windows) > 1:
+        logger.info("%s: document split into %d windows for LLM chunking", sop_title, len(windows))
+    if executor is not None and len(windows) > 1:
+        results = executor.map(lambda w: llm_semantic_chunk_window(w, sop_title), windows)
+    else:
+        results = (llm_semantic_chunk_window(w, sop_title) for w in windows)
+    return [chunk for window_chunks in results for chunk in window_chunks]
+
+def enforce_chunk_budget(chunks):
+    """Re-chunk any LLM-produced chunk that exceeds CHUNK_MAX_TOKENS."""
+    bounded = []
+    for chunk in chunks:
+        if count_tokens(chunk) > CHUNK_MAX_TOKENS:
+            bounded.extend(chunk_paragraphs(chunk.split("\n")))
+        else:
+            bounded.append(chunk)
+    return bounded
 
 # --- Metadata helper ---
+def _fallback_summary(chunk):
+    return chunk[:200] + ("..." if len(chunk) > 200 else "")
+
 def generate_summary(chunk, sop_title):
-    if OPENAI_API_KEY:
+    if OPENAI_API_KEY and openai is not None:
+        openai.api_key = OPENAI_API_KEY
+        key = cache_key("summary", OPENAI_MODEL, PROMPT_VERSION, sop_title, chunk)
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
         prompt = f"Summarize this SOP chunk in 1-2 sentences.\nSOP: {sop_title}\nChunk:\n{chunk}"
         try:
+            llm_rate_limiter.acquire()
             response = openai.ChatCompletion.create(
                 model=OPENAI_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.2,
                 max_tokens=128,
             )
-            return response.choices[0].message["content"].strip()
+            summary = response.choices[0].message["content"].strip()
+            cache_put(key, summary)
+            return summary
         except Exception as e:
-            print(f"[LLM Summary] OpenAI error: {e}")
-    return chunk[:200] + ("..." if len(chunk) > 200 else "")
+            logger.warning("LLM summary failed (OpenAI): %s", e)
+    return _fallback_summary(chunk)
+
+def _summarize_and_embed(chunk, sop_title):
+    return generate_summary(chunk, sop_title), get_embedding(chunk)
 
 # --- Main ingestion logic ---
 def ingest_docx_semantic(docx_path):
-    print(f"[Semantic Ingest] Processing: {docx_path}")
-    doc = Document(docx_path)
+    logger.info("Processing: %s", docx_path)
     sop_title = Path(docx_path).stem
     # Extract department from path (e.g., .../BDM/filename.docx)
     department = Path(docx_path).parent.name
     tags = department  # Use department as tag (string)
-    # Concatenate all paragraphs for LLM chunking
-    full_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
-    chunks = llm_semantic_chunk(full_text, sop_title)
+    # Concatenate all paragraphs and table rows for LLM chunking
+    full_text = "\n".join(block.text for block in iter_docx_blocks(docx_path))
+    with ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY, thread_name_prefix="semantic") as executor:
+        chunks = enforce_chunk_budget(llm_semantic_chunk(full_text, sop_title, executor=executor))
+        report_chunk_sizes(sop_title, chunks)
+        # Summaries and embeddings run concurrently; the shared rate limiter paces the LLM calls
+        enriched = list(executor.map(lambda c: _summarize_and_embed(c, sop_title), chunks))
     client = get_client()
     section_collection = client.collections.get("Section")
-    for idx, chunk in enumerate(chunks):
-        summary = generate_summary(chunk, sop_title)
-        embedding = get_embedding(chunk)
+    for idx, (chunk, (summary, embedding)) in enumerate(zip(chunks, enriched)):
         obj = {
             "title": sop_title,
             "section": f"Chunk {idx+1}",
@@ -84,27 +158,29 @@ def ingest_docx_semantic(docx_path):
         }
         # Force tags to string before insert
         obj["tags"] = ",".join(obj["tags"]) if isinstance(obj["tags"], list) else str(obj["tags"])
-        print(f"[DEBUG] Inserting object: {obj} (tags type: {type(obj['tags'])})")
+        # Never log obj itself: it carries the embedding vector
+        logger.debug("Inserting %s chunk %d (%d chars, tags=%r)", sop_title, idx + 1, len(chunk), obj["tags"])
+        metrics.record_weaviate("insert")
         try:
             section_collection.data.insert(obj)
-            print(f"[Semantic Ingest] Stored chunk {idx+1}: {summary[:80]}")
-            time.sleep(0.5)  # avoid rate limits
+            logger.info("Stored chunk %d: %s", idx + 1, truncate(summary, 80))
         except Exception as e:
-            print(f"[ERROR] Failed to insert object: {obj}\nException: {e}")
+            logger.error("Failed to insert %s chunk %d: %s", sop_title, idx + 1, e)
             break  # Stop further processing on error
 
 # --- Batch ingest ---
 def batch_ingest(directory):
     docx_files = list(Path(directory).glob('*.docx'))
-    print(f"[Semantic Ingest] Found {len(docx_files)} DOCX files in {directory}")
+    logger.info("Found %d DOCX files in %s", len(docx_files), directory)
     for docx_path in docx_files:
         try:
             ingest_docx_semantic(str(docx_path))
         except Exception as e:
-            print(f"[Semantic Ingest] Error processing {docx_path}: {e}")
+            logger.exception("Error processing %s: %s", docx_path, e)
 
 if __name__ == "__main__":
     import sys
+    setup_logging()
     if len(sys.argv) > 1:
         for arg in sys.argv[1:]:
             if Path(arg).is_file():
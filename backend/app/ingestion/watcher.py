@@ -1,8 +1,11 @@
+import logging
 import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 DOCS_DIR = Path(__file__).parent.parent.parent / "Docs"
 
 class DocxEventHandler(FileSystemEventHandler):
@@ -27,7 +30,7 @@ def start_watcher(ingest_callback):
     observer = Observer()
     observer.schedule(event_handler, str(DOCS_DIR), recursive=True)
     observer.start()
-    print(f"Watching {DOCS_DIR} for DOCX changes...")
+    logger.info("Watching %s for DOCX changes...", DOCS_DIR)
     try:
         while True:
             time.sleep(1)
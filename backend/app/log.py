@@ -0,0 +1,116 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from app.config import LOG_LEVEL, LOG_FORMAT, LOG_MAX_CHARS, LOG_DEBUG_SAMPLE_RATE
+
+# --- Structured, non-blocking logging ---
+# Modules log through logging.getLogger(__name__) (all under "app."). Records go
+# onto an in-memory queue and a background QueueListener does the actual
+# stream I/O, so request threads never block on stdout. Long messages are
+# truncated to LOG_MAX_CHARS, and DEBUG records emitted while serving a
+# request are kept only for a sampled fraction of requests
+# (LOG_DEBUG_SAMPLE_RATE), decided once per request so a sampled request
+# logs its whole trace. Tracebacks are formatted by the writer and never
+# truncated.
+
+_request_sampled = contextvars.ContextVar("log_request_sampled", default=None)
+_listener = None
+_queue_handler = None
+
+
+def truncate(value, limit=None):
+    """Shorten long payloads (chunks, prompts, LLM output) for logging."""
+    text = str(value)
+    limit = limit or LOG_MAX_CHARS
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def start_request_sampling(rate=None):
+    """Decide whether this request's DEBUG records are kept. Returns a token for end_request_sampling."""
+    rate = LOG_DEBUG_SAMPLE_RATE if rate is None else rate
+    return _request_sampled.set(random.random() < rate)
+
+
+def end_request_sampling(token):
+    _request_sampled.reset(token)
+
+
+def debug_enabled(logger):
+    """True if a DEBUG record from `logger` would be emitted; use to skip building expensive debug output."""
+    return logger.isEnabledFor(logging.DEBUG) and _request_sampled.get() is not False
+
+
+class _SamplingFilter(logging.Filter):
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _request_sampled.get() is not False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() folds the traceback into msg and clears exc_info;
+        # keep it so the writer's formatter renders it apart from the message
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+
+class _TruncatingFormatter(logging.Formatter):
+    def formatMessage(self, record):
+        record.message = truncate(record.message)
+        return super().formatMessage(record)
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    """Route the "app" logger through a queue to a background writer. Safe to call more than once."""
+    global _listener, _queue_handler
+    logger = logging.getLogger("app")
+    logger.setLevel((level or LOG_LEVEL).upper())
+    if _listener is not None:
+        return logger
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if (fmt or LOG_FORMAT) == "json":
+        handler.setFormatter(_JsonFormatter())
+    else:
+        handler.setFormatter(_TruncatingFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(log_queue)
+    # Filter before enqueueing: the sampling decision lives in the request's context
+    _queue_handler.addFilter(_SamplingFilter())
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger("app").removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = _queue_handler = None
+
+
+atexit.register(shutdown_logging)
@@ -1,25 +1,72 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from app import metrics
+from app.log import setup_logging, start_request_sampling, end_request_sampling
 from app.api.rag import router as rag_router
 from app.api.ingest import router as ingest_router
-from app.weaviate_client.client import get_client, create_schema
+from app.feedback_store import get_feedback_store
+from app.startup import readiness
+from app.rag.expansion import get_query_expander
 import os
 
-app = FastAPI(title="Departmental AI Knowledge Graph Backend")
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Schema check, SOP catalog and local index load in the background (see /ready),
+    # so the server accepts connections without waiting on Weaviate
+    readiness.start()
+    yield
+    readiness.stop()
+    get_query_expander().stop()
+    # Commit queued feedback/evaluation rows before the process exits
+    get_feedback_store().close()
+
+app = FastAPI(title="Departmental AI Knowledge Graph Backend", lifespan=lifespan)
 
 # Serve static files for the web UI
 directory = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
 app.mount("/static", StaticFiles(directory=directory), name="static")
 
-@app.on_event("startup")
-def startup_event():
-    client = get_client()
-    create_schema(client)
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Trace every request: stage timings go to the Server-Timing header and Prometheus;
+    DEBUG logging is sampled per request."""
+    trace, token = metrics.start_trace()
+    sampling_token = start_request_sampling()
+    request.state.trace = trace
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request_sampling(sampling_token)
+        metrics.end_trace(token)
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code
+    )
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 def health_check():
+    """Liveness: the process is up and serving requests."""
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready_check():
+    """Readiness: 503 until the background warm-up has finished."""
+    return JSONResponse(readiness.to_dict(), status_code=200 if readiness.ready else 503)
+
 # Placeholder: include routers for ingestion, RAG, etc. in the future
 app.include_router(rag_router, prefix="/rag")
 app.include_router(ingest_router, prefix="/api")
@@ -0,0 +1,270 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Instrumentation: Prometheus metrics + per-request traces ---
+# A small in-process registry rendered in the Prometheus text format at
+# /metrics (no client library needed). stage() times a block into the
+# rag_stage_seconds histogram and, when a request trace is active (set by the
+# HTTP middleware in app.main), into that trace too; the trace feeds the
+# Server-Timing header and the optional "trace" field in JSON responses.
+# Worker threads do not inherit the trace unless submitted via
+# contextvars.copy_context().run.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return series["count"] if series else 0
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, series["counts"]):
+            cumulative += n
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {series['sum']!r}")
+        lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP request latency", ["method", "route", "status"])
+STAGE_SECONDS = REGISTRY.histogram("rag_stage_seconds", "Latency of pipeline stages (embedding, retrieval, rerank, generation, ...)", ["stage"])
+LLM_REQUESTS = REGISTRY.counter("llm_requests_total", "LLM requests", ["endpoint"])
+LLM_REQUEST_SECONDS = REGISTRY.histogram("llm_request_seconds", "LLM request latency", ["endpoint"])
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "LLM tokens (prompt = tokens prefilled by the server)", ["endpoint", "kind"])
+EMBEDDING_REQUESTS = REGISTRY.counter("embedding_requests_total", "Embedding requests")
+WEAVIATE_REQUESTS = REGISTRY.counter("weaviate_requests_total", "Weaviate round trips", ["operation"])
+INGEST_SECTIONS = REGISTRY.counter("ingest_sections_total", "Sections processed by ingestion jobs", ["stage"])
+INGEST_JOBS = REGISTRY.counter("ingest_jobs_total", "Finished ingestion jobs", ["status"])
+INGEST_JOB_SECONDS = REGISTRY.histogram("ingest_job_seconds", "Ingestion job duration", ["status"])
+INGEST_JOBS_RUNNING = REGISTRY.gauge("ingest_jobs_running", "Ingestion jobs currently running")
+AGENT_STEPS = REGISTRY.counter("agent_steps_total", "Agentic loop steps", ["action"])
+AGENT_WASTED_GENERATIONS = REGISTRY.counter("agent_wasted_generations_total", "Agent replies that were not a valid action")
+
+
+# --- Per-request trace ---
+
+class RequestTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []  # (stage, seconds) in completion order
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, stage, seconds):
+        with self._lock:
+            self.spans.append((stage, seconds))
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def totals(self):
+        """Total seconds per stage, in first-seen order."""
+        totals = {}
+        with self._lock:
+            for stage, seconds in self.spans:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def server_timing(self):
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.totals().items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self):
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.totals().items()},
+            "spans": [{"stage": stage, "ms": round(seconds * 1000, 1)} for stage, seconds in self.spans],
+            "counters": dict(self.counters),
+        }
+
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+def start_trace():
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def trace_count(name, amount=1):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.incr(name, amount)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as pipeline stage `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, seconds)
+
+
+def record_weaviate(operation, count=1):
+    WEAVIATE_REQUESTS.inc(count, operation=operation)
+    trace_count("weaviate_requests", count)
+
+
+def record_llm(endpoint, seconds, prompt_tokens=0, completion_tokens=0):
+    LLM_REQUESTS.inc(endpoint=endpoint)
+    LLM_REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    LLM_TOKENS.inc(prompt_tokens or 0, endpoint=endpoint, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens or 0, endpoint=endpoint, kind="completion")
+    trace_count("llm_requests")
+    trace_count("llm_prompt_tokens", prompt_tokens or 0)
+    trace_count("llm_completion_tokens", completion_tokens or 0)
+
+
+def record_embedding(count=1):
+    EMBEDDING_REQUESTS.inc(count)
+    trace_count("embedding_requests", count)
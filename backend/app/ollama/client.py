@@ -1,6 +1,17 @@
 import os
+import time
+import logging
 import requests
 import json
+from app import metrics
+from app.log import truncate
+from app.ollama.resilience import CircuitBreaker, Failover, ProviderUnavailable, hedged
+from app.config import (
+    LLM_BACKEND_ORDER, LLM_CONNECT_TIMEOUT, LLM_TIMEOUT, EMBED_TIMEOUT, LLM_RETRIES, LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY, EMBED_HEDGE_DELAY, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS
+)
+
+logger = logging.getLogger(__name__)
 
 OLLAMA_URL = "http://localhost:11434"  # Default Ollama API URL
 EMBED_MODEL = "mxbai-embed-large"  # Change if needed
@@ -8,65 +19,280 @@ LLM_MODEL = "llama3"  # Change if needed
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+CHAT_KEEP_ALIVE = os.getenv("CHAT_KEEP_ALIVE", "30m")  # keep the model (and its KV cache) loaded between turns
 
-try:
-    import openai
-except ImportError:
-    openai = None
+_openai = None  # the openai module once imported, False if it is not installed
 
 
-def get_embedding(text):
+def openai_client():
+    """The openai module when OPENAI_API_KEY is set, imported on first use so startup does not pay for it."""
+    global _openai
+    if not OPENAI_API_KEY:
+        return None
+    if _openai is None:
+        try:
+            import openai
+            openai.api_key = OPENAI_API_KEY
+            _openai = openai
+        except ImportError:
+            logger.warning("OPENAI_API_KEY is set but the openai package is not installed; using Ollama")
+            _openai = False
+    return _openai or None
+
+
+# --- Backends ---
+# Every call goes through _failover: per-backend circuit breakers, jittered
+# retries of transient errors and, for completions and chat, failover between
+# OpenAI and Ollama in LLM_BACKEND_ORDER (see app.ollama.resilience).
+# Embeddings are Ollama-only: the index was built with EMBED_MODEL, so another
+# provider's vectors would not be comparable.
+
+BREAKERS = {name: CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS) for name in ("ollama", "openai")}
+_failover = Failover(BREAKERS, LLM_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY)
+
+
+def _backends(calls):
+    """(backend, fn) pairs in LLM_BACKEND_ORDER; OpenAI only when it is configured."""
+    order = [name.strip() for name in LLM_BACKEND_ORDER.split(",") if name.strip()]
+    return [(name, calls[name]) for name in order if name in calls and (name != "openai" or openai_client() is not None)]
+
+
+def _ollama_embed(inputs):
+    """Embeddings for a string or a list of strings (one /api/embed request). Returns a list of vectors."""
     url = f"{OLLAMA_URL}/api/embed"
-    payload = {"model": EMBED_MODEL, "input": text}
-    response = requests.post(url, json=payload)
+    payload = {"model": EMBED_MODEL, "input": inputs}
+    response = requests.post(url, json=payload, timeout=(LLM_CONNECT_TIMEOUT, EMBED_TIMEOUT))
     response.raise_for_status()
     data = response.json()
     # Ollama may return either 'embedding' or 'embeddings' (list of embeddings)
-    if "embedding" in data:
-        return data["embedding"]
-    elif "embeddings" in data:
+    if "embeddings" in data:
         # embeddings is a list of embeddings, one per input
-        return data["embeddings"][0]
+        return data["embeddings"]
+    elif "embedding" in data:
+        return [data["embedding"]]
     else:
         raise ValueError(f"No embedding found in Ollama response: {data}")
 
-def get_llm_completion(prompt, system_prompt=None, max_tokens=512):
-    if OPENAI_API_KEY and openai is not None:
-        openai.api_key = OPENAI_API_KEY
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        else:
-            messages.append({"role": "system", "content": "You are a helpful assistant for answering questions from company SOPs."})
-        messages.append({"role": "user", "content": prompt})
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=0.2,
-        )
-        result = response.choices[0].message["content"].strip()
-        print("[OpenAI] Raw LLM output:", result)
-        return result
-    # Fallback to Ollama
+
+def get_embedding(text):
+    metrics.record_embedding()
+    with metrics.stage("embed"):
+        # Embedding requests are idempotent, so a slow one can be hedged (EMBED_HEDGE_DELAY)
+        return _failover.call("embed", [("ollama", lambda: hedged(lambda: _ollama_embed(text)[0], EMBED_HEDGE_DELAY, "embed"))])
+
+
+def get_embeddings(texts):
+    """Embeddings for several texts in one request, in input order."""
+    texts = list(texts)
+    if not texts:
+        return []
+    metrics.record_embedding()
+    with metrics.stage("embed"):
+        return _failover.call("embed", [("ollama", lambda: hedged(lambda: _ollama_embed(texts), EMBED_HEDGE_DELAY, "embed"))])
+
+
+def _openai_generate(prompt, system_prompt, max_tokens):
+    openai = openai_client()
+    started = time.perf_counter()
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    else:
+        messages.append({"role": "system", "content": "You are a helpful assistant for answering questions from company SOPs."})
+    messages.append({"role": "user", "content": prompt})
+    response = openai.ChatCompletion.create(
+        model=OPENAI_MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.2,
+        request_timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT),
+    )
+    usage = getattr(response, "usage", None) or {}
+    metrics.record_llm("openai", time.perf_counter() - started, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+    result = response.choices[0].message["content"].strip()
+    logger.debug("OpenAI completion: %s", truncate(result))
+    return result
+
+
+def _ollama_generate(prompt, system_prompt, max_tokens):
+    started = time.perf_counter()
     url = f"{OLLAMA_URL}/api/generate"
     payload = {"model": LLM_MODEL, "prompt": prompt}
     if system_prompt:
         payload["system"] = system_prompt
     if max_tokens:
         payload["options"] = {"num_predict": max_tokens}
-    response = requests.post(url, json=payload)
+    response = requests.post(url, json=payload, timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT))
     response.raise_for_status()
     # Handle streaming JSON lines
     lines = response.text.strip().splitlines()
     answer_parts = []
+    prompt_tokens = completion_tokens = 0
     for line in lines:
         try:
             obj = json.loads(line)
             if "response" in obj:
                 answer_parts.append(obj["response"])
+            if obj.get("done"):
+                prompt_tokens = obj.get("prompt_eval_count", 0)
+                completion_tokens = obj.get("eval_count", 0)
         except Exception:
             continue
+    metrics.record_llm("generate", time.perf_counter() - started, prompt_tokens, completion_tokens)
     result = "".join(answer_parts).strip()
-    print("[Ollama] Raw LLM output:", result)
-    return result 
\ No newline at end of file
+    logger.debug("Ollama completion: %s", truncate(result))
+    return result
+
+
+def get_llm_completion(prompt, system_prompt=None, max_tokens=512):
+    """Single-turn completion; raises ProviderUnavailable when no backend could serve it."""
+    return _failover.call("generate", _backends({
+        "openai": lambda: _openai_generate(prompt, system_prompt, max_tokens),
+        "ollama": lambda: _ollama_generate(prompt, system_prompt, max_tokens),
+    }))
+
+class ChatSession:
+    """Multi-turn conversation over /api/chat.
+
+    The system prompt and earlier turns are resent unchanged on every call, so
+    they form a stable prefix that Ollama serves from its KV cache; only the
+    newly appended messages are prefilled. Uses OpenAI chat completions
+    instead when OPENAI_API_KEY is set, and fails over between the two like
+    get_llm_completion (the history is plain messages, valid for either).
+    """
+
+    def __init__(self, system_prompt, model=None, keep_alive=None):
+        self.model = model or LLM_MODEL
+        self.keep_alive = keep_alive or CHAT_KEEP_ALIVE
+        self.messages = [{"role": "system", "content": system_prompt}]
+        self.calls = 0
+        self.prompt_eval_tokens = 0  # tokens the server actually prefilled (cache misses)
+        self.completion_tokens = 0
+
+    def send(self, content, max_tokens=512):
+        """Append a user message, get the assistant reply, and keep both in the history."""
+        self.messages.append({"role": "user", "content": content})
+        reply = self._complete(max_tokens)
+        self.messages.append({"role": "assistant", "content": reply})
+        self.calls += 1
+        return reply
+
+    def stream(self, content, max_tokens=512):
+        """Like send(), but yields the reply incrementally as it is generated."""
+        self.messages.append({"role": "user", "content": content})
+        parts = []
+        try:
+            for token in self._stream(max_tokens):
+                parts.append(token)
+                yield token
+        finally:
+            # Keep the history consistent even if the consumer stops early
+            self.messages.append({"role": "assistant", "content": "".join(parts).strip()})
+            self.calls += 1
+
+    def _stream(self, max_tokens):
+        # Fail over only until the first token arrives: once part of the reply
+        # has been yielded, switching backends would restart it mid-answer
+        def first_token(stream):
+            tokens = stream(max_tokens)
+            for token in tokens:
+                return token, tokens
+            return None, iter(())
+
+        head, rest = _failover.call("chat", _backends({
+            "openai": lambda: first_token(self._openai_stream),
+            "ollama": lambda: first_token(self._ollama_stream),
+        }))
+        if head is not None:
+            yield head
+        yield from rest
+
+    def _openai_stream(self, max_tokens):
+        openai = openai_client()
+        started = time.perf_counter()
+        response = openai.ChatCompletion.create(
+            model=OPENAI_MODEL,
+            messages=self.messages,
+            max_tokens=max_tokens,
+            temperature=0.2,
+            stream=True,
+            request_timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT),
+        )
+        for chunk in response:
+            token = chunk.choices[0].delta.get("content")
+            if token:
+                yield token
+        metrics.record_llm("openai", time.perf_counter() - started)
+
+    def _ollama_stream(self, max_tokens):
+        started = time.perf_counter()
+        payload = {
+            "model": self.model,
+            "messages": self.messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+        with requests.post(f"{OLLAMA_URL}/api/chat", json=payload, stream=True, timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                token = obj.get("message", {}).get("content")
+                if token:
+                    yield token
+                if obj.get("done"):
+                    self.prompt_eval_tokens += obj.get("prompt_eval_count", 0)
+                    self.completion_tokens += obj.get("eval_count", 0)
+                    metrics.record_llm("chat", time.perf_counter() - started, obj.get("prompt_eval_count", 0), obj.get("eval_count", 0))
+
+    def _complete(self, max_tokens):
+        return _failover.call("chat", _backends({
+            "openai": lambda: self._openai_complete(max_tokens),
+            "ollama": lambda: self._ollama_complete(max_tokens),
+        }))
+
+    def _openai_complete(self, max_tokens):
+        openai = openai_client()
+        started = time.perf_counter()
+        response = openai.ChatCompletion.create(
+            model=OPENAI_MODEL,
+            messages=self.messages,
+            max_tokens=max_tokens,
+            temperature=0.2,
+            request_timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT),
+        )
+        usage = getattr(response, "usage", None)
+        if usage:
+            self.prompt_eval_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+        usage = usage or {}
+        metrics.record_llm("openai", time.perf_counter() - started, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+        result = response.choices[0].message["content"].strip()
+        logger.debug("OpenAI chat reply: %s", truncate(result))
+        return result
+
+    def _ollama_complete(self, max_tokens):
+        started = time.perf_counter()
+        payload = {
+            "model": self.model,
+            "messages": self.messages,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+        }
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+        response = requests.post(f"{OLLAMA_URL}/api/chat", json=payload, timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT))
+        response.raise_for_status()
+        data = response.json()
+        self.prompt_eval_tokens += data.get("prompt_eval_count", 0)
+        self.completion_tokens += data.get("eval_count", 0)
+        metrics.record_llm("chat", time.perf_counter() - started, data.get("prompt_eval_count", 0), data.get("eval_count", 0))
+        result = data.get("message", {}).get("content", "").strip()
+        logger.debug("Ollama chat reply: %s", truncate(result))
+        return result
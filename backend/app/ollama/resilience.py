@@ -0,0 +1,182 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Failure handling for model backends (Ollama, OpenAI) ---
+# Each backend has a circuit breaker: after BREAKER_FAILURE_THRESHOLD
+# consecutive transient failures it opens and calls fail fast (so the caller
+# fails over to the other backend) until BREAKER_RESET_SECONDS have passed;
+# then a single probe call is let through (half-open) and closes it again on
+# success. Transient failures (connection errors, timeouts, 429/5xx) are
+# retried with full-jitter exponential backoff before they count.
+# Breaker state is exported as llm_breaker_state{backend} (0 closed,
+# 1 half-open, 2 open).
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = metrics.REGISTRY.gauge("llm_breaker_state", "Circuit breaker state per model backend (0 closed, 1 half-open, 2 open)", ["backend"])
+BREAKER_TRANSITIONS = metrics.REGISTRY.counter("llm_breaker_transitions_total", "Circuit breaker state changes", ["backend", "state"])
+RETRIES = metrics.REGISTRY.counter("llm_retries_total", "Retried model backend calls", ["backend", "operation"])
+FAILOVERS = metrics.REGISTRY.counter("llm_failovers_total", "Calls served by a fallback backend", ["operation", "backend"])
+HEDGES = metrics.REGISTRY.counter("llm_hedged_requests_total", "Hedged (duplicate) requests sent, by which copy won", ["operation", "winner"])
+
+# OpenAI error classes worth retrying, by name so the optional package is not imported to check
+_OPENAI_TRANSIENT = {"APIConnectionError", "APIError", "APITimeoutError", "InternalServerError",
+                     "RateLimitError", "ServiceUnavailableError", "Timeout", "TryAgain"}
+
+
+class ProviderUnavailable(Exception):
+    """Every backend for an operation failed or had its circuit open."""
+
+
+def is_transient(error):
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return type(error).__name__ in _OPENAI_TRANSIENT
+
+
+class CircuitBreaker:
+    def __init__(self, backend, failure_threshold=5, reset_timeout=30.0):
+        self.backend = backend
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, backend=backend)
+
+    def _transition(self, state):
+        if state != self.state:
+            logger.warning("Circuit for %s: %s -> %s", self.backend, self.state, state)
+            self.state = state
+            BREAKER_STATE.set(STATE_VALUES[state], backend=self.backend)
+            BREAKER_TRANSITIONS.inc(backend=self.backend, state=state)
+
+    def allow(self):
+        """Whether a call may go to the backend now. In half-open state only one probe is let through."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def release(self):
+        """End a call that neither succeeded nor failed transiently (e.g. a 400), freeing the half-open probe."""
+        with self._lock:
+            self._probing = False
+
+
+def backoff_delay(attempt, base, cap):
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def with_retries(fn, backend, operation, retries, base_delay, max_delay):
+    """Call fn(), retrying transient errors up to `retries` times with jittered backoff."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            attempt += 1
+            RETRIES.inc(backend=backend, operation=operation)
+            logger.info("%s %s failed (%s), retry %d in %.2fs", backend, operation, e.__class__.__name__, attempt, delay)
+            time.sleep(delay)
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+def hedged(fn, delay, operation):
+    """Call fn(); if it has not finished after `delay` seconds, send a second copy and return whichever succeeds first.
+
+    Only for idempotent requests. The slower copy is left to finish (bounded by its own timeout).
+    """
+    if not delay or delay <= 0:
+        return fn()
+    first = _hedge_pool.submit(fn)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+    second = _hedge_pool.submit(fn)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                HEDGES.inc(operation=operation, winner="primary" if future is first else "hedge")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+class Failover:
+    """Run an operation against backends in preference order, skipping those whose circuit is open."""
+
+    def __init__(self, breakers, retries=2, base_delay=0.2, max_delay=2.0):
+        self.breakers = breakers
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def call(self, operation, calls):
+        """`calls` is a list of (backend, fn) in preference order. Returns the first result.
+
+        Non-transient errors (bad request, malformed response) are raised as is;
+        if every backend fails transiently, raises ProviderUnavailable.
+        """
+        errors = []
+        for i, (backend, fn) in enumerate(calls):
+            breaker = self.breakers[backend]
+            if not breaker.allow():
+                errors.append(f"{backend}: circuit open")
+                continue
+            try:
+                result = with_retries(fn, backend, operation, self.retries, self.base_delay, self.max_delay)
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                errors.append(f"{backend}: {e.__class__.__name__}: {e}")
+                logger.warning("%s %s failed: %s", backend, operation, e)
+                continue
+            breaker.record_success()
+            if i > 0:
+                FAILOVERS.inc(operation=operation, backend=backend)
+            return result
+        raise ProviderUnavailable(f"{operation} unavailable ({'; '.join(errors) or 'no backend configured'})")
@@ -0,0 +1,115 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from app.config import PROFILE_DB, PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL
+from app.rag.search import UserContext
+
+logger = logging.getLogger(__name__)
+
+# --- User profiles shared across workers ---
+# Profiles live in SQLite (PROFILE_DB, WAL), so every uvicorn worker sees the
+# same profile for a user_id; a profile is stored the first time a user_id
+# is seen and later requests may overlay fields without persisting them.
+# Each worker keeps a bounded LRU front cache (PROFILE_CACHE_SIZE entries,
+# PROFILE_CACHE_TTL seconds) of UserContext objects whose role sets are
+# compiled once, so access checks do not re-derive them per chunk.
+
+
+class ProfileStore:
+    def __init__(self, path=None, cache_size=None, ttl=None):
+        self.path = path or PROFILE_DB
+        self.cache_size = cache_size or PROFILE_CACHE_SIZE
+        self.ttl = PROFILE_CACHE_TTL if ttl is None else ttl
+        self._cache = OrderedDict()  # user_id -> (expires_at, UserContext)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, profile TEXT NOT NULL, updated_at REAL)")
+                conn.commit()
+                self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _cached(self, user_id):
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[user_id]
+                return None
+            self._cache.move_to_end(user_id)
+            return entry[1]
+
+    def _remember(self, user_id, ctx):
+        with self._lock:
+            self._cache[user_id] = (time.monotonic() + self.ttl, ctx)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get(self, user_id, default=None):
+        """Stored profile for user_id, storing `default` first if there is none. Returns a UserContext."""
+        ctx = self._cached(user_id)
+        if ctx is not None:
+            self.hits += 1
+            return ctx
+        self.misses += 1
+        conn = self._conn()
+        if default is not None:
+            # First writer wins, so concurrent workers agree on the stored profile
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?)",
+                    (user_id, json.dumps(default, ensure_ascii=False), time.time())
+                )
+        row = conn.execute("SELECT profile FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        ctx = UserContext(json.loads(row[0]))
+        self._remember(user_id, ctx)
+        return ctx
+
+    def put(self, user_id, profile):
+        """Replace a stored profile. Other workers see it once their cached copy expires."""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?)",
+                (user_id, json.dumps(profile, ensure_ascii=False), time.time())
+            )
+        self._remember(user_id, UserContext(profile))
+
+    def user_context(self, user_id, profile=None):
+        """The access-control context for a request: the stored profile overlaid with `profile`."""
+        if not user_id:
+            return UserContext(profile or {})
+        stored = self.get(user_id, default=profile or {})
+        if not profile:
+            return stored
+        return UserContext({**stored, **profile})
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProfileStore()
+    return _store
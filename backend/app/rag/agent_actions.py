@@ -0,0 +1,68 @@
+import json
+import re
+from collections import namedtuple
+
+# --- Structured agent actions ---
+# The agent replies with one JSON object, e.g. {"action": "SEARCH", "input": "handover checklist"}.
+# The legacy "ACTION: input" line format is still accepted so older prompts and
+# models that ignore the JSON instruction don't cost a repair round trip.
+
+ACTIONS = ("SEARCH", "SUMMARIZE", "LIST_SOPS", "GET_SOP_SECTION", "FINAL_ANSWER")
+
+AgentAction = namedtuple("AgentAction", ["name", "input"])
+
+ACTION_FORMAT_HELP = (
+    'Reply with exactly one JSON object and nothing else: {"action": "<ACTION>", "input": <input>}. '
+    'ACTION is one of SEARCH (input: query), SUMMARIZE (input: what to summarize), LIST_SOPS (input: filter text), '
+    'GET_SOP_SECTION (input: {"sop": "<sop>", "section": "<section>"}) or FINAL_ANSWER (input: short note).'
+)
+
+REPAIR_PROMPT = "Your last reply was not a valid action. " + ACTION_FORMAT_HELP
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_LEGACY_RE = re.compile(r"^\s*(SEARCH|SUMMARIZE|LIST_SOPS|GET_SOP_SECTION|FINAL_ANSWER)\s*:\s*(.*)$", re.DOTALL)
+
+
+def _first_json_object(text):
+    """Return the first decodable JSON object embedded in text, or None."""
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            obj, _ = decoder.raw_decode(text[start:])
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+def _normalize_input(name, value):
+    if name == "GET_SOP_SECTION":
+        if isinstance(value, dict):
+            return (str(value.get("sop") or "").strip() or None, str(value.get("section") or "").strip() or None)
+        args = str(value or "").split(",", 1)
+        sop = args[0].strip() if args and args[0].strip() else None
+        section = args[1].strip() if len(args) > 1 and args[1].strip() else None
+        return (sop, section)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value or "").strip()
+
+
+def parse_action(text):
+    """Parse an agent reply into an AgentAction, or None if it is not a valid action."""
+    if not text:
+        return None
+    cleaned = _FENCE_RE.sub("", text.strip())
+    obj = _first_json_object(cleaned)
+    if obj is not None:
+        name = str(obj.get("action") or obj.get("tool") or "").strip().upper()
+        if name in ACTIONS:
+            return AgentAction(name, _normalize_input(name, obj.get("input", obj.get("args"))))
+    match = _LEGACY_RE.match(cleaned)
+    if match:
+        name = match.group(1)
+        return AgentAction(name, _normalize_input(name, match.group(2)))
+    return None
@@ -0,0 +1,117 @@
+from app.tokenizer import count_tokens
+from app.config import AGENT_PROMPT_BUDGET_TOKENS, AGENT_COMPACT_TARGET
+
+# --- Token-budgeted agent conversation ---
+# Wraps a ChatSession so the agent prompt stays under a token budget. Tool
+# observations are kept as structured entries; when the conversation would
+# exceed the budget, older observations are compacted oldest-first: full
+# chunks -> chunk summaries -> titles only. The system prompt and the latest
+# observation are never compacted (the latest is trimmed to fit if needed).
+# Rewriting an earlier message invalidates the backend's cached prefix from
+# that point on, so compaction runs rarely: only when the budget is exceeded,
+# and then in one pass down to AGENT_COMPACT_TARGET of the budget, leaving
+# room for several more steps that only append.
+
+FULL, SUMMARIES, TITLES = 0, 1, 2
+SUMMARY_CHARS = 200
+
+
+def _chunk_summary(c):
+    if c.summary:
+        return c.summary
+    content = c.content or ""
+    return content[:SUMMARY_CHARS] + ("..." if len(content) > SUMMARY_CHARS else "")
+
+
+def render_observation(label, chunks, level=FULL, text=None):
+    """Render a tool observation message at a given compaction level."""
+    if chunks is None:
+        return f"Observation ({label}): {text}\nNext action?"
+    if not chunks:
+        return f"Observation ({label}): {text or 'No matching SOP sections.'}\nNext action?"
+    if level == FULL:
+        body = "\n\n".join(f"[{c.title}] {c.content}" for c in chunks if c.content)
+    elif level == SUMMARIES:
+        body = "\n".join(f"[{c.title}] {_chunk_summary(c)}" for c in chunks)
+    else:
+        body = "Earlier results (details dropped to save space): " + "; ".join(str(c.title) for c in chunks)
+    return f"Observation ({label}):\n{body}\nNext action?"
+
+
+class AgentContext:
+    def __init__(self, session, budget_tokens=None, compact_target=None):
+        self.session = session
+        self.budget_tokens = budget_tokens or AGENT_PROMPT_BUDGET_TOKENS
+        self.compact_target = compact_target or AGENT_COMPACT_TARGET
+        # message index in session.messages -> [label, chunks, level]
+        self._observations = {}
+        self._token_cache = {}
+        self.compactions = 0  # observations rewritten
+        self.compaction_passes = 0  # times earlier messages were rewritten (each re-prefills from there)
+        self.max_prompt_tokens = 0
+
+    def _tokens(self, content):
+        n = self._token_cache.get(content)
+        if n is None:
+            n = count_tokens(content)
+            self._token_cache[content] = n
+        return n
+
+    def prompt_tokens(self, pending=""):
+        return sum(self._tokens(m["content"]) for m in self.session.messages) + self._tokens(pending)
+
+    def _fit(self, pending):
+        """If the conversation plus `pending` is over budget, compact older observations down to the low-water mark."""
+        if self.prompt_tokens(pending) <= self.budget_tokens:
+            return
+        self.compaction_passes += 1
+        low_water = int(self.budget_tokens * self.compact_target)
+        for level in (SUMMARIES, TITLES):
+            for index in sorted(self._observations):
+                if self.prompt_tokens(pending) <= low_water:
+                    return
+                label, chunks, current = self._observations[index]
+                if current >= level:
+                    continue
+                self.session.messages[index]["content"] = render_observation(label, chunks, level)
+                self._observations[index][2] = level
+                self.compactions += 1
+
+    def observation(self, label, chunks=None, text=None):
+        """Build the next observation message, trimmed to the budget if it is too large on its own."""
+        room = self.budget_tokens - self._tokens(self.session.messages[0]["content"])
+        for level in (FULL, SUMMARIES, TITLES):
+            message = render_observation(label, chunks, level, text)
+            if self._tokens(message) <= room:
+                break
+        return _Observation(message, label, chunks, level)
+
+    def send(self, message, max_tokens=512):
+        self._fit(str(message))
+        self.max_prompt_tokens = max(self.max_prompt_tokens, self.prompt_tokens(str(message)))
+        index = len(self.session.messages)
+        reply = self.session.send(str(message), max_tokens=max_tokens)
+        self._register(index, message)
+        return reply
+
+    def stream(self, message, max_tokens=512):
+        self._fit(str(message))
+        self.max_prompt_tokens = max(self.max_prompt_tokens, self.prompt_tokens(str(message)))
+        index = len(self.session.messages)
+        yield from self.session.stream(str(message), max_tokens=max_tokens)
+        self._register(index, message)
+
+    def _register(self, index, message):
+        if isinstance(message, _Observation) and message.chunks:
+            self._observations[index] = [message.label, message.chunks, message.level]
+
+
+class _Observation(str):
+    """Observation message text that remembers its chunks so it can be compacted later."""
+
+    def __new__(cls, text, label, chunks, level):
+        obj = super().__new__(cls, text)
+        obj.label = label
+        obj.chunks = chunks
+        obj.level = level
+        return obj
@@ -0,0 +1,137 @@
+import re
+import time
+from app.weaviate_client.client import get_client
+from app.ollama.client import get_embedding
+from weaviate.classes.query import Filter
+from app.rag.search import SECTION_PROPERTIES, filter_by_access
+from app.rag.expansion import get_query_expander
+from app.rag.chunk import to_chunks
+from app.rag.catalog import get_catalog, part_number, section_key
+from app.rag.retrieval import section_search
+from app import metrics
+
+# --- Request-scoped tool executor for the agentic loop ---
+# One Weaviate client per request, memoized SEARCH/LIST_SOPS/GET_SOP_SECTION
+# results (agents often repeat a search across steps), one synonym-expanded
+# hybrid search per SEARCH, and a wall-clock deadline shared by all steps.
+
+UNCATALOGED_FETCH_LIMIT = 1000  # objects of one SOP scanned on a catalog miss
+
+
+def normalize_query(text):
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+class AgentToolExecutor:
+    def __init__(self, user_ctx, top_k, timeout=None, client=None, catalog=None):
+        self.user_ctx = user_ctx
+        self.top_k = top_k
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._own_client = client is None
+        self._client = client
+        self.sections = section_search(lambda: self.client)
+        self._catalog = catalog
+        self._memo = {}
+        self.cache_hits = 0
+
+    @property
+    def client(self):
+        """Weaviate client, connected on first use (a standalone local index never needs one)."""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _memoized(self, key, fn):
+        if key in self._memo:
+            self.cache_hits += 1
+            return self._memo[key]
+        result = fn()
+        self._memo[key] = result
+        return result
+
+    def search(self, query):
+        """SEARCH tool: one hybrid search with the query's synonyms in its keywords and fused into its vector."""
+        def run():
+            expansion = get_query_expander().expand(query)
+            vector = expansion.fuse(get_embedding(query))
+            with metrics.stage("retrieval.hybrid"):
+                result = self.sections.hybrid(
+                    query=expansion.text,
+                    vector=vector,
+                    limit=self.top_k,
+                    return_properties=SECTION_PROPERTIES
+                )
+            return filter_by_access(to_chunks(result.objects), self.user_ctx)[:self.top_k]
+        return self._memoized(("search", normalize_query(query)), run)
+
+    @property
+    def catalog(self):
+        """The shared SOP catalog, loaded on first use if startup could not load it, rebuilt in the background when old."""
+        catalog = self._catalog or get_catalog()
+        if not catalog.loaded:
+            catalog.load(self.client)
+        else:
+            catalog.refresh_if_stale()
+        return catalog
+
+    def list_sops(self, filter_str):
+        """LIST_SOPS tool: SOP names visible to the user, answered from the in-process catalog."""
+        return self._memoized(("list_sops", normalize_query(filter_str)), lambda: self.catalog.list_sops(filter_str, self.user_ctx))
+
+    def get_sop_section(self, sop, section):
+        """GET_SOP_SECTION tool: exact catalog lookup, then one fetch of those objects by ID."""
+        if not section:
+            return []
+        def run():
+            ids = self.catalog.section_ids(sop, section)
+            if not ids:
+                return self._uncataloged_section(sop, section)
+            result = self.sections.fetch_objects(
+                filters=Filter.by_id().contains_any(ids),
+                limit=len(ids),
+                return_properties=["title", "content", "section", "summary", "sop", "tags"]
+            )
+            # '(Part n)' chunks in part order (fetch results come back in UUID order)
+            objects = sorted(result.objects, key=lambda obj: part_number(obj.properties.get("section") or obj.properties.get("title")))
+            return filter_by_access(to_chunks(objects), self.user_ctx)
+        return self._memoized(("get_sop_section", normalize_query(sop), normalize_query(section)), run)
+
+    def _uncataloged_section(self, sop, section):
+        """Catalog miss: look for the section in the index itself, in case it was ingested after the last rebuild."""
+        if not sop:
+            return []
+        result = self.sections.fetch_objects(
+            filters=Filter.by_property("sop").equal(sop),
+            limit=UNCATALOGED_FETCH_LIMIT,
+            return_properties=["title", "content", "section", "summary", "sop", "tags"]
+        )
+        key = section_key(section)
+        objects = [obj for obj in result.objects if section_key(obj.properties.get("section") or obj.properties.get("title")) == key]
+        if not objects:
+            return []
+        # The catalog is behind the index
+        self.catalog.refresh_async()
+        objects.sort(key=lambda obj: part_number(obj.properties.get("section") or obj.properties.get("title")))
+        return filter_by_access(to_chunks(objects), self.user_ctx)
+
+    def close(self):
+        if self._own_client and self._client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,325 @@
+"""Offline batch evaluation: answer a question set with the /rag/query pipeline and score it with RAGAS.
+
+Questions come from a file or from the feedback table. A file can be JSONL
+(objects with "question" and optionally top_k, department, sop, user_id,
+profile), a JSON list of such objects or strings, or plain text with one
+question per line. Duplicate questions (modulo case and whitespace) run once.
+
+Up to --concurrency questions go through the pipeline at a time, with inline
+RAGAS turned off and each request traced. Answers are scored in batches of
+--batch-size, one RAGAS evaluate() call per batch, on a pool of --processes
+worker processes. Each scored batch is written to the evaluation table (one
+row per question, tagged with the run ID, the --label describing the
+configuration, total latency and per-stage latency), then appended to the
+checkpoint file. Re-running with the same --checkpoint resumes the run and
+skips questions already scored. At the end one aggregate row (question NULL:
+mean metrics, mean latency, mean per-stage latency) is written for the run
+and the summary is printed.
+
+Usage (from backend/):
+    python -m app.rag.batch_eval questions.jsonl --label "rerank=llm top_k=10" [--checkpoint eval_runs/a.jsonl]
+    python -m app.rag.batch_eval --from-feedback --min-rating 3 --since 2025-07-01 --label baseline
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import re
+import statistics
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime
+from app import metrics
+from app.config import EVAL_CONCURRENCY, EVAL_PROCESSES, EVAL_BATCH_SIZE
+from app.feedback_store import get_feedback_store
+from app.rag.evaluation import score_batch
+from app.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("faithfulness", "context_relevance", "completeness")
+REQUEST_FIELDS = ("question", "top_k", "department", "sop", "user_id", "profile")
+CHECKPOINT_DIR = "eval_runs"
+
+
+def normalize_question(text):
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+def _item(value):
+    if isinstance(value, str):
+        value = {"question": value}
+    return {k: v for k, v in value.items() if k in REQUEST_FIELDS and v is not None}
+
+
+def load_questions(path):
+    """Question items from a JSONL, JSON list or plain-text file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return [_item(v) for v in json.loads(text)]
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        items.append(_item(json.loads(line) if line.startswith("{") else line))
+    return items
+
+
+def feedback_questions(store, min_rating=None, since=None, until=None):
+    """Questions users gave feedback on (newest first), optionally only those rated at least `min_rating`."""
+    items = []
+    # iter_rows yields (id, timestamp, question, answer, context, rating, comments)
+    for row in store.iter_rows("feedback", since=since, until=until):
+        question, rating = row[2], row[5]
+        if not question or (min_rating is not None and (rating is None or rating < min_rating)):
+            continue
+        items.append({"question": question})
+    return items
+
+
+def dedupe(items):
+    seen, out = set(), []
+    for item in items:
+        key = normalize_question(item.get("question"))
+        if key and key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
+def answer_question(item):
+    """Run the /rag/query pipeline for one item without inline RAGAS, traced."""
+    from app.api.rag import QueryRequest, rag_query
+    trace, token = metrics.start_trace()
+    try:
+        response = asyncio.run(rag_query(QueryRequest(**item, evaluate=False)))
+        timings = trace.to_dict()
+    finally:
+        metrics.end_trace(token)
+    if not isinstance(response, dict):
+        # 503 JSONResponse when every model backend is down
+        response = json.loads(response.body)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return {
+        "answer": response["answer"],
+        "contexts": [m["content"] for m in response["matches"] if m.get("content")],
+        "latency_ms": timings["total_ms"],
+        "stages_ms": timings["stages_ms"],
+    }
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return round(statistics.fmean(values), 4) if values else None
+
+
+class BatchEvaluator:
+    def __init__(self, label="", checkpoint=None, store=None, answer=None, score=None,
+                 concurrency=None, processes=None, batch_size=None):
+        self.label = label
+        self.checkpoint = checkpoint
+        self.store = store or get_feedback_store()
+        self.answer = answer or answer_question
+        self.score = score
+        self.concurrency = concurrency or EVAL_CONCURRENCY
+        self.processes = EVAL_PROCESSES if processes is None else processes
+        self.batch_size = batch_size or EVAL_BATCH_SIZE
+        self.run_id = None
+        self.records = []  # checkpointed results of this run, including earlier sessions
+        self.failures = {}  # normalized question -> question, for checkpointed failures of this run
+
+    # --- Checkpoint ---
+
+    def _load_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            if lines:
+                self.run_id = lines[0]["run_id"]
+                self.label = self.label or lines[0].get("label", "")
+                self.records = [line for line in lines[1:] if "failed" not in line]
+                self.failures = {normalize_question(line["failed"]): line["failed"] for line in lines[1:] if "failed" in line}
+                logger.info("Resuming run %s from %s: %d questions already scored", self.run_id, self.checkpoint, len(self.records))
+                return
+        self.run_id = uuid.uuid4().hex[:12]
+        if not self.checkpoint:
+            self.checkpoint = os.path.join(CHECKPOINT_DIR, f"{self.run_id}.jsonl")
+        os.makedirs(os.path.dirname(self.checkpoint) or ".", exist_ok=True)
+        with open(self.checkpoint, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"run_id": self.run_id, "label": self.label, "started": datetime.utcnow().isoformat()}) + "\n")
+        logger.info("Run %s checkpoints to %s", self.run_id, self.checkpoint)
+
+    def _write(self, batch, scores):
+        """Queue the batch's evaluation rows, wait for the commit, then checkpoint it."""
+        timestamp = datetime.utcnow().isoformat()
+        lines = []
+        for result, score in zip(batch, scores):
+            self.store.add_evaluation(
+                timestamp=timestamp, question=result["question"], answer=result["answer"],
+                context="\n".join(result["contexts"]), run_id=self.run_id, config=self.label,
+                latency_ms=result["latency_ms"], stages_ms=json.dumps(result["stages_ms"]), **score
+            )
+            record = {"question": result["question"], "latency_ms": result["latency_ms"], "stages_ms": result["stages_ms"], **score}
+            self.records.append(record)
+            lines.append(json.dumps(record) + "\n")
+        self.store.flush()
+        with open(self.checkpoint, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def _write_failure(self, question, error):
+        """Checkpoint a failed question so the run's error count survives a resume (which retries it)."""
+        self.failures[normalize_question(question)] = question
+        with open(self.checkpoint, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"failed": question, "error": str(error)[:500]}) + "\n")
+
+    @property
+    def errors(self):
+        """Questions of the run that failed and have not been answered by a later session."""
+        done = {normalize_question(r["question"]) for r in self.records}
+        return len(set(self.failures) - done)
+
+    # --- Scoring ---
+
+    def _scorer(self):
+        """Executor for RAGAS batches, or None when ragas is not installed (latency-only run)."""
+        if self.score is None and importlib.util.find_spec("ragas") is None:
+            logger.warning("ragas is not installed; recording latency without quality metrics")
+            return None
+        if self.processes > 0:
+            # spawn: the workers must not inherit this process's client connections and threads
+            return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="eval-score")
+
+    def _collect(self, scoring, block=False):
+        """Write the scored batches that are done (all of them when `block`)."""
+        if not scoring:
+            return
+        done, _ = wait(list(scoring), timeout=None if block else 0)
+        for future in done:
+            batch = scoring.pop(future)
+            try:
+                scores = future.result()
+            except Exception as e:
+                logger.error("RAGAS failed on a batch of %d answers: %s", len(batch), e)
+                scores = [dict.fromkeys(METRICS) for _ in batch]
+            self._write(batch, scores)
+
+    def _flush_batch(self, scorer, scoring, batch):
+        if scorer is None:
+            self._write(batch, [dict.fromkeys(METRICS) for _ in batch])
+            return
+        samples = [{"question": r["question"], "answer": r["answer"], "contexts": r["contexts"]} for r in batch]
+        scoring[scorer.submit(self.score or score_batch, samples)] = batch
+
+    # --- Run ---
+
+    def run(self, items):
+        self._load_checkpoint()
+        done = {normalize_question(r["question"]) for r in self.records}
+        pending = [item for item in dedupe(items) if normalize_question(item["question"]) not in done]
+        logger.info("Evaluating %d questions (%d already scored), concurrency %d, RAGAS batches of %d on %d processes",
+                    len(pending), len(done), self.concurrency, self.batch_size, self.processes)
+        scorer = self._scorer()
+        scoring = {}  # RAGAS future -> batch of answers
+        batch = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="eval") as pool:
+                futures = {pool.submit(self.answer, item): item for item in pending}
+                for future in as_completed(futures):
+                    question = futures[future]["question"]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Checkpointed as a failure, not a result, so a resumed run retries it
+                        self._write_failure(question, e)
+                        logger.warning("Question failed: %s (%s)", question[:120], e)
+                        continue
+                    batch.append(dict(result, question=question))
+                    if len(batch) >= self.batch_size:
+                        self._flush_batch(scorer, scoring, batch)
+                        batch = []
+                    self._collect(scoring)
+            if batch:
+                self._flush_batch(scorer, scoring, batch)
+            self._collect(scoring, block=True)
+        finally:
+            if scorer is not None:
+                scorer.shutdown(wait=True, cancel_futures=True)
+        return self.summarize()
+
+    def summarize(self):
+        """Aggregate the run's checkpointed results into its aggregate evaluation row, replacing the previous session's."""
+        latencies = [r["latency_ms"] for r in self.records]
+        stages = {}
+        for r in self.records:
+            for stage, ms in r["stages_ms"].items():
+                stages.setdefault(stage, []).append(ms)
+        summary = {
+            "run_id": self.run_id,
+            "label": self.label,
+            "questions": len(self.records),
+            "errors": self.errors,
+            **{name: _mean([r.get(name) for r in self.records]) for name in METRICS},
+            "latency_ms": {
+                "mean": _mean(latencies),
+                "p50": _percentile(latencies, 0.5) if latencies else None,
+                "p95": _percentile(latencies, 0.95) if latencies else None,
+            },
+            "stages_ms": {stage: _mean(values) for stage, values in stages.items()},
+        }
+        self.store.set_run_aggregate(
+            self.run_id, timestamp=datetime.utcnow().isoformat(), config=self.label,
+            latency_ms=summary["latency_ms"]["mean"], stages_ms=json.dumps(summary["stages_ms"]),
+            **{name: summary[name] for name in METRICS}
+        )
+        self.store.flush()
+        return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Answer a question set with the RAG pipeline and score it with RAGAS.")
+    parser.add_argument("path", nargs="?", help="questions file (JSONL, JSON list or one question per line)")
+    parser.add_argument("--from-feedback", action="store_true", help="use the questions in the feedback table")
+    parser.add_argument("--min-rating", type=int, help="with --from-feedback: only questions rated at least this")
+    parser.add_argument("--since", help="with --from-feedback: ISO timestamp, inclusive")
+    parser.add_argument("--until", help="with --from-feedback: ISO timestamp, exclusive")
+    parser.add_argument("--limit", type=int, help="evaluate at most this many questions")
+    parser.add_argument("--top-k", type=int, help="top_k for questions that do not set one")
+    parser.add_argument("--label", default="", help="name of the configuration under test, stored with every row")
+    parser.add_argument("--checkpoint", help="checkpoint file; an existing one resumes its run")
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY)
+    parser.add_argument("--processes", type=int, default=EVAL_PROCESSES)
+    parser.add_argument("--batch-size", type=int, default=EVAL_BATCH_SIZE)
+    parser.add_argument("--out", help="also write the summary JSON here")
+    args = parser.parse_args()
+    if bool(args.path) == args.from_feedback:
+        parser.error("give either a questions file or --from-feedback")
+    setup_logging()
+    store = get_feedback_store()
+    if args.from_feedback:
+        items = feedback_questions(store, args.min_rating, args.since, args.until)
+    else:
+        items = load_questions(args.path)
+    items = dedupe(items)[:args.limit] if args.limit else items
+    if args.top_k:
+        items = [dict({"top_k": args.top_k}, **item) for item in items]
+    evaluator = BatchEvaluator(args.label, args.checkpoint, store, concurrency=args.concurrency,
+                               processes=args.processes, batch_size=args.batch_size)
+    summary = evaluator.run(items)
+    store.close()
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
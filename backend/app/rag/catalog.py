@@ -0,0 +1,183 @@
+import logging
+import re
+import threading
+import time
+from rapidfuzz import fuzz, process as fuzz_process, utils as fuzz_utils
+from app.rag.search import filter_by_access
+from app.rag.chunk import Chunk
+from app.config import CATALOG_MAX_AGE_SECONDS
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- In-process SOP catalog ---
+# SOP -> department/tags and (sop, section) -> Section object IDs, built from one
+# cursor pass over the Section collection (properties only, no vectors). The
+# agent's LIST_SOPS and GET_SOP_SECTION tools answer from it without an
+# embedding call; GET_SOP_SECTION then fetches the exact objects by ID.
+# Loaded at startup and rebuilt after each ingestion job; a rebuild is swapped
+# in atomically so readers never see a half-built index. Documents ingested by
+# other processes (the Docs watcher, batch_ingest) are picked up by a
+# background rebuild once the catalog is older than CATALOG_MAX_AGE_SECONDS.
+
+CATALOG_PROPERTIES = ["sop", "section", "title", "department", "tags"]
+SOP_MATCH_CUTOFF = 80
+SECTION_MATCH_CUTOFF = 75
+LIST_MATCH_CUTOFF = 60
+
+_PART_RE = re.compile(r"\s*\(Part (\d+)\)\s*$", re.IGNORECASE)
+
+
+def section_key(name):
+    """Normalized section name; '(Part n)' chunks of one section share a key."""
+    return _PART_RE.sub("", (name or "").strip()).lower()
+
+
+def part_number(name):
+    """n of a '(Part n)' chunk name, 0 for an unsplit section."""
+    match = _PART_RE.search((name or "").strip())
+    return int(match.group(1)) if match else 0
+
+
+class SopCatalog:
+    def __init__(self):
+        self.sops = {}          # sop -> {"department", "tags", "sections"}
+        self.sections = {}      # (sop, section key) -> [uuid, ...] in part order
+        self.section_names = {} # sop -> {section key: display name}
+        self._sop_keys = {}     # lowercased sop -> sop
+        self.loaded_at = None
+        self.from_client = False  # built from Weaviate (refreshable), not a standalone snapshot
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self, client=None, cache_size=1000, collection=None):
+        """(Re)build the catalog from the Section collection with the cursor iterator.
+
+        `collection` may be anything with the collection's iterator(), e.g. the local index.
+        """
+        started = time.perf_counter()
+        sops, sections, section_names = {}, {}, {}
+        if collection is None:
+            collection = client.collections.get("Section")
+        objects = 0
+        for obj in collection.iterator(return_properties=CATALOG_PROPERTIES, cache_size=cache_size):
+            props = obj.properties
+            sop = props.get("sop")
+            if not sop:
+                continue
+            objects += 1
+            entry = sops.setdefault(sop, {"department": props.get("department"), "tags": set(), "sections": 0})
+            entry["sections"] += 1
+            # An empty tag string marks a public section (see filter_by_access)
+            entry["tags"].add(props.get("tags") or "")
+            name = props.get("section") or props.get("title") or ""
+            key = section_key(name)
+            sections.setdefault((sop, key), []).append((part_number(name), str(obj.uuid)))
+            section_names.setdefault(sop, {}).setdefault(key, _PART_RE.sub("", name.strip()))
+        # The cursor walks objects in UUID order, not ingestion order: put '(Part n)' chunks back in sequence
+        sections = {key: [uid for _, uid in sorted(parts)] for key, parts in sections.items()}
+        # The cursor fetches one page of cache_size objects per round trip
+        if client is not None:
+            metrics.record_weaviate("iterator", objects // cache_size + 1)
+        with self._lock:
+            self.sops, self.sections, self.section_names = sops, sections, section_names
+            self._sop_keys = {s.lower(): s for s in sops}
+            self.loaded_at = time.time()
+            self.from_client = client is not None
+        logger.info("Loaded %d SOPs, %d sections (%d objects) in %.2fs",
+                    len(sops), len(sections), objects, time.perf_counter() - started)
+        return self
+
+    def refresh(self, client=None):
+        """Rebuild after ingestion. Failures keep the previous catalog."""
+        from app.weaviate_client.client import get_client
+        own_client = client is None
+        try:
+            client = client or get_client()
+            self.load(client)
+        except Exception as e:
+            logger.warning("Refresh failed, keeping previous catalog: %s", e)
+        finally:
+            if own_client and client is not None:
+                client.close()
+
+    def refresh_async(self):
+        """Rebuild in a background thread unless a rebuild is already running; readers keep the current catalog."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+        threading.Thread(target=run, name="catalog-refresh", daemon=True).start()
+        return True
+
+    def refresh_if_stale(self, max_age=None):
+        """Start a background rebuild if the catalog was built from Weaviate more than `max_age` seconds ago."""
+        max_age = CATALOG_MAX_AGE_SECONDS if max_age is None else max_age
+        if self.loaded and self.from_client and max_age > 0 and time.time() - self.loaded_at > max_age:
+            return self.refresh_async()
+        return False
+
+    @staticmethod
+    def _visible(entry, user_ctx):
+        # Visible if any of the SOP's sections is
+        return bool(filter_by_access([Chunk(tags=t) for t in entry["tags"]], user_ctx))
+
+    def list_sops(self, filter_str="", user_ctx=None):
+        """SOP names visible to the user, optionally narrowed by an approximate name/department match."""
+        sops = self.sops
+        names = [s for s, entry in sops.items() if self._visible(entry, user_ctx)]
+        filter_str = (filter_str or "").strip()
+        if filter_str:
+            choices = {s: f"{s} {sops[s].get('department') or ''}" for s in names}
+            matches = fuzz_process.extract(filter_str, choices, scorer=fuzz.WRatio, processor=fuzz_utils.default_process, score_cutoff=LIST_MATCH_CUTOFF, limit=None)
+            names = [key for _, _, key in matches]
+        return sorted(names)
+
+    def resolve_sop(self, sop):
+        if not sop:
+            return None
+        exact = self._sop_keys.get(sop.strip().lower())
+        if exact:
+            return exact
+        match = fuzz_process.extractOne(sop, list(self.sops), scorer=fuzz.WRatio, processor=fuzz_utils.default_process, score_cutoff=SOP_MATCH_CUTOFF)
+        return match[0] if match else None
+
+    def section_ids(self, sop, section):
+        """Object IDs for a (sop, section) pair, matched exactly first and then approximately.
+
+        Without a resolvable SOP the section is matched across all SOPs.
+        """
+        key = section_key(section)
+        if not key:
+            return []
+        sections, section_names = self.sections, self.section_names
+        resolved = self.resolve_sop(sop)
+        if resolved and (resolved, key) in sections:
+            return list(sections[(resolved, key)])
+        if resolved:
+            candidates = {(resolved, k): name for k, name in section_names.get(resolved, {}).items()}
+        else:
+            candidates = {(s, k): name for s, names in section_names.items() for k, name in names.items()}
+        match = fuzz_process.extractOne(section, candidates, scorer=fuzz.WRatio, processor=fuzz_utils.default_process, score_cutoff=SECTION_MATCH_CUTOFF)
+        return list(sections[match[2]]) if match else []
+
+    def sop_ids(self, sop):
+        """All object IDs of one SOP (exact name), sorted by UUID like Weaviate's cursor."""
+        return sorted(uid for (name, _), ids in self.sections.items() if name == sop for uid in ids)
+
+
+_catalog = SopCatalog()
+
+
+def get_catalog():
+    return _catalog
@@ -0,0 +1,107 @@
+import numpy as np
+
+# --- Retrieved section chunks ---
+# Search results travel through access control, reranking, context packing
+# and the agent tools as Chunk objects: slotted (no per-instance dict) and
+# with the embeddings of one result set copied once into a float32 matrix
+# that every chunk of the set points into, instead of each chunk holding a
+# list of Python floats. Chunks become the JSON dict shape (to_dict) only
+# where a response is built.
+
+VECTOR_PROPERTY = "embedding"
+
+
+class Chunk:
+    __slots__ = ("uuid", "title", "content", "section", "summary", "sop", "tags", "score", "vectors", "row")
+
+    FIELDS = ("uuid", "title", "content", "section", "summary", "sop", "tags")
+
+    def __init__(self, uuid=None, title=None, content=None, section=None, summary=None, sop=None, tags=None,
+                 score=None, vectors=None, row=-1):
+        self.uuid = uuid
+        self.title = title
+        self.content = content
+        self.section = section
+        self.summary = summary
+        self.sop = sop
+        self.tags = tags
+        self.score = score
+        self.vectors = vectors  # the result set's (n, dim) float32 block, shared
+        self.row = row  # this chunk's row in `vectors`, -1 without an embedding
+
+    @property
+    def embedding(self):
+        """float32 view of this chunk's embedding, or None."""
+        if self.vectors is None or self.row < 0:
+            return None
+        return self.vectors[self.row]
+
+    def replace(self, **changes):
+        """Copy with some fields changed; embedding=None detaches the copy from the vector block."""
+        chunk = Chunk(**{name: getattr(self, name) for name in self.__slots__})
+        if "embedding" in changes and changes.pop("embedding") is None:
+            chunk.vectors, chunk.row = None, -1
+        for name, value in changes.items():
+            setattr(chunk, name, value)
+        return chunk
+
+    def to_dict(self, include_embedding=True):
+        """The candidate JSON shape returned by the API."""
+        out = {name: getattr(self, name) for name in self.FIELDS}
+        if include_embedding:
+            embedding = self.embedding
+            out["embedding"] = embedding.tolist() if embedding is not None else None
+        out["score"] = self.score
+        return out
+
+    def __repr__(self):
+        return f"Chunk(title={self.title!r}, sop={self.sop!r}, score={self.score!r})"
+
+
+def _vector_block(vectors):
+    """Stack a result set's embeddings into one float32 matrix. Returns (block, rows)."""
+    dim = next((len(v) for v in vectors if v is not None and len(v)), 0)
+    if not dim:
+        return None, [-1] * len(vectors)
+    if all(v is not None and len(v) == dim for v in vectors):
+        return np.asarray(vectors, dtype=np.float32), list(range(len(vectors)))
+    # Some objects lack an embedding (or have another model's): keep only rows that fit
+    rows, kept = [], []
+    for v in vectors:
+        if v is not None and len(v) == dim:
+            rows.append(len(kept))
+            kept.append(v)
+        else:
+            rows.append(-1)
+    return np.asarray(kept, dtype=np.float32), rows
+
+
+def to_chunks(objects):
+    """Shape Weaviate Section objects (one result set) into Chunks sharing one vector block."""
+    objects = list(objects)
+    block, rows = _vector_block([obj.properties.get(VECTOR_PROPERTY) for obj in objects])
+    chunks = []
+    for obj, row in zip(objects, rows):
+        props = obj.properties
+        chunks.append(Chunk(
+            uuid=str(obj.uuid) if getattr(obj, "uuid", None) else None,
+            title=props.get("title"),
+            content=props.get("content"),
+            section=props.get("section"),
+            summary=props.get("summary"),
+            sop=props.get("sop"),
+            tags=props.get("tags"),
+            score=getattr(obj.metadata, "score", None) if obj.metadata else None,
+            vectors=block,
+            row=row,
+        ))
+    return chunks
+
+
+def chunks_to_json(value, include_embedding=True):
+    """Replace Chunks (possibly nested in lists) with their dict shape, for responses."""
+    if isinstance(value, Chunk):
+        return value.to_dict(include_embedding)
+    if isinstance(value, list):
+        return [chunks_to_json(v, include_embedding) for v in value]
+    return value
@@ -0,0 +1,161 @@
+import re
+from collections import namedtuple
+import numpy as np
+from app.tokenizer import count_tokens
+from app.config import CONTEXT_TOKEN_BUDGETS, CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_CHUNKS, CONTEXT_DEDUP_SIMILARITY
+from app.rag.search import format_context
+
+# --- Token-aware context packing for the answer prompt ---
+# Reranked chunks are packed in rank order: near-duplicates (synonym searches
+# often return the same text twice) collapse into the higher-ranked copy,
+# adjacent "(Part n)" chunks of one section are merged with their chunking
+# overlap removed, and chunks are added until the model's token budget is
+# used up. Stats on what was saved go back in the response metadata.
+
+PackedContext = namedtuple("PackedContext", ["chunks", "text", "stats"])
+
+_PART_RE = re.compile(r"^(?P<base>.*?)\s*\(Part (?P<n>\d+)\)\s*$", re.IGNORECASE)
+MAX_OVERLAP_WORDS = 200
+
+
+def context_budget(model=None):
+    """Context token budget for `model` (default: the model answering questions)."""
+    if CONTEXT_TOKEN_BUDGET:
+        return CONTEXT_TOKEN_BUDGET
+    if model is None:
+        from app.ollama import client as ollama_client
+        model = ollama_client.OPENAI_MODEL if ollama_client.OPENAI_API_KEY else ollama_client.LLM_MODEL
+    return CONTEXT_TOKEN_BUDGETS.get(model, CONTEXT_TOKEN_BUDGETS.get(str(model).split(":")[0], 3000))
+
+
+def _chunk_tokens(c):
+    return count_tokens(f"[{c.title}] {c.content}")
+
+
+def collapse_near_duplicates(chunks, threshold=None):
+    """Drop chunks whose embedding is within `threshold` cosine of a higher-ranked chunk.
+
+    Chunks without an embedding are compared by exact content instead.
+    """
+    threshold = CONTEXT_DEDUP_SIMILARITY if threshold is None else threshold
+    kept, seen_content = [], set()
+    kept_vectors, n_vectors = None, 0  # unit vectors of kept chunks, filled row by row
+    for c in chunks:
+        content = (c.content or "").strip()
+        if content in seen_content:
+            continue
+        v = c.embedding
+        if v is not None and len(v):
+            norm = np.linalg.norm(v)
+            if norm:
+                if kept_vectors is None:
+                    kept_vectors = np.empty((len(chunks), len(v)), dtype=np.float32)
+                if len(v) == kept_vectors.shape[1]:
+                    v = v / norm
+                    if n_vectors and float(np.max(kept_vectors[:n_vectors] @ v)) >= threshold:
+                        continue
+                    kept_vectors[n_vectors] = v
+                    n_vectors += 1
+        seen_content.add(content)
+        kept.append(c)
+    return kept
+
+
+def _join_overlapping(a, b):
+    """Concatenate two consecutive parts, dropping the words `b` repeats from the end of `a`."""
+    a_words, b_words = a.split(), b.split()
+    for k in range(min(len(a_words), len(b_words), MAX_OVERLAP_WORDS), 0, -1):
+        if a_words[-k:] == b_words[:k]:
+            return a.rstrip() + " " + " ".join(b_words[k:]) if k < len(b_words) else a
+    return a.rstrip() + "\n" + b.lstrip()
+
+
+def merge_adjacent_parts(chunks):
+    """Merge consecutive '(Part n)' chunks of the same section into one, at the best-ranked part's position."""
+    groups = {}
+    for rank, c in enumerate(chunks):
+        match = _PART_RE.match(c.title or "")
+        if match:
+            groups.setdefault((c.sop, match.group("base")), []).append((int(match.group("n")), rank))
+    merged_into = {}  # rank -> merged chunk (for the run's first rank), or None (absorbed)
+    merges = 0
+    for (sop, base), parts in groups.items():
+        parts.sort()
+        runs, run = [], [parts[0]]
+        for part in parts[1:]:
+            if part[0] == run[-1][0] + 1:
+                run.append(part)
+            else:
+                runs.append(run)
+                run = [part]
+        runs.append(run)
+        for run in runs:
+            if len(run) < 2:
+                continue
+            content = chunks[run[0][1]].content or ""
+            for _, rank in run[1:]:
+                content = _join_overlapping(content, chunks[rank].content or "")
+            best = min(rank for _, rank in run)
+            merged = chunks[best].replace(title=f"{base} (Parts {run[0][0]}-{run[-1][0]})", content=content, embedding=None)
+            for _, rank in run:
+                merged_into[rank] = merged if rank == best else None
+            merges += len(run) - 1
+    result = []
+    for rank, c in enumerate(chunks):
+        if rank in merged_into:
+            if merged_into[rank] is not None:
+                result.append(merged_into[rank])
+        else:
+            result.append(c)
+    return result, merges
+
+
+def _truncate(c, budget):
+    """`c` with its content cut to whole words so that it fits in `budget` tokens (at least one word)."""
+    words = (c.content or "").split()
+    keep = max(1, int(len(words) * budget / max(_chunk_tokens(c), 1)))
+    while keep > 1 and _chunk_tokens(c.replace(content=" ".join(words[:keep]))) > budget:
+        keep = max(1, int(keep * 0.9))
+    return c.replace(content=" ".join(words[:keep]))
+
+
+def pack_context(chunks, model=None, budget_tokens=None, max_chunks=None, similarity=None):
+    """Pack reranked chunks into the answer-prompt context. Returns PackedContext(chunks, text, stats)."""
+    budget = budget_tokens or context_budget(model)
+    max_chunks = max_chunks or CONTEXT_MAX_CHUNKS
+    chunks = [c for c in chunks if c.content]
+    # What the prompt used to carry: the top chunks joined as-is
+    tokens_before = count_tokens(format_context(chunks[:max_chunks]))
+
+    deduped = collapse_near_duplicates(chunks, similarity)
+    merged, parts_merged = merge_adjacent_parts(deduped)
+
+    packed, used, dropped = [], 0, 0
+    separator = count_tokens("\n\n")
+    if merged:
+        # The top-ranked chunk is always kept, cut down to the budget if it is larger
+        top = merged[0] if _chunk_tokens(merged[0]) <= budget else _truncate(merged[0], budget)
+        packed, used = [top], _chunk_tokens(top)
+    for c in merged[1:]:
+        if len(packed) >= max_chunks:
+            break
+        tokens = _chunk_tokens(c) + separator
+        if used + tokens > budget:
+            dropped += 1
+            continue
+        packed.append(c)
+        used += tokens
+    text = format_context(packed)
+    tokens_after = count_tokens(text)
+    stats = {
+        "budget_tokens": budget,
+        "candidates": len(chunks),
+        "packed_chunks": len(packed),
+        "duplicates_collapsed": len(chunks) - len(deduped),
+        "parts_merged": parts_merged,
+        "dropped_for_budget": dropped,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(tokens_before - tokens_after, 0),
+    }
+    return PackedContext(packed, text, stats)
@@ -0,0 +1,51 @@
+import logging
+import threading
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# --- RAGAS, loaded on demand ---
+# ragas pulls in large ML dependencies, so it is imported on the first
+# evaluation rather than when the API module loads.
+
+_ragas = None  # namespace once imported, False if ragas is not installed
+_ragas_lock = threading.Lock()
+
+
+def load_ragas():
+    """ragas' evaluate() and the metrics we report, or None if ragas is not installed."""
+    global _ragas
+    if _ragas is None:
+        with _ragas_lock:
+            if _ragas is None:
+                try:
+                    from ragas import evaluate
+                    from ragas.metrics import faithfulness, context_relevance, answer_completeness
+                    _ragas = SimpleNamespace(evaluate=evaluate, metrics=[faithfulness, context_relevance, answer_completeness])
+                except ImportError:
+                    logger.info("ragas is not installed; automated evaluation is disabled")
+                    _ragas = False
+    return _ragas or None
+
+
+def ragas_scores(ragas, question, answer, contexts):
+    """faithfulness / context_relevance / completeness for one answer."""
+    return ragas_batch_scores(ragas, [{"question": question, "answer": answer, "contexts": contexts}])[0]
+
+
+def ragas_batch_scores(ragas, samples):
+    """Scores for many {"question", "answer", "contexts"} samples in one evaluate() call, in order."""
+    results = ragas.evaluate(list(samples), metrics=ragas.metrics)
+    return [{
+        "faithfulness": result["faithfulness"],
+        "context_relevance": result["context_relevance"],
+        "completeness": result["answer_completeness"]
+    } for result in results]
+
+
+def score_batch(samples):
+    """Process-pool entry point: import ragas in the worker (once per process) and score a batch."""
+    ragas = load_ragas()
+    if ragas is None:
+        raise RuntimeError("ragas is not installed")
+    return ragas_batch_scores(ragas, samples)
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import numpy as np
+from rapidfuzz import fuzz, process as fuzz_process
+from app.config import SYNONYMS_FILE, SYNONYMS_RELOAD_SECONDS, EXPANSION_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+# --- Synonym query expansion ---
+# The synonym table ({"term": ["synonym", ...]}) is read from SYNONYMS_FILE
+# at warm-up and re-read by a background watcher thread when the file's
+# mtime changes (checked every SYNONYMS_RELOAD_SECONDS). Requests only read
+# the table and vectors last swapped in, never the file or the embedder. A
+# group matches when its term or one of its phrases occurs in the query after
+# light lemmatization ("expanding" -> "expand"), or, for single words, within
+# FUZZY_CUTOFF of a query word. Every phrase is embedded once, in a single
+# batched request, when the table is (re)loaded, so expanding a query costs
+# no embedding calls: the matched phrases are appended to the keyword query
+# and their vectors are averaged into the query vector, and the caller runs
+# one hybrid search instead of one search per variant.
+
+FUZZY_CUTOFF = 85
+FUZZY_MIN_LENGTH = 5  # shorter words only match exactly
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ions", "ion", "ies", "es", "ed", "s")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def lemma(word):
+    """Crude English lemma: strip one inflectional suffix and a trailing 'e' (closing/closed/close -> clos)."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def lemmas(text):
+    return tuple(lemma(w) for w in _WORD_RE.findall((text or "").lower()))
+
+
+class Expansion:
+    __slots__ = ("query", "terms", "phrases", "vectors")
+
+    def __init__(self, query, terms=(), phrases=(), vectors=None):
+        self.query = query
+        self.terms = list(terms)  # matched table terms
+        self.phrases = list(phrases)  # phrases added to the query
+        self.vectors = vectors  # (n, dim) float32 vectors of the phrases that have one, or None
+
+    @property
+    def text(self):
+        """Keyword query: the question plus the matched phrases."""
+        return " ".join([self.query] + self.phrases)
+
+    def fuse(self, query_vector, weight=None):
+        """Query vector blended with the mean synonym vector (unit length), or the query vector unchanged."""
+        if query_vector is None or self.vectors is None:
+            return query_vector
+        weight = EXPANSION_WEIGHT if weight is None else weight
+        q = np.asarray(query_vector, dtype=np.float32)
+        if q.shape[0] != self.vectors.shape[1]:
+            return query_vector
+        q_norm = np.linalg.norm(q)
+        synonyms = self.vectors.mean(axis=0)
+        s_norm = np.linalg.norm(synonyms)
+        if not q_norm or not s_norm:
+            return query_vector
+        fused = (1 - weight) * q / q_norm + weight * synonyms / s_norm
+        return (fused / np.linalg.norm(fused)).tolist()
+
+
+class QueryExpander:
+    def __init__(self, path=None, embed=None, reload_seconds=None):
+        self.path = path or SYNONYMS_FILE
+        self.reload_seconds = SYNONYMS_RELOAD_SECONDS if reload_seconds is None else reload_seconds
+        self._embed = embed
+        self._lock = threading.Lock()  # serializes reloads; expand() never takes it
+        self._mtime = None
+        self._loaded = False
+        # Replaced whole by refresh(), read without locking by expand()
+        self._table = ({}, {}, {})  # (term -> [phrases], lemma tuple -> term, single-word lemma -> term)
+        self._vectors = {}  # phrase -> float32 vector; kept across reloads
+        self._watcher = None
+        self._stop = threading.Event()
+        self.reloads = 0
+
+    def embed(self, texts):
+        if self._embed is None:
+            from app.ollama.client import get_embeddings
+            self._embed = get_embeddings
+        return self._embed(texts)
+
+    # --- Table loading (warm-up and the watcher thread, never a request) ---
+
+    def _load_table(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self._mtime is not None or not self._loaded:
+                logger.warning("Synonym file %s not found; query expansion disabled", self.path)
+            self._table, self._mtime = ({}, {}, {}), None
+            self.reloads += 1
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                table = json.load(f)
+            groups = {str(term).strip().lower(): [str(p).strip().lower() for p in phrases if str(p).strip()]
+                      for term, phrases in table.items()}
+        except (ValueError, AttributeError, TypeError) as e:
+            # Keep serving the previous table until the file is fixed
+            logger.error("Could not parse synonym file %s: %s", self.path, e)
+            self._mtime = mtime
+            return
+        triggers, words = {}, {}
+        for term, phrases in groups.items():
+            for phrase in [term] + phrases:
+                key = lemmas(phrase)
+                if key:
+                    triggers.setdefault(key, term)
+                    if len(key) == 1:
+                        words.setdefault(key[0], term)
+        self._table, self._mtime = (groups, triggers, words), mtime
+        self.reloads += 1
+        logger.info("Loaded %d synonym groups from %s", len(groups), self.path)
+
+    def _embed_missing(self):
+        """Embed phrases without a vector yet, in one request; after a failure the next check retries."""
+        groups = self._table[0]
+        missing = sorted({p for term, phrases in groups.items() for p in [term] + phrases} - set(self._vectors))
+        if not missing:
+            return
+        try:
+            vectors = self.embed(missing)
+        except Exception as e:
+            logger.warning("Could not embed %d synonym phrases, expanding by keywords only: %s", len(missing), e)
+            return
+        updated = dict(self._vectors)
+        for phrase, vector in zip(missing, vectors):
+            updated[phrase] = np.asarray(vector, dtype=np.float32)
+        self._vectors = updated
+
+    def refresh(self):
+        """Reload the table if the file changed and embed new phrases. Called at warm-up and by the watcher."""
+        with self._lock:
+            self._load_table()
+            self._embed_missing()
+            self._loaded = True
+        return self
+
+    def _watch(self):
+        # First load straight away unless warm-up already did it
+        delay = max(self.reload_seconds, 0.1) if self._loaded else 0
+        while not self._stop.wait(delay):
+            delay = max(self.reload_seconds, 0.1)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Synonym reload failed")
+
+    def start(self):
+        """Check the file every reload_seconds in a background thread (idempotent)."""
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stop.clear()
+                self._watcher = threading.Thread(target=self._watch, name="synonyms", daemon=True)
+                self._watcher.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+
+    # --- Matching ---
+
+    @staticmethod
+    def _match_terms(query_lemmas, triggers, words):
+        matched = []
+        for n in sorted({len(key) for key in triggers}, reverse=True):
+            for i in range(len(query_lemmas) - n + 1):
+                term = triggers.get(query_lemmas[i:i + n])
+                if term and term not in matched:
+                    matched.append(term)
+        if words:
+            choices = list(words)
+            for word in query_lemmas:
+                if len(word) < FUZZY_MIN_LENGTH or (word,) in triggers:
+                    continue
+                match = fuzz_process.extractOne(word, choices, scorer=fuzz.ratio, score_cutoff=FUZZY_CUTOFF)
+                if match and words[match[0]] not in matched:
+                    matched.append(words[match[0]])
+        return matched
+
+    def expand(self, query):
+        """The synonym expansion of `query` (empty when no group matches). Only reads the current table."""
+        (groups, triggers, words), vectors = self._table, self._vectors
+        query_lemmas = lemmas(query)
+        terms = self._match_terms(query_lemmas, triggers, words)
+        if not terms:
+            return Expansion(query)
+        present = set(query_lemmas)
+        phrases = []
+        for term in terms:
+            for phrase in [term] + groups.get(term, []):
+                # Skip phrases the query already says
+                if phrase not in phrases and not set(lemmas(phrase)) <= present:
+                    phrases.append(phrase)
+        found = [vectors[p] for p in dict.fromkeys(terms + phrases) if p in vectors]
+        dims = {v.shape[0] for v in found}
+        block = np.stack(found) if found and len(dims) == 1 else None
+        return Expansion(query, terms, phrases, block)
+
+
+_expander = None
+_expander_lock = threading.Lock()
+
+
+def get_query_expander():
+    global _expander
+    if _expander is None:
+        with _expander_lock:
+            if _expander is None:
+                # Loads in the background; until then queries are not expanded
+                _expander = QueryExpander().start()
+    return _expander
@@ -0,0 +1,338 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+import uuid as uuid_module
+from fnmatch import fnmatchcase
+from types import SimpleNamespace
+import numpy as np
+from weaviate.collections.classes.filters import _FilterAnd, _FilterOr, _FilterValue
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- In-process Section index (RETRIEVAL_BACKEND=local) ---
+# The SOP corpus fits in RAM, so hybrid search can run without a network hop:
+# a NumPy vector matrix (memory-mapped when loaded from a snapshot) for cosine
+# similarity and a BM25 inverted index over title + content, fused with
+# `alpha` after min-max normalizing each side (Weaviate's relative-score
+# fusion). Weaviate Filter objects on any property (equal / not_equal /
+# like / contains_any, by_id, and/or) are evaluated against per-property
+# value -> rows maps. hybrid(), fetch_objects() and iterator() take the same
+# arguments and return the same object shape as the Weaviate collection, so
+# callers do not care which one they hold (see app.rag.retrieval).
+# Synced from Weaviate (read replica, refreshed after each ingestion job) or
+# loaded from a snapshot directory (standalone). A rebuild is swapped in
+# atomically, like the SOP catalog.
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_FIELDS = ("title", "content")
+VECTOR_PROPERTY = "embedding"
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it of on or that the this to was what when where which who why with".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(str(text or "").lower()) if t not in _STOPWORDS]
+
+
+class _IndexData:
+    """One immutable build of the index."""
+
+    def __init__(self, uuids, properties, vectors, vector_rows, k1=BM25_K1, b=BM25_B):
+        self.uuids = uuids                      # [uuid.UUID]
+        self.row_of = {str(u): i for i, u in enumerate(uuids)}
+        self.properties = properties            # [dict] without the embedding
+        self.size = len(uuids)
+        self.vectors = vectors                  # (n_vectors, dim) float32, possibly memory-mapped
+        self.vector_rows = vector_rows          # object row -> vector row, -1 when the object has none
+        self.dim = vectors.shape[1] if vectors.ndim == 2 else 0
+        norms = np.linalg.norm(vectors, axis=1) if self.dim else np.zeros(0, dtype=np.float32)
+        self.norms = np.where(norms > 0, norms, 1.0).astype(np.float32)
+        self.k1, self.b = k1, b
+        self._build_bm25()
+        self._value_rows = {}
+        self._lock = threading.Lock()
+
+    def _build_bm25(self):
+        postings = {}
+        doc_len = np.zeros(self.size, dtype=np.float32)
+        for row, props in enumerate(self.properties):
+            counts = {}
+            for field in BM25_FIELDS:
+                for token in tokenize(props.get(field)):
+                    counts[token] = counts.get(token, 0) + 1
+            doc_len[row] = sum(counts.values())
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((row, tf))
+        avgdl = float(doc_len.mean()) if self.size else 0.0
+        # Per-document length normalization is constant per build: fold it in once
+        self._length_norm = self.k1 * (1 - self.b + self.b * doc_len / (avgdl or 1.0))
+        self.postings = {}
+        for token, entries in postings.items():
+            rows = np.fromiter((r for r, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.postings[token] = (rows, tfs, idf)
+
+    def bm25(self, query):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            rows, tfs, idf = posting
+            # Rows are unique within a posting list, so fancy-index accumulation is safe
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + self._length_norm[rows])
+        return scores
+
+    def cosine(self, vector):
+        """Cosine similarity per object row; NaN for objects without a (matching) vector."""
+        scores = np.full(self.size, np.nan, dtype=np.float32)
+        q = np.asarray(vector, dtype=np.float32)
+        if not self.dim or q.shape != (self.dim,):
+            return scores
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0:
+            return scores
+        sims = (self.vectors @ q) / (self.norms * q_norm)
+        has = self.vector_rows >= 0
+        scores[has] = sims[self.vector_rows[has]]
+        return scores
+
+    def value_rows(self, prop):
+        """property value -> row indices, built on first use per property."""
+        rows = self._value_rows.get(prop)
+        if rows is None:
+            with self._lock:
+                grouped = {}
+                for row, props in enumerate(self.properties):
+                    value = props.get(prop)
+                    for v in value if isinstance(value, list) else [value]:
+                        grouped.setdefault(v, []).append(row)
+                rows = {v: np.asarray(r, dtype=np.int64) for v, r in grouped.items()}
+                self._value_rows[prop] = rows
+        return rows
+
+    def mask(self, flt):
+        """Boolean row mask for a Weaviate filter (None = all rows)."""
+        if flt is None:
+            return np.ones(self.size, dtype=bool)
+        if isinstance(flt, (_FilterAnd, _FilterOr)):
+            masks = [self.mask(f) for f in flt.filters]
+            combine = np.logical_and if isinstance(flt, _FilterAnd) else np.logical_or
+            return combine.reduce(masks) if masks else np.ones(self.size, dtype=bool)
+        if not isinstance(flt, _FilterValue):
+            raise ValueError(f"Unsupported filter for the local index: {flt!r}")
+        operator = flt.operator.value
+        out = np.zeros(self.size, dtype=bool)
+        if flt.target == "_id":
+            values = flt.value if isinstance(flt.value, list) else [flt.value]
+            rows = [self.row_of[str(v)] for v in values if str(v) in self.row_of]
+            out[rows] = True
+            return ~out if operator == "NotEqual" else out
+        if not isinstance(flt.target, str):
+            raise ValueError(f"Unsupported filter target for the local index: {flt.target!r}")
+        by_value = self.value_rows(flt.target)
+        if operator in ("Equal", "NotEqual"):
+            rows = by_value.get(flt.value)
+            if rows is not None:
+                out[rows] = True
+            return ~out if operator == "NotEqual" else out
+        if operator == "ContainsAny":
+            for v in flt.value:
+                rows = by_value.get(v)
+                if rows is not None:
+                    out[rows] = True
+            return out
+        if operator == "Like":
+            pattern = str(flt.value).lower()
+            for v, rows in by_value.items():
+                if v is not None and fnmatchcase(str(v).lower(), pattern):
+                    out[rows] = True
+            return out
+        if operator == "IsNull":
+            rows = by_value.get(None)
+            if rows is not None:
+                out[rows] = True
+            return out if flt.value else ~out
+        raise ValueError(f"Unsupported filter operator for the local index: {operator}")
+
+    def view(self, row, return_properties=None, score=None, include_vector=False):
+        props = self.properties[row]
+        want = tuple(props) + (VECTOR_PROPERTY,) if return_properties is None else return_properties
+        out = {}
+        for name in want:
+            if name == VECTOR_PROPERTY:
+                vector_row = self.vector_rows[row]
+                out[name] = self.vectors[vector_row].tolist() if vector_row >= 0 else None
+            elif name in props or return_properties is not None:
+                out[name] = props.get(name)
+        vector = {}
+        if include_vector and self.vector_rows[row] >= 0:
+            vector = {"default": self.vectors[self.vector_rows[row]].tolist()}
+        return SimpleNamespace(uuid=self.uuids[row], properties=out, metadata=SimpleNamespace(score=score), vector=vector)
+
+
+def _min_max(values):
+    low, high = float(values.min()), float(values.max())
+    if high <= low:
+        return np.where(values > 0, 1.0, 0.0).astype(np.float32) if high > 0 else np.zeros_like(values)
+    return (values - low) / (high - low)
+
+
+class LocalSectionIndex:
+    def __init__(self):
+        self._data = None
+        self.loaded_at = None
+        self.source = None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def size(self):
+        return self._data.size if self._data else 0
+
+    def _swap(self, data, source, started):
+        self._data = data
+        self.loaded_at = time.time()
+        self.source = source
+        logger.info("Local index loaded from %s: %d objects, %d vectors (dim %d), %d terms in %.2fs",
+                    source, data.size, len(data.vectors), data.dim, len(data.postings), time.perf_counter() - started)
+        return self
+
+    def load_rows(self, rows, source="rows"):
+        """Build from (uuid, properties) pairs; vectors come from the `embedding` property."""
+        started = time.perf_counter()
+        uuids, properties, vectors, vector_rows = [], [], [], []
+        dim = None
+        for obj_uuid, props in rows:
+            props = dict(props)
+            vector = props.pop(VECTOR_PROPERTY, None)
+            if vector and dim is None:
+                dim = len(vector)
+            if vector and len(vector) == dim:
+                vector_rows.append(len(vectors))
+                vectors.append(vector)
+            else:
+                vector_rows.append(-1)
+            uuids.append(obj_uuid if isinstance(obj_uuid, uuid_module.UUID) else uuid_module.UUID(str(obj_uuid)))
+            properties.append(props)
+        matrix = np.asarray(vectors, dtype=np.float32) if vectors else np.zeros((0, dim or 0), dtype=np.float32)
+        return self._swap(_IndexData(uuids, properties, matrix, np.asarray(vector_rows, dtype=np.int64)), source, started)
+
+    def load_from_client(self, client, cache_size=1000):
+        """Sync from the Weaviate Section collection with the cursor iterator."""
+        from app.weaviate_client.snapshot import _default_vector
+        rows = []
+        for obj in client.collections.get("Section").iterator(include_vector=True, cache_size=cache_size):
+            props = dict(obj.properties)
+            if not props.get(VECTOR_PROPERTY):
+                props[VECTOR_PROPERTY] = _default_vector(obj)
+            rows.append((obj.uuid, props))
+        metrics.record_weaviate("iterator", len(rows) // cache_size + 1)
+        return self.load_rows(rows, source="weaviate")
+
+    def load_snapshot(self, snapshot_dir):
+        """Load a snapshot written by app.weaviate_client.snapshot; the vector matrix stays memory-mapped."""
+        import json
+        from app.weaviate_client.snapshot import MANIFEST, VECTORS, _iter_metadata
+        started = time.perf_counter()
+        with open(os.path.join(snapshot_dir, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        vectors = np.load(os.path.join(snapshot_dir, VECTORS), mmap_mode="r")
+        if vectors.dtype != np.float32:
+            # float16 snapshots are widened once; matmul on float16 is slow
+            vectors = vectors.astype(np.float32)
+        uuids, properties, vector_rows = [], [], []
+        for row in _iter_metadata(snapshot_dir, manifest["metadata_format"]):
+            props = row["properties"]
+            props.pop(manifest.get("vector_property", VECTOR_PROPERTY), None)
+            uuids.append(uuid_module.UUID(row["uuid"]))
+            properties.append(props)
+            vector_rows.append(-1 if row.get("vector_row") is None else row["vector_row"])
+        data = _IndexData(uuids, properties, vectors, np.asarray(vector_rows, dtype=np.int64))
+        return self._swap(data, f"snapshot {snapshot_dir}", started)
+
+    def refresh(self, client=None):
+        """Re-sync from Weaviate after ingestion. Failures keep the previous index."""
+        from app.weaviate_client.client import get_client
+        own_client = client is None
+        try:
+            client = client or get_client()
+            self.load_from_client(client)
+        except Exception as e:
+            logger.warning("Refresh failed, keeping previous local index: %s", e)
+        finally:
+            if own_client and client is not None:
+                client.close()
+
+    # --- Collection-compatible query interface ---
+
+    def hybrid(self, query, vector=None, alpha=0.75, limit=10, filters=None, return_properties=None, **kwargs):
+        """alpha=0 is pure BM25 (only keyword matches), alpha=1 pure vector search."""
+        data = self._data
+        with metrics.stage("local_index.hybrid"):
+            mask = data.mask(filters)
+            use_vector = vector is not None and alpha > 0
+            keyword = data.bm25(query) if alpha < 1 else np.zeros(data.size, dtype=np.float32)
+            eligible = mask & (keyword > 0)
+            fused = (1 - alpha) * keyword
+            if use_vector:
+                semantic = data.cosine(vector)
+                has_vector = ~np.isnan(semantic)
+                eligible |= mask & has_vector
+                candidates = np.flatnonzero(eligible)
+                if candidates.size:
+                    sem = np.where(has_vector[candidates], semantic[candidates], 0.0)
+                    kw = _min_max(keyword[candidates]) if alpha < 1 else 0.0
+                    fused = np.zeros(data.size, dtype=np.float32)
+                    fused[candidates] = alpha * _min_max(sem) + (1 - alpha) * kw
+            else:
+                candidates = np.flatnonzero(eligible)
+                if candidates.size:
+                    fused = np.zeros(data.size, dtype=np.float32)
+                    fused[candidates] = _min_max(keyword[candidates])
+            top = candidates
+            if candidates.size > limit:
+                top = candidates[np.argpartition(-fused[candidates], limit - 1)[:limit]]
+            top = top[np.argsort(-fused[top], kind="stable")]
+            objects = [data.view(row, return_properties, float(fused[row])) for row in top]
+        metrics.trace_count("local_index_searches")
+        return SimpleNamespace(objects=objects)
+
+    def near_vector(self, near_vector, limit=10, filters=None, return_properties=None, **kwargs):
+        return self.hybrid("", vector=near_vector, alpha=1.0, limit=limit, filters=filters, return_properties=return_properties)
+
+    def fetch_objects(self, filters=None, limit=None, return_properties=None, include_vector=False, **kwargs):
+        data = self._data
+        rows = np.flatnonzero(data.mask(filters))
+        if limit is not None:
+            rows = rows[:limit]
+        metrics.trace_count("local_index_searches")
+        return SimpleNamespace(objects=[data.view(row, return_properties, include_vector=include_vector) for row in rows])
+
+    def iterator(self, return_properties=None, include_vector=False, cache_size=None):
+        data = self._data
+        for row in range(data.size):
+            yield data.view(row, return_properties, include_vector=include_vector)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_local_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LocalSectionIndex()
+    return _index
@@ -0,0 +1,56 @@
+import logging
+from app.config import RETRIEVAL_BACKEND, LOCAL_INDEX_SNAPSHOT
+from app.rag.local_index import get_local_index
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Section search backend selection ---
+# Callers search through section_search(...): hybrid() and fetch_objects()
+# with Weaviate's arguments and result shape. RETRIEVAL_BACKEND=local serves
+# them from the in-process index (app.rag.local_index) once it is loaded and
+# falls back to Weaviate until then; the default is Weaviate.
+
+
+class WeaviateSectionSearch:
+    """The Weaviate Section collection's query interface, counting round trips."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def hybrid(self, **kwargs):
+        result = self.collection.query.hybrid(**kwargs)
+        metrics.record_weaviate("hybrid")
+        return result
+
+    def fetch_objects(self, **kwargs):
+        result = self.collection.query.fetch_objects(**kwargs)
+        metrics.record_weaviate("fetch_objects")
+        return result
+
+
+def local_index_enabled():
+    return RETRIEVAL_BACKEND == "local"
+
+
+def section_search(get_client):
+    """Search backend for this request. get_client is only called when Weaviate serves the request,
+    so a standalone local index needs no connection."""
+    if local_index_enabled():
+        index = get_local_index()
+        if index.loaded:
+            return index
+    return WeaviateSectionSearch(get_client().collections.get("Section"))
+
+
+def sync_local_index(client=None):
+    """Startup load: from LOCAL_INDEX_SNAPSHOT when set, else from Weaviate. Returns the index."""
+    index = get_local_index()
+    if LOCAL_INDEX_SNAPSHOT:
+        try:
+            index.load_snapshot(LOCAL_INDEX_SNAPSHOT)
+        except Exception as e:
+            logger.error("Could not load local index snapshot %s: %s", LOCAL_INDEX_SNAPSHOT, e)
+    else:
+        index.refresh(client)
+    return index
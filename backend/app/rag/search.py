@@ -0,0 +1,51 @@
+from functools import lru_cache
+
+# --- Shared retrieval helpers for /rag/query and the agent tools ---
+
+SECTION_PROPERTIES = ["title", "content", "section", "summary", "sop", "tags", "embedding", "department"]
+
+def format_context(chunks):
+    return "\n\n".join(f"[{c.title}] {c.content}" for c in chunks if c.content)
+
+# --- Access control utility ---
+def user_roles(user_ctx):
+    """Lowercased role set of a user context ("role" may be a string or a list)."""
+    roles = (user_ctx or {}).get("role")
+    if isinstance(roles, list):
+        return frozenset(str(r).lower() for r in roles)
+    return frozenset([roles.lower()]) if roles else frozenset()
+
+
+class UserContext(dict):
+    """A user profile with its role set compiled once (see app.profile_store)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.roles = user_roles(self)
+
+
+@lru_cache(maxsize=4096)
+def parse_tags(tags):
+    """Comma-separated tag string -> lowercased tag set; the distinct tag strings in a corpus are few."""
+    return frozenset(t.strip().lower() for t in tags.split(",") if t.strip())
+
+
+def filter_by_access(chunks, user_ctx):
+    roles = user_ctx.roles if isinstance(user_ctx, UserContext) else user_roles(user_ctx)
+    filtered = []
+    for c in chunks:
+        tags = c.tags
+        # Patch: treat None or empty tags as public
+        if not tags:
+            filtered.append(c)
+            continue
+        if isinstance(tags, str):
+            tags = parse_tags(tags)
+        elif isinstance(tags, list):
+            tags = {str(t).lower() for t in tags}
+        else:
+            tags = ()
+        # If tags is now empty, treat as public
+        if not tags or roles.intersection(tags):
+            filtered.append(c)
+    return filtered
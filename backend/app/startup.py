@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from app.weaviate_client.client import get_client, create_schema
+from app.rag.catalog import get_catalog
+from app.rag.expansion import get_query_expander
+from app.rag.retrieval import local_index_enabled, sync_local_index
+from app.config import LOCAL_INDEX_SNAPSHOT, STARTUP_RETRY_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# --- Background warm-up and readiness ---
+# The server accepts connections immediately (/health = liveness) while a
+# background thread loads the synonym table, checks the schema, loads the SOP
+# catalog and, with RETRIEVAL_BACKEND=local, the local index. /ready reports
+# 503 until that has succeeded; failures (e.g. Weaviate still starting) are
+# retried with exponential backoff up to STARTUP_RETRY_MAX_SECONDS between
+# attempts.
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.checks = {}
+        self.error = None
+        self.attempts = 0
+        self.started_at = None
+        self.ready_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def to_dict(self):
+        out = {"status": "ready" if self.ready else "starting", "checks": dict(self.checks), "attempts": self.attempts}
+        if self.ready:
+            out["warm_up_seconds"] = round(self.ready_at - self.started_at, 3)
+        elif self.error:
+            out["error"] = self.error
+        return out
+
+    def _check(self, name, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.checks[name] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+        return result
+
+    def warm_up(self):
+        # Synonym table and phrase vectors for query expansion (the watcher keeps them current);
+        # an embedding outage only disables the vectors
+        self._check("synonyms", lambda: get_query_expander().refresh().start())
+        if local_index_enabled() and LOCAL_INDEX_SNAPSHOT:
+            # Standalone: searches and the SOP catalog are served from the snapshot, no Weaviate connection
+            index = self._check("local_index", sync_local_index)
+            if not index.loaded:
+                raise RuntimeError(f"local index snapshot {LOCAL_INDEX_SNAPSHOT} could not be loaded")
+            self._check("catalog", lambda: get_catalog().load(collection=index))
+            return
+        client = self._check("weaviate", get_client)
+        try:
+            self._check("schema", lambda: create_schema(client))
+            # SOP catalog for the agent's LIST_SOPS / GET_SOP_SECTION tools
+            self._check("catalog", lambda: get_catalog().load(client))
+            if local_index_enabled():
+                self._check("local_index", lambda: get_local_index_loaded(client))
+        finally:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = min(1.0, STARTUP_RETRY_MAX_SECONDS)
+        while not self._stop.is_set():
+            self.attempts += 1
+            try:
+                self.warm_up()
+            except Exception as e:
+                self.error = f"{e.__class__.__name__}: {e}"
+                logger.warning("Warm-up attempt %d failed (%s); retrying in %.0fs", self.attempts, self.error, delay)
+                if self._stop.wait(delay):
+                    return
+                delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
+                continue
+            self.ready, self.error, self.ready_at = True, None, time.perf_counter()
+            logger.info("Ready after %.2fs (%d attempt(s))", self.ready_at - self.started_at, self.attempts)
+            return
+
+    def start(self):
+        """Run warm-up in a background thread; returns immediately."""
+        self.started_at = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def get_local_index_loaded(client):
+    index = sync_local_index(client)
+    if not index.loaded:
+        raise RuntimeError("local index could not be synced from Weaviate")
+    return index
+
+
+readiness = Readiness()
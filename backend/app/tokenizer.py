@@ -0,0 +1,37 @@
+import logging
+import re
+import threading
+from app.config import TOKENIZER_ENCODING
+
+logger = logging.getLogger(__name__)
+
+# Shared token counter. tiktoken is used when its encoding can be loaded (it is
+# downloaded on first use); otherwise a word/punctuation count is a close
+# enough estimate for budgeting.
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception as e:
+                    logger.warning("tiktoken unavailable (%s), using word-count estimate", e.__class__.__name__)
+                    _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_WORD_RE.findall(text))
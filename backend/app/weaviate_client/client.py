@@ -1,7 +1,10 @@
+import logging
 import weaviate
 from weaviate.exceptions import WeaviateBaseError
 from weaviate.collections.classes.config import DataType
 
+logger = logging.getLogger(__name__)
+
 WEAVIATE_HOST = "localhost"
 WEAVIATE_PORT = 8080
 WEAVIATE_GRPC_PORT = 50051
@@ -37,15 +40,15 @@ SCHEMA = [
 def create_schema(client):
     for name, properties in SCHEMA:
         try:
-            print(f"[Weaviate] Checking collection: {name}")
+            logger.debug("Checking collection: %s", name)
             if not client.collections.exists(name):
-                print(f"[Weaviate] Creating collection: {name} with properties: {properties}")
+                logger.info("Creating collection: %s with properties: %s", name, [p["name"] for p in properties])
                 client.collections.create(name, properties=properties)
-                print(f"[Weaviate] Created collection: {name}")
+                logger.info("Created collection: %s", name)
             else:
-                print(f"[Weaviate] Collection already exists: {name}")
+                logger.debug("Collection already exists: %s", name)
         except Exception as e:
-            print(f"[Weaviate] Schema error for {name}: {e}")
+            logger.error("Schema error for %s: %s", name, e)
 
 # --- Migration helper ---
 def migrate_section_schema(client):
@@ -56,20 +59,20 @@ def migrate_section_schema(client):
     missing = desired_fields - existing_fields
     for field in missing:
         prop = next(p for p in SCHEMA[2][1] if p["name"] == field)
-        print(f"[Weaviate] Adding missing field to Section: {field}")
+        logger.info("Adding missing field to Section: %s", field)
         collection.config.add_property(prop)
-    print(f"[Weaviate] Section schema migration complete. Now has: {[p.name for p in collection.config.properties]}")
+    logger.info("Section schema migration complete. Now has: %s", [p.name for p in collection.config.properties])
 
 def recreate_section_collection(client):
     """Drop and re-create the Section collection with the upgraded schema."""
     name = "Section"
     if client.collections.exists(name):
-        print(f"[Weaviate] Dropping existing collection: {name}")
+        logger.info("Dropping existing collection: %s", name)
         client.collections.delete(name)
     props = [p for p in SCHEMA[2][1]]
-    print(f"[Weaviate] Creating collection: {name} with properties: {props}")
+    logger.info("Creating collection: %s with properties: %s", name, [p["name"] for p in props])
     client.collections.create(name, properties=props)
-    print(f"[Weaviate] Created collection: {name}")
+    logger.info("Created collection: %s", name)
 # Usage: from app.weaviate_client.client import get_client, recreate_section_collection; recreate_section_collection(get_client())
 
 # Example CRUD operation: add a department
@@ -0,0 +1,220 @@
+"""Export/import the Section collection as a compact snapshot, without re-embedding.
+
+Snapshot layout (one directory):
+    manifest.json     counts, vector dim/dtype, metadata format
+    metadata.jsonl    one row per object: uuid, properties (minus the embedding), vector row
+    metadata.parquet  same rows when exported with --format parquet (needs pyarrow)
+    vectors.npy       float32/float16 matrix of embeddings, loaded back memory-mapped
+
+Usage (from backend/):
+    python -m app.weaviate_client.snapshot export snapshots/2025-07-01 [--dtype float16] [--format parquet]
+    python -m app.weaviate_client.snapshot import snapshots/2025-07-01 [--batch-size 200] [--recreate]
+"""
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+from app.weaviate_client.client import get_client, create_schema, recreate_section_collection
+from app.log import setup_logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "Section"
+VECTOR_PROPERTY = "embedding"
+MANIFEST = "manifest.json"
+VECTORS = "vectors.npy"
+EXPORT_BATCH_ROWS = 1000
+COPY_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def _default_vector(obj):
+    vector = getattr(obj, "vector", None)
+    if isinstance(vector, dict):
+        return vector.get("default")
+    return vector
+
+
+def _write_npy_from_raw(raw_path, npy_path, rows, dim, dtype):
+    """Prepend an .npy header to the raw row-major data streamed during export."""
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": (rows, dim)}
+    with open(npy_path, "wb") as out, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(raw, out, COPY_BLOCK_BYTES)
+
+
+class _MetadataWriter:
+    def __init__(self, out_dir, fmt):
+        if fmt == "parquet" and pyarrow is None:
+            raise RuntimeError("Parquet export requires pyarrow ('pip install pyarrow'); use --format jsonl")
+        self.fmt = fmt
+        self.path = os.path.join(out_dir, f"metadata.{fmt}")
+        self._rows = []
+        self._parquet = None
+        self._jsonl = open(self.path, "w", encoding="utf-8") if fmt == "jsonl" else None
+
+    def write(self, row):
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            return
+        # Properties are stored as a JSON string column so the Parquet schema stays fixed
+        self._rows.append({"uuid": row["uuid"], "vector_row": row["vector_row"], "properties": json.dumps(row["properties"], ensure_ascii=False, default=str)})
+        if len(self._rows) >= EXPORT_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        table = pyarrow.Table.from_pylist(self._rows)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema)
+        self._parquet.write_table(table)
+        self._rows = []
+
+    def close(self):
+        if self._jsonl is not None:
+            self._jsonl.close()
+            return
+        self._flush()
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def _iter_metadata(snapshot_dir, fmt):
+    path = os.path.join(snapshot_dir, f"metadata.{fmt}")
+    if fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    if pyarrow is None:
+        raise RuntimeError("This snapshot has Parquet metadata; install pyarrow to import it")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=EXPORT_BATCH_ROWS):
+        for row in batch.to_pylist():
+            row["properties"] = json.loads(row["properties"])
+            yield row
+
+
+def export_snapshot(out_dir, client=None, dtype="float32", fmt="jsonl", cache_size=500):
+    """Stream the Section collection to `out_dir` with the cursor iterator. Returns the manifest."""
+    client = client or get_client()
+    collection = client.collections.get(COLLECTION)
+    os.makedirs(out_dir, exist_ok=True)
+    raw_path = os.path.join(out_dir, VECTORS + ".raw")
+    writer = _MetadataWriter(out_dir, fmt)
+    objects = 0
+    rows = 0
+    dim = None
+    object_vectors = False
+    start = time.perf_counter()
+    try:
+        with open(raw_path, "wb") as raw:
+            for obj in collection.iterator(include_vector=True, cache_size=cache_size):
+                props = dict(obj.properties)
+                vector = props.pop(VECTOR_PROPERTY, None)
+                default_vector = _default_vector(obj)
+                if default_vector:
+                    object_vectors = True
+                    vector = vector or default_vector
+                vector_row = None
+                if vector:
+                    if dim is None:
+                        dim = len(vector)
+                    if len(vector) == dim:
+                        raw.write(np.asarray(vector, dtype=dtype).tobytes())
+                        vector_row = rows
+                        rows += 1
+                    else:
+                        logger.warning("Skipping vector of dim %d (expected %d) for %s", len(vector), dim, obj.uuid)
+                writer.write({"uuid": str(obj.uuid), "properties": props, "vector_row": vector_row})
+                objects += 1
+    finally:
+        writer.close()
+    _write_npy_from_raw(raw_path, os.path.join(out_dir, VECTORS), rows, dim or 0, dtype)
+    os.unlink(raw_path)
+    elapsed = time.perf_counter() - start
+
+    manifest = {
+        "collection": COLLECTION,
+        "objects": objects,
+        "vectors": rows,
+        "dim": dim or 0,
+        "dtype": np.dtype(dtype).name,
+        "metadata_format": fmt,
+        "vector_property": VECTOR_PROPERTY,
+        "object_vectors": object_vectors,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    size_mb = sum(os.path.getsize(os.path.join(out_dir, n)) for n in os.listdir(out_dir)) / 1e6
+    logger.info("Exported %d objects (%d vectors, dim=%s) to %s in %.1fs: %.0f objects/s, %.1f MB",
+                objects, rows, dim, out_dir, elapsed, objects / max(elapsed, 1e-9), size_mb)
+    return manifest
+
+
+def import_snapshot(snapshot_dir, client=None, batch_size=200, recreate=False):
+    """Bulk-load a snapshot into the Section collection with batch inserts. Returns the number of failed objects."""
+    with open(os.path.join(snapshot_dir, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    client = client or get_client()
+    if recreate:
+        recreate_section_collection(client)
+    else:
+        create_schema(client)
+    collection = client.collections.get(manifest["collection"])
+    vectors = np.load(os.path.join(snapshot_dir, VECTORS), mmap_mode="r")
+    vector_property = manifest.get("vector_property", VECTOR_PROPERTY)
+
+    objects = 0
+    start = time.perf_counter()
+    with collection.batch.fixed_size(batch_size=batch_size) as batch:
+        for row in _iter_metadata(snapshot_dir, manifest["metadata_format"]):
+            props = row["properties"]
+            vector = None
+            if row.get("vector_row") is not None:
+                vector = vectors[row["vector_row"]].astype(np.float32).tolist()
+                props[vector_property] = vector
+            batch.add_object(
+                properties=props,
+                uuid=row["uuid"],
+                vector=vector if manifest.get("object_vectors") else None,
+            )
+            objects += 1
+    elapsed = time.perf_counter() - start
+    failed = len(collection.batch.failed_objects)
+    logger.info("Imported %d/%d objects from %s in %.1fs: %.0f objects/s",
+                objects - failed, objects, snapshot_dir, elapsed, objects / max(elapsed, 1e-9))
+    return failed
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export/import the Section collection without re-embedding.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export")
+    exp.add_argument("path")
+    exp.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    exp.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    imp = sub.add_parser("import")
+    imp.add_argument("path")
+    imp.add_argument("--batch-size", type=int, default=200)
+    imp.add_argument("--recreate", action="store_true", help="drop and re-create Section before loading")
+    args = parser.parse_args()
+    setup_logging()
+    client = get_client()
+    try:
+        if args.command == "export":
+            export_snapshot(args.path, client, dtype=args.dtype, fmt=args.format)
+        else:
+            import_snapshot(args.path, client, batch_size=args.batch_size, recreate=args.recreate)
+    finally:
+        client.close()
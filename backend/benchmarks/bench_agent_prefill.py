@@ -0,0 +1,144 @@
+"""Measure prompt prefill in the agentic loop: stateless /api/generate prompts vs. one chat session.
+
+Runs the same scripted agent trace (SEARCH, SEARCH, FINAL_ANSWER) through
+  - legacy:  the pre-session loop, rebuilding preamble + context for every step
+  - session: app.api.rag._run_agent_loop using ChatSession over /api/chat
+against benchmarks/stub_ollama.py, which emulates Ollama's KV-cache prefix reuse
+and counts the tokens each request actually had to prefill.
+
+Usage (from backend/):
+    python benchmarks/bench_agent_prefill.py [--chunk-words 150] [--top-k 10] [--prefill-rate 400] [--simulate]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_ollama import StubOllama
+
+ACTIONS = [
+    '{"action": "SEARCH", "input": "client handover checklist"}',
+    '{"action": "SEARCH", "input": "handover sign-off approvals"}',
+    '{"action": "FINAL_ANSWER", "input": "ready"}',
+]
+ANSWER = "The handover requires a joint walkthrough, a signed checklist and key transfer. " * 6
+
+
+class ScriptedResponder:
+    def __init__(self):
+        self.step = 0
+
+    def __call__(self, kind, prompt, request):
+        if kind == "generate":
+            is_action = prompt.startswith("You are an expert assistant")
+        else:
+            last = request["messages"][-1]["content"]
+            is_action = last.startswith("Question:") or last.startswith("Observation")
+        if not is_action:
+            return ANSWER
+        action = ACTIONS[min(self.step, len(ACTIONS) - 1)]
+        self.step += 1
+        if kind == "generate":
+            # The legacy loop only understands the "ACTION: input" line format
+            return "{action}: {input}".format(**json.loads(action))
+        return action
+
+
+class FakeTools:
+    def __init__(self, top_k, chunk_words):
+        body = " ".join(f"word{i}" for i in range(chunk_words))
+        self.top_k = top_k
+        self.body = body
+        self.cache_hits = 0
+
+    def expired(self):
+        return False
+
+    def search(self, query):
+        return [{"title": f"{query} {i}", "content": f"{query} result {i}: {self.body}", "tags": ""} for i in range(self.top_k)]
+
+    def list_sops(self, filter_str):
+        return []
+
+    def get_sop_section(self, sop, section):
+        return []
+
+
+def legacy_agent_loop(question, tools, max_steps, get_llm_completion):
+    """The stateless loop as it was before chat sessions (prompt text kept verbatim)."""
+    last_context_chunks = []
+    for step in range(max_steps):
+        agent_prompt = (
+            "You are an expert assistant with access to a knowledge base of Standard Operating Procedures (SOPs). "
+            "Your job is to answer user questions by searching, synthesizing, and summarizing information from the SOPs. "
+            "You can use the following tools: SEARCH (to find relevant SOP content), SUMMARIZE (to synthesize an answer), FINAL_ANSWER (to provide the final answer), LIST_SOPS (to list available SOPs), and GET_SOP_SECTION (to fetch a specific SOP section). "
+            "Always ground your answers in the provided SOP context. If the answer is not directly in the context, combine related information, reason step by step, and suggest best practices or next steps. "
+            "Do NOT just echo the search or say 'I could not find an answer.' "
+            "Be concise, assertive, and use bullet points or stepwise instructions when possible.\n"
+            f"Question: {question}\n"
+            "You can issue actions in the following format:\n"
+            "SEARCH: <query>\nSUMMARIZE: <text>\nLIST_SOPS: <filter>\nGET_SOP_SECTION: <sop>, <section>\nFINAL_ANSWER: <answer>\n"
+            "If you need to look up information, use SEARCH. Use LIST_SOPS to see available SOPs. Use GET_SOP_SECTION to fetch a specific SOP section. When ready, use FINAL_ANSWER.\n"
+            f"First, SEARCH: {question}"
+        )
+        if step > 0 and last_context_chunks:
+            context_str = "\n\n".join(f"[{c['title']}] {c['content']}" for c in last_context_chunks if c.get('content'))
+            agent_prompt += f"\n\nHere are the most relevant SOP sections I found:\n{context_str}\n"
+        llm_out = get_llm_completion(agent_prompt)
+        if llm_out.startswith("SEARCH:"):
+            last_context_chunks = tools.search(llm_out[7:].strip())
+        else:
+            context_str = "\n\n".join(f"[{c['title']}] {c['content']}" for c in last_context_chunks if c.get('content'))
+            get_llm_completion(f"Based on the following context, answer the user's question as thoroughly and in as much detail as possible.\n{context_str}\n\nQuestion: {question}\nAnswer:", max_tokens=2048)
+            break
+    get_llm_completion("Summarize the following agent reasoning steps in detail for the user.\nSteps:\n...", max_tokens=512)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-words", type=int, default=150)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--max-steps", type=int, default=5)
+    parser.add_argument("--prefill-rate", type=float, default=400.0, help="prefill tokens/s used to estimate (or simulate) prefill time")
+    parser.add_argument("--simulate", action="store_true", help="make the stub sleep for prefill so wall time reflects it")
+    args = parser.parse_args()
+
+    responder = ScriptedResponder()
+    stub = StubOllama(responder=responder, prefill_tokens_per_sec=args.prefill_rate if args.simulate else None)
+    url = stub.start()
+    from app.ollama import client as ollama_client
+    ollama_client.OLLAMA_URL = url
+    ollama_client.OPENAI_API_KEY = None
+    from app.api import rag
+
+    question = "What is the process for handing over a space to the client?"
+    tools = FakeTools(args.top_k, args.chunk_words)
+    results = {}
+    for name in ("legacy", "session"):
+        stub.reset_stats()
+        responder.step = 0
+        start = time.perf_counter()
+        usage = {}
+        if name == "legacy":
+            legacy_agent_loop(question, tools, args.max_steps, ollama_client.get_llm_completion)
+        else:
+            usage = rag._run_agent_loop(question, {}, args.max_steps, tools, [])[3]
+        elapsed = time.perf_counter() - start
+        results[name] = dict(stub.stats, seconds=elapsed, usage=usage)
+    stub.stop()
+
+    print(f"\n{'mode':>8} {'calls':>6} {'prompt tok':>11} {'prefilled':>10} {'cached':>8} {'est. prefill s':>15} {'wall s':>7}")
+    for name, r in results.items():
+        print(f"{name:>8} {r['requests']:>6} {r['prompt_tokens']:>11} {r['prefill_tokens']:>10} {r['cached_tokens']:>8} "
+              f"{r['prefill_tokens'] / args.prefill_rate:>15.2f} {r['seconds']:>7.2f}")
+    saved = results["legacy"]["prefill_tokens"] - results["session"]["prefill_tokens"]
+    usage = results["session"]["usage"]
+    print(f"\nSession: max prompt {usage['max_prompt_tokens']}/{usage['prompt_budget_tokens']} tokens, "
+          f"{usage['compactions']} observation compactions, {usage['wasted_generations']} wasted generations")
+    print(f"Prefill saved per request: {saved} tokens (~{saved / args.prefill_rate:.2f}s at {args.prefill_rate:.0f} tok/s)")
+
+
+if __name__ == "__main__":
+    main()
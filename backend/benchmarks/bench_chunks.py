@@ -0,0 +1,163 @@
+"""Benchmark the slotted Chunk pipeline against the old candidate dicts.
+
+Usage (from backend/):
+    python benchmarks/bench_chunks.py [--top-k 10] [--result-sets 3] [--dim 768] [--requests 200]
+
+A request here is the retrieval half of /rag/query on synthetic search
+results: shape `--result-sets` result sets of `--top-k` objects (one per
+search the request ran: vector, keyword, synonym fallback), apply access control,
+collapse near-duplicates and build the response matches. The Weaviate objects
+(with their embedding lists) are built outside the timed region, since both
+paths receive them from the client. Reported per request: latency, bytes
+allocated by the pipeline (tracemalloc peak above the search results) and
+bytes still held by the candidates once the search results are released
+(what the agent tools keep memoized across steps).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+import uuid
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import numpy as np
+from app.rag.chunk import to_chunks
+from app.rag.context import collapse_near_duplicates
+from app.rag.search import UserContext, filter_by_access, parse_tags
+
+THRESHOLD = 0.95
+
+
+def make_results(result_sets, top_k, dim, seed):
+    rng = random.Random(seed)
+    sets = []
+    for s in range(result_sets):
+        objects = []
+        for i in range(top_k):
+            props = {
+                "title": f"Section {s}-{i}", "content": "Confirm the requirement with the client. " * 40,
+                "section": f"Section {i}", "summary": "Short summary.", "sop": f"SOP {i % 4}",
+                "tags": "" if i % 3 else "finance, hr", "department": "BDM",
+                "embedding": [rng.uniform(-1, 1) for _ in range(dim)],
+            }
+            objects.append(types.SimpleNamespace(uuid=uuid.UUID(int=rng.getrandbits(128)), properties=props,
+                                                 metadata=types.SimpleNamespace(score=rng.random())))
+        sets.append(objects)
+    return sets
+
+
+# --- The previous dict-based pipeline ---
+
+def legacy_to_candidate(obj):
+    return {
+        "uuid": str(obj.uuid) if getattr(obj, "uuid", None) else None,
+        "title": obj.properties.get("title"),
+        "content": obj.properties.get("content"),
+        "section": obj.properties.get("section"),
+        "summary": obj.properties.get("summary"),
+        "sop": obj.properties.get("sop"),
+        "tags": obj.properties.get("tags"),
+        "embedding": obj.properties.get("embedding"),
+        "score": getattr(obj.metadata, "score", None) if obj.metadata else None
+    }
+
+
+def legacy_filter_by_access(chunks, user_ctx):
+    roles = user_ctx.roles
+    filtered = []
+    for c in chunks:
+        tags = c.get("tags")
+        if not tags or roles.intersection(parse_tags(tags)):
+            filtered.append(c)
+    return filtered
+
+
+def legacy_collapse(chunks, threshold):
+    kept, kept_vectors, seen_content = [], [], set()
+    for c in chunks:
+        content = (c.get("content") or "").strip()
+        vector = c.get("embedding")
+        if vector:
+            v = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(v)
+            if norm:
+                v = v / norm
+                if kept_vectors and len(kept_vectors[0]) == len(v) and float(np.max(np.stack(kept_vectors) @ v)) >= threshold:
+                    continue
+                kept_vectors.append(v)
+        seen_content.add(content)
+        kept.append(c)
+    return kept
+
+
+def legacy_request(result_sets, user_ctx):
+    candidates = []
+    for objects in result_sets:
+        candidates.extend(legacy_to_candidate(obj) for obj in objects)
+    candidates = legacy_filter_by_access(candidates, user_ctx)
+    kept = legacy_collapse(candidates, THRESHOLD)
+    matches = [{"title": c["title"], "content": c["content"]} for c in kept]
+    return candidates, matches
+
+
+def chunk_request(result_sets, user_ctx):
+    candidates = []
+    for objects in result_sets:
+        candidates.extend(to_chunks(objects))
+    candidates = filter_by_access(candidates, user_ctx)
+    kept = collapse_near_duplicates(candidates, THRESHOLD)
+    matches = [{"title": c.title, "content": c.content} for c in kept]
+    return candidates, matches
+
+
+def measure(pipeline, args, user_ctx):
+    latencies, allocated, retained = [], [], []
+    for r in range(args.requests):
+        result_sets = make_results(args.result_sets, args.top_k, args.dim, seed=r)
+        started = time.perf_counter()
+        pipeline(result_sets, user_ctx)
+        latencies.append(time.perf_counter() - started)
+    for r in range(min(args.requests, 20)):
+        # Trace from before the search results exist, so memory they share with the candidates counts as retained
+        tracemalloc.start()
+        result_sets = make_results(args.result_sets, args.top_k, args.dim, seed=r)
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        candidates, _ = pipeline(result_sets, user_ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        # Release the search results: whatever is still traced is held by the candidates
+        del result_sets
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated.append(peak - base)
+        retained.append(current)
+        del candidates
+    return statistics.median(latencies), statistics.median(allocated), statistics.median(retained)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--result-sets", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    user_ctx = UserContext(role="hr")
+
+    print(f"{args.result_sets} result sets x {args.top_k} objects, dim {args.dim}, {args.requests} requests")
+    print(f"{'pipeline':>10} {'median ms':>10} {'allocated KB':>13} {'retained KB':>12}")
+    results = {}
+    for name, pipeline in (("dicts", legacy_request), ("chunks", chunk_request)):
+        results[name] = measure(pipeline, args, user_ctx)
+        ms, allocated, retained = results[name]
+        print(f"{name:>10} {ms * 1000:>10.3f} {allocated / 1024:>13.1f} {retained / 1024:>12.1f}")
+    (old_ms, old_alloc, old_kept), (new_ms, new_alloc, new_kept) = results["dicts"], results["chunks"]
+    print(f"chunks vs dicts: latency {new_ms / old_ms - 1:+.0%}, allocated {new_alloc / old_alloc - 1:+.0%}, "
+          f"retained {new_kept / old_kept - 1:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
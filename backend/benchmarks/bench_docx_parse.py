@@ -0,0 +1,109 @@
+"""Benchmark the streaming DOCX reader against the old python-docx three-pass parse.
+
+Usage (from backend/):
+    python benchmarks/bench_docx_parse.py [--sections 200 2000 10000] [--paragraphs 6]
+
+Each measurement runs in a fresh interpreter so peak RSS (which includes lxml's
+C allocations, unlike tracemalloc) is not polluted by earlier runs.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+
+
+def build_synthetic_docx(path, sections, paragraphs):
+    from docx import Document
+    doc = Document()
+    for s in range(sections):
+        doc.add_heading(f"Section {s}", level=1)
+        for p in range(paragraphs):
+            doc.add_paragraph(f"Step {p} of section {s}: confirm the requirement with the client and record it in the tracker. " * 3)
+        table = doc.add_table(rows=3, cols=3)
+        for r in range(3):
+            for c in range(3):
+                table.cell(r, c).text = f"Row {r} col {c} of section {s}"
+    doc.save(path)
+
+
+def legacy_parse(path):
+    """The pre-streaming parse: python-docx object model walked three times, tables ignored."""
+    from docx import Document
+    doc = Document(path)
+    pattern = re.compile(r"^([A-Z][A-Za-z0-9\s\-]+):?$")
+    count = 0
+    for para in doc.paragraphs:
+        if para.text.strip():
+            count += 1
+            break
+    found_headers = False
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if text:
+            count += 1
+            if pattern.match(text):
+                found_headers = True
+    if not found_headers:
+        for para in doc.paragraphs:
+            if para.text.strip():
+                count += 1
+    return count
+
+
+def streaming_parse(path):
+    from app.ingestion.docx_stream import iter_docx_blocks
+    return sum(1 for _ in iter_docx_blocks(path))
+
+
+def run_single(mode, path):
+    parse = legacy_parse if mode == "legacy" else streaming_parse
+    # Import outside the timed region so both modes pay only for parsing
+    if mode == "legacy":
+        import docx  # noqa: F401
+    else:
+        import app.ingestion.docx_stream  # noqa: F401
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    blocks = parse(path)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_rss_kb": rss_after - rss_before, "blocks": blocks}))
+
+
+def measure(mode, path):
+    out = subprocess.run(
+        [sys.executable, __file__, "--run", mode, path],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, nargs="+", default=[200, 2000, 10000])
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_single(*args.run)
+        return
+
+    print(f"{'sections':>8} {'size MB':>8} {'mode':>10} {'seconds':>9} {'peak RSS MB':>12} {'blocks':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sections:
+            path = os.path.join(tmp, f"synthetic_{n}.docx")
+            build_synthetic_docx(path, n, args.paragraphs)
+            size_mb = os.path.getsize(path) / 1e6
+            for mode in ("legacy", "streaming"):
+                r = measure(mode, path)
+                print(f"{n:>8} {size_mb:>8.1f} {mode:>10} {r['seconds']:>9.2f} {r['peak_rss_kb'] / 1024:>12.1f} {r['blocks']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure the cold import time of app.main against a budget.
+
+Usage (from backend/):
+    python benchmarks/bench_import_time.py [--runs 5] [--budget 2.5] [--top 15]
+
+Each run imports app.main in a fresh interpreter with `-X importtime` and
+reports the median wall time and the slowest packages (cumulative). Exits
+non-zero when the median exceeds --budget seconds or when a lazily loaded
+dependency (ragas, openai) was imported at startup.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '../'))
+LAZY_MODULES = ("ragas", "openai")
+PROBE = (
+    "import sys, time; t = time.perf_counter(); import app.main; "
+    "print('WALL', time.perf_counter() - t); "
+    f"print('LOADED', ','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+)
+IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def run_once():
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND, check=True, capture_output=True, text=True,
+    )
+    wall = float(re.search(r"^WALL (\S+)", out.stdout, re.M).group(1))
+    loaded = [m for m in re.search(r"^LOADED (.*)$", out.stdout, re.M).group(1).split(",") if m]
+    # Per root package (weaviate, fastapi, numpy, ...): the largest cumulative time of any of its modules,
+    # i.e. the cost of the import that first pulled the package in
+    modules = {}
+    for line in out.stderr.splitlines():
+        m = IMPORTTIME.match(line)
+        if m:
+            root = m.group(3).split(".")[0]
+            modules[root] = max(modules.get(root, 0.0), int(m.group(2)) / 1e6)
+    return wall, loaded, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.5, help="max median import time in seconds")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    walls, loaded, per_module = [], set(), {}
+    for _ in range(args.runs):
+        wall, lazy, modules = run_once()
+        walls.append(wall)
+        loaded.update(lazy)
+        for name, seconds in modules.items():
+            per_module.setdefault(name, []).append(seconds)
+    median = statistics.median(walls)
+
+    print(f"import app.main: median {median:.3f}s over {args.runs} runs (min {min(walls):.3f}s, max {max(walls):.3f}s)")
+    print(f"{'package':<40} {'cumulative s':>12}")
+    ranked = sorted(per_module.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for name, seconds in ranked[:args.top]:
+        print(f"{name:<40} {statistics.median(seconds):>12.3f}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported at startup but should load lazily: {', '.join(sorted(loaded))}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: median {median:.3f}s exceeds budget {args.budget:.3f}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
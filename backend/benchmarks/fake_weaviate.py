@@ -0,0 +1,285 @@
+"""In-memory stand-in for the parts of the Weaviate v4 client this app uses, for benchmarks and offline tests.
+
+Covers client.collections.get/exists/create/delete/list_all, and per collection
+query.hybrid / near_vector / fetch_objects (with the `after` cursor), iterator(),
+aggregate.over_all (total and group-by counts), data.insert and
+batch.fixed_size. Hybrid search fuses a keyword-overlap score with cosine
+similarity against the stored `embedding` property (or object vector) using
+`alpha`, like Weaviate's relative-score fusion. Filters built with
+weaviate.classes.query.Filter (property equal/not-equal/like/contains_any,
+by_id, and/or) are evaluated in Python. An optional per-call latency
+emulates the network round trip.
+
+    client = FakeWeaviateClient(latency=0.002)
+    seed_sections(client, sops=20, sections_per_sop=15)
+    app.api.rag.get_client = lambda: client
+"""
+import re
+import threading
+import time
+import uuid as uuid_module
+from fnmatch import fnmatchcase
+from types import SimpleNamespace
+import numpy as np
+from stub_ollama import stub_embedding
+
+_WORD_RE = re.compile(r"\w+")
+
+WORDS = (
+    "client handover checklist walkthrough keys access badge approval budget invoice vendor payment lease "
+    "space expansion downsizing closure onboarding offboarding safety audit inspection fitout furniture "
+    "meeting room booking parking reception visitor security incident escalation contract renewal"
+).split()
+
+
+def _tokens(text):
+    return _WORD_RE.findall(str(text or "").lower())
+
+
+def _match_filter(flt, obj):
+    if flt is None:
+        return True
+    if hasattr(flt, "filters"):
+        results = (_match_filter(f, obj) for f in flt.filters)
+        return all(results) if type(flt).__name__ == "_FilterAnd" else any(results)
+    operator = flt.operator.value
+    value = str(obj.uuid) if flt.target == "_id" else obj.properties.get(flt.target)
+    if operator == "Equal":
+        return value == flt.value
+    if operator == "NotEqual":
+        return value != flt.value
+    if operator == "Like":
+        return value is not None and fnmatchcase(str(value).lower(), str(flt.value).lower())
+    if operator == "ContainsAny":
+        wanted = {str(v) for v in flt.value}
+        values = value if isinstance(value, list) else [value]
+        return any(str(v) in wanted for v in values)
+    if operator == "IsNull":
+        return (value is None) == bool(flt.value)
+    raise NotImplementedError(f"FakeWeaviate filter operator {operator}")
+
+
+class _FakeObject(SimpleNamespace):
+    pass
+
+
+class _Result(SimpleNamespace):
+    pass
+
+
+class FakeCollection:
+    def __init__(self, name, client):
+        self.name = name
+        self._client = client
+        self._objects = {}
+        self._lock = threading.Lock()
+        self.query = _FakeQuery(self)
+        self.data = _FakeData(self)
+        self.batch = _FakeBatchFactory(self)
+        self.aggregate = _FakeAggregate(self)
+
+    def _round_trip(self, operation):
+        with self._client._lock:
+            self._client.stats[operation] = self._client.stats.get(operation, 0) + 1
+        if self._client.latency:
+            time.sleep(self._client.latency)
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self._objects.values())
+
+    def _view(self, obj, return_properties=None, score=None, include_vector=False):
+        props = obj.properties if return_properties is None else {k: obj.properties.get(k) for k in return_properties}
+        return _FakeObject(
+            uuid=obj.uuid,
+            properties=dict(props),
+            metadata=SimpleNamespace(score=score),
+            vector={"default": obj.vector} if include_vector and obj.vector else {},
+        )
+
+    def iterator(self, return_properties=None, include_vector=False, cache_size=100):
+        objects = self._snapshot()
+        for start in range(0, len(objects), cache_size):
+            self._round_trip("iterator")
+            for obj in objects[start:start + cache_size]:
+                yield self._view(obj, return_properties, include_vector=include_vector)
+
+    def __len__(self):
+        return len(self._objects)
+
+
+class _FakeData:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def insert(self, properties=None, uuid=None, vector=None):
+        self._collection._round_trip("insert")
+        return self._store(properties, uuid, vector)
+
+    def _store(self, properties, uuid=None, vector=None):
+        obj_uuid = uuid_module.UUID(str(uuid)) if uuid else uuid_module.uuid4()
+        props = dict(properties or {})
+        # Index tokens and the normalized vector once, at write time
+        text = " ".join(str(v) for k, v in props.items() if isinstance(v, str))
+        vec = np.asarray(vector or props.get("embedding") or [], dtype=np.float32)
+        norm = float(np.linalg.norm(vec)) if vec.size else 0.0
+        obj = _FakeObject(uuid=obj_uuid, properties=props, vector=vector,
+                          _tokens=set(_tokens(text)), _unit=vec / norm if norm else None)
+        with self._collection._lock:
+            self._collection._objects[obj_uuid] = obj
+        return obj_uuid
+
+
+class _FakeBatch:
+    def __init__(self, collection):
+        self._collection = collection
+        self.failed_objects = []
+
+    def add_object(self, properties=None, uuid=None, vector=None):
+        self._collection.data._store(properties, uuid, vector)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._collection._round_trip("batch")
+        return False
+
+
+class _FakeBatchFactory:
+    def __init__(self, collection):
+        self._collection = collection
+        self.failed_objects = []
+
+    def fixed_size(self, batch_size=100, concurrent_requests=1):
+        return _FakeBatch(self._collection)
+
+    dynamic = fixed_size
+
+
+class _FakeQuery:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def hybrid(self, query, vector=None, alpha=0.75, limit=10, filters=None, return_properties=None, **kwargs):
+        self._collection._round_trip("hybrid")
+        q_tokens = set(_tokens(query))
+        q_unit = None
+        if vector is not None and alpha > 0:
+            q = np.asarray(vector, dtype=np.float32)
+            norm = float(np.linalg.norm(q))
+            q_unit = q / norm if norm else None
+        scored = []
+        for obj in self._collection._snapshot():
+            if not _match_filter(filters, obj):
+                continue
+            keyword = len(q_tokens & obj._tokens) / len(q_tokens) if q_tokens else 0.0
+            semantic = 0.0
+            if q_unit is not None and obj._unit is not None and len(obj._unit) == len(q_unit):
+                semantic = max(0.0, float(q_unit @ obj._unit))
+            score = (1 - alpha) * keyword + alpha * semantic
+            if keyword > 0 or (q_unit is not None and semantic > 0):
+                scored.append((score, obj))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return _Result(objects=[self._collection._view(obj, return_properties, score) for score, obj in scored[:limit]])
+
+    def near_vector(self, near_vector, limit=10, filters=None, return_properties=None, **kwargs):
+        return self.hybrid("", vector=near_vector, alpha=1.0, limit=limit, filters=filters, return_properties=return_properties)
+
+    def fetch_objects(self, filters=None, limit=None, return_properties=None, include_vector=False, after=None, **kwargs):
+        self._collection._round_trip("fetch_objects")
+        matched = [obj for obj in self._collection._snapshot() if _match_filter(filters, obj)]
+        if filters is None:
+            # Unfiltered listings come from the object store in UUID order, which the `after` cursor relies on
+            matched.sort(key=lambda obj: str(obj.uuid))
+            if after is not None:
+                matched = [obj for obj in matched if str(obj.uuid) > str(after)]
+        if limit is not None:
+            matched = matched[:limit]
+        return _Result(objects=[self._collection._view(obj, return_properties, include_vector=include_vector) for obj in matched])
+
+
+class _FakeAggregate:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def over_all(self, group_by=None, total_count=True, filters=None, **kwargs):
+        self._collection._round_trip("aggregate")
+        matched = [obj for obj in self._collection._snapshot() if _match_filter(filters, obj)]
+        if group_by is None:
+            return _Result(total_count=len(matched), properties={})
+        prop = group_by if isinstance(group_by, str) else group_by.prop
+        counts = {}
+        for obj in matched:
+            value = obj.properties.get(prop)
+            counts[value] = counts.get(value, 0) + 1
+        return _Result(groups=[
+            _Result(grouped_by=SimpleNamespace(prop=prop, value=value), total_count=n, properties={})
+            for value, n in counts.items()
+        ])
+
+
+class _FakeCollections:
+    def __init__(self, client):
+        self._client = client
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(name, self._client)
+            return self._collections[name]
+
+    def exists(self, name):
+        return name in self._collections
+
+    def create(self, name, properties=None, **kwargs):
+        return self.get(name)
+
+    def delete(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def list_all(self):
+        return {name: None for name in self._collections}
+
+
+class FakeWeaviateClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.stats = {}
+        self._lock = threading.Lock()
+        self.collections = _FakeCollections(self)
+
+    def close(self):
+        pass
+
+
+def seed_sections(client, sops=20, sections_per_sop=15, words_per_section=180, embed_dim=768, seed=7):
+    """Fill the Section collection with a deterministic synthetic SOP corpus. Returns the SOP names."""
+    import random
+    rng = random.Random(seed)
+    collection = client.collections.get("Section")
+    departments = ["BDM", "Finance", "Facilities", "Operations"]
+    names = []
+    for s in range(sops):
+        sop = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} SOP {s}"
+        names.append(sop)
+        department = departments[s % len(departments)]
+        for n in range(sections_per_sop):
+            # Sections come in threes: a long one split into two parts, like the token chunker does, then a short one
+            if n % 3 == 0:
+                heading = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}"
+            title = f"{heading} (Part {n % 3 + 1})" if n % 3 < 2 else f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}"
+            content = " ".join(rng.choice(WORDS) for _ in range(words_per_section)) + "."
+            collection.data._store({
+                "title": title,
+                "content": content,
+                "summary": content[:120],
+                "sop": sop,
+                "department": department,
+                "tags": "finance" if department == "Finance" and n % 4 == 0 else "",
+                "embedding": stub_embedding(content, embed_dim),
+            })
+    return names
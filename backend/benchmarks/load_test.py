@@ -0,0 +1,314 @@
+"""Offline load test: /rag/query, /rag/agentic_query and bulk ingestion against local stand-ins.
+
+The app runs in-process under uvicorn on a free port, with Ollama replaced by
+benchmarks/stub_ollama.py (deterministic replies, configurable latency and
+token rate) and Weaviate by benchmarks/fake_weaviate.py (a seeded in-memory
+Section collection). Each scenario fires `--requests` requests from
+`--concurrency` client threads and reports p50/p95/p99 latency and
+throughput. Results are written as JSON; pass --compare to diff against an
+earlier run and exit non-zero when p95 latency or throughput regresses by
+more than --max-regression.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --scenarios query,agentic,ingest --requests 50 --concurrency 4 --out bench.json
+    python benchmarks/load_test.py --compare bench.json --out bench-new.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import numpy as np
+import requests
+from stub_ollama import StubOllama
+from fake_weaviate import FakeWeaviateClient, seed_sections
+
+QUESTIONS = [
+    "What is the client handover checklist?",
+    "Who approves vendor payment invoices?",
+    "How do I book a meeting room for a visitor?",
+    "What are the steps for space expansion?",
+    "How is a security incident escalated?",
+    "What does the onboarding process require?",
+]
+ANSWER = "Follow the checklist: confirm access, walk through the space with the client, collect keys and sign off. " * 3
+
+
+def bench_responder(kind, prompt, request):
+    """Deterministic replies shaped like what each call site expects."""
+    if kind == "generate":
+        if "Rate the relevance" in prompt:
+            return "4"
+        return ANSWER
+    last = request["messages"][-1]["content"]
+    if last.startswith("Question:"):
+        question = last.split("\n", 1)[0][len("Question:"):].strip()
+        return json.dumps({"action": "SEARCH", "input": question})
+    if last.startswith("Observation") or last.startswith("Your last reply"):
+        return json.dumps({"action": "FINAL_ANSWER", "input": "ready"})
+    return ANSWER
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+class Harness:
+    """Stub Ollama + fake Weaviate wired into the app, served by uvicorn in a background thread."""
+
+    def __init__(self, args):
+        self.stub = StubOllama(
+            responder=bench_responder,
+            latency=args.llm_latency,
+            prefill_tokens_per_sec=args.prefill_rate,
+            tokens_per_sec=args.token_rate,
+            embed_latency=args.embed_latency,
+        )
+        self.weaviate = FakeWeaviateClient(latency=args.weaviate_latency)
+        seed_sections(self.weaviate, sops=args.sops, sections_per_sop=args.sections_per_sop)
+        self.backend = args.backend
+        self.server = None
+        self.thread = None
+        self.url = None
+
+    def _patch(self):
+        from app.ollama import client as ollama_client
+        from app.weaviate_client import client as weaviate_client
+        from app.api import rag
+        from app.rag import agent_tools, retrieval
+        from app.ingestion import docx_ingest
+        from app import main, startup
+        ollama_client.OLLAMA_URL = self.stub.start()
+        ollama_client.OPENAI_API_KEY = None
+        get_client = lambda: self.weaviate
+        for module in (weaviate_client, rag, agent_tools, docx_ingest, startup):
+            module.get_client = get_client
+        # RAGAS evaluation is out of scope for latency runs
+        rag.load_ragas = lambda: None
+        # The local index is synced from the fake at startup, like from Weaviate
+        retrieval.RETRIEVAL_BACKEND = self.backend
+        return main.app
+
+    def start(self):
+        import uvicorn
+        from app.log import setup_logging
+        app = self._patch()
+        setup_logging(level="WARNING")
+        port = _free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        self.url = f"http://127.0.0.1:{port}"
+        # Measure the warm service: wait for the background warm-up (catalog, local index)
+        while requests.get(f"{self.url}/ready").status_code != 200:
+            time.sleep(0.05)
+        return self.url
+
+    def stop(self):
+        if self.server:
+            self.server.should_exit = True
+            self.thread.join(timeout=5)
+        self.stub.stop()
+
+
+def summarize(latencies, errors, wall_seconds):
+    lat = np.asarray(latencies, dtype=float) * 1000
+    result = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "wall_s": round(wall_seconds, 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+    }
+    if lat.size:
+        result.update({
+            "mean_ms": round(float(lat.mean()), 1),
+            "p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "p95_ms": round(float(np.percentile(lat, 95)), 1),
+            "p99_ms": round(float(np.percentile(lat, 99)), 1),
+            "max_ms": round(float(lat.max()), 1),
+        })
+    return result
+
+
+def run_load(fn, n_requests, concurrency):
+    """Call fn(i) n_requests times from `concurrency` threads; fn returns True on success."""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = fn(i)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def scenario_query(url, args):
+    session = requests.Session()
+    def call(i):
+        response = session.post(f"{url}/rag/query", json={"question": QUESTIONS[i % len(QUESTIONS)], "top_k": args.top_k}, timeout=120)
+        return response.ok and "answer" in response.json()
+    return call
+
+
+def scenario_agentic(url, args):
+    session = requests.Session()
+    def call(i):
+        payload = {"question": QUESTIONS[i % len(QUESTIONS)], "top_k": args.top_k, "include_reasoning_summary": False}
+        response = session.post(f"{url}/rag/agentic_query", json=payload, timeout=120)
+        return response.ok and response.json().get("answer")
+    return call
+
+
+def _make_docx(path, index, sections=12, words=120):
+    from docx import Document
+    from fake_weaviate import WORDS
+    doc = Document()
+    doc.add_paragraph(f"Synthetic SOP {index} for load testing.")
+    for s in range(sections):
+        doc.add_heading(f"Section {s + 1}", level=2)
+        doc.add_paragraph(" ".join(WORDS[(index + s + w) % len(WORDS)] for w in range(words)) + ".")
+    doc.save(path)
+
+
+def scenario_ingest(url, args):
+    """Upload a DOCX and wait for its job: latency is submit-to-completed."""
+    tmp_dir = tempfile.mkdtemp(prefix="bench-ingest-")
+    paths = []
+    for i in range(args.requests):
+        path = os.path.join(tmp_dir, f"bench_sop_{i}.docx")
+        _make_docx(path, i)
+        paths.append(path)
+    session = requests.Session()
+
+    def call(i):
+        with open(paths[i], "rb") as f:
+            response = session.post(f"{url}/api/ingest", files={"file": (os.path.basename(paths[i]), f)}, timeout=60)
+        if response.status_code != 202:
+            return False
+        job_id = response.json()["job_id"]
+        deadline = time.time() + 300
+        while time.time() < deadline:
+            status = session.get(f"{url}/api/ingest/{job_id}", timeout=10).json()
+            if status["status"] in ("completed", "failed"):
+                return status["status"] == "completed"
+            time.sleep(0.01)
+        return False
+    return call
+
+
+SCENARIOS = {"query": scenario_query, "agentic": scenario_agentic, "ingest": scenario_ingest}
+
+
+def compare(current, baseline, max_regression):
+    """Print per-scenario deltas; return the list of regressions beyond max_regression (a fraction)."""
+    regressions = []
+    print(f"\n{'scenario':>10} {'metric':>15} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            if metric not in result or metric not in base or not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            print(f"{name:>10} {metric:>15} {base[metric]:>10} {result[metric]:>10} {change:>+8.1%}")
+            worse = change if higher_is_worse else -change
+            if metric in ("p95_ms", "throughput_rps") and worse > max_regression:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="query,agentic,ingest")
+    parser.add_argument("--requests", type=int, default=30, help="requests (or documents) per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--sops", type=int, default=20)
+    parser.add_argument("--sections-per-sop", type=int, default=15)
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="stub seconds per LLM request")
+    parser.add_argument("--prefill-rate", type=float, default=None, help="stub prefill tokens/s (default: free)")
+    parser.add_argument("--token-rate", type=float, default=None, help="stub generated tokens/s (default: instant)")
+    parser.add_argument("--embed-latency", type=float, default=0.005)
+    parser.add_argument("--weaviate-latency", type=float, default=0.002)
+    parser.add_argument("--backend", choices=["weaviate", "local"], default="weaviate", help="RETRIEVAL_BACKEND for the run")
+    parser.add_argument("--out", default="benchmarks/results/load_test.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/throughput regression (fraction)")
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    url = harness.start()
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "args": vars(args),
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            call = SCENARIOS[name](url, args)
+            for i in range(args.warmup if name != "ingest" else 0):
+                call(i)
+            harness.stub.reset_stats()
+            harness.weaviate.stats.clear()
+            result = run_load(call, args.requests, args.concurrency)
+            result["llm"] = dict(harness.stub.stats)
+            result["weaviate"] = dict(harness.weaviate.stats)
+            results["scenarios"][name] = result
+            print(f"{name:>8}: {result['requests']} req, {result['errors']} errors, "
+                  f"p50 {result.get('p50_ms')} ms, p95 {result.get('p95_ms')} ms, p99 {result.get('p99_ms')} ms, "
+                  f"{result['throughput_rps']} req/s")
+    finally:
+        harness.stop()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Deterministic stand-in for the Ollama HTTP API, for benchmarks and offline tests.
+
+Serves /api/generate, /api/chat and /api/embed on a local port. Replies come
+from a `responder(kind, prompt_text, request)` callable. The server emulates a
+single-slot KV cache: each request is tokenized (whitespace split) and only the
+tokens after the longest prefix shared with the previous request count as
+prefill, which is what Ollama reports as `prompt_eval_count`.
+
+Latency knobs: `latency` per request, `prefill_tokens_per_sec` for prefill,
+`tokens_per_sec` for generation (streamed replies are sent token by token with
+chunked transfer encoding, so time-to-first-token is realistic), and
+`embed_latency` + `embed_latency_per_input` for /api/embed, which accepts a
+list of inputs like Ollama does (batch sizes are recorded in stats).
+`fail(path, times, status)` makes the next requests to a path return an HTTP
+error and `stall(path, seconds, times)` delays them (every request when times
+is None), for exercising timeouts, retries, hedging and failover.
+
+    stub = StubOllama(responder=lambda kind, prompt, req: "SEARCH: handover")
+    url = stub.start()
+    ...
+    stub.stop(); print(stub.stats)
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_responder(kind, prompt, request):
+    return "Stub answer."
+
+
+def render_chat(messages):
+    """Flatten chat messages the way a chat template would, so cached prefixes line up."""
+    return " ".join(f"<|{m.get('role')}|> {m.get('content', '')}" for m in messages)
+
+
+def stub_embedding(text, dim):
+    """Deterministic pseudo-embedding derived from the text hash."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [((digest[i % len(digest)] / 255.0) - 0.5) for i in range(dim)]
+
+
+class StubOllama:
+    def __init__(self, responder=None, latency=0.0, prefill_tokens_per_sec=None, tokens_per_sec=None, embed_dim=768,
+                 embed_latency=0.0, embed_latency_per_input=0.0):
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.prefill_tokens_per_sec = prefill_tokens_per_sec
+        self.tokens_per_sec = tokens_per_sec
+        self.embed_dim = embed_dim
+        self.embed_latency = embed_latency
+        self.embed_latency_per_input = embed_latency_per_input
+        self._lock = threading.Lock()
+        self._cached_tokens = []
+        self._failures = {}  # path -> [remaining, status]
+        self._stalls = {}  # path -> [remaining or None, seconds]
+        self._server = None
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with getattr(self, "_lock", threading.Lock()):
+            self.stats = {"requests": 0, "prompt_tokens": 0, "prefill_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+                          "embed_requests": 0, "embed_inputs": 0, "max_embed_batch": 0}
+            self._cached_tokens = []
+
+    def fail(self, path, times=1, status=503):
+        with self._lock:
+            self._failures[path] = [times, status]
+
+    def stall(self, path, seconds, times=None):
+        with self._lock:
+            self._stalls[path] = [times, seconds]
+
+    def _injected(self, path):
+        """(status to fail with or None, seconds to stall) for the next request to path."""
+        with self._lock:
+            failure = self._failures.get(path)
+            status = None
+            if failure and failure[0] > 0:
+                failure[0] -= 1
+                status = failure[1]
+            stall = self._stalls.get(path)
+            seconds = 0
+            if stall and (stall[0] is None or stall[0] > 0):
+                seconds = stall[1]
+                if stall[0] is not None:
+                    stall[0] -= 1
+            return status, seconds
+
+    # --- KV cache emulation ---
+    def _prefill(self, tokens):
+        with self._lock:
+            shared = 0
+            for a, b in zip(self._cached_tokens, tokens):
+                if a != b:
+                    break
+                shared += 1
+            prefill = len(tokens) - shared
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += len(tokens)
+            self.stats["prefill_tokens"] += prefill
+            self.stats["cached_tokens"] += shared
+        return prefill
+
+    def _remember(self, tokens):
+        with self._lock:
+            self._cached_tokens = tokens
+
+    def _generate(self, kind, prompt_text, request, streamed=False):
+        tokens = prompt_text.split()
+        prefill = self._prefill(tokens)
+        delay = self.latency
+        if self.prefill_tokens_per_sec:
+            delay += prefill / self.prefill_tokens_per_sec
+        reply = self.responder(kind, prompt_text, request)
+        reply_tokens = reply.split()
+        if self.tokens_per_sec and not streamed:
+            delay += len(reply_tokens) / self.tokens_per_sec
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.stats["completion_tokens"] += len(reply_tokens)
+        # The reply is part of the cached sequence for the next turn
+        if kind == "chat":
+            self._remember(tokens + f"<|assistant|> {reply}".split())
+        else:
+            self._remember(tokens + reply_tokens)
+        return reply, prefill, len(reply_tokens)
+
+    def _embed(self, inputs):
+        delay = self.embed_latency + self.embed_latency_per_input * len(inputs)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.stats["embed_requests"] += 1
+            self.stats["embed_inputs"] += len(inputs)
+            self.stats["max_embed_batch"] = max(self.stats["max_embed_batch"], len(inputs))
+        return [stub_embedding(text, self.embed_dim) for text in inputs]
+
+    # --- HTTP plumbing ---
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, lines):
+                """NDJSON with chunked encoding, one line per token, paced at tokens_per_sec."""
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, line in enumerate(lines):
+                    if stub.tokens_per_sec and i < len(lines) - 1:
+                        time.sleep(1.0 / stub.tokens_per_sec)
+                    data = (json.dumps(line) + "\n").encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                status, stall = stub._injected(self.path)
+                if stall:
+                    time.sleep(stall)
+                if status is not None:
+                    self._send(status, json.dumps({"error": f"injected {status}"}).encode())
+                elif self.path == "/api/embed":
+                    inputs = request.get("input")
+                    inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+                    self._send(200, json.dumps({"model": request.get("model"), "embeddings": stub._embed(inputs)}).encode())
+                elif self.path == "/api/chat":
+                    streamed = request.get("stream", True)
+                    reply, prefill, completion = stub._generate("chat", render_chat(request.get("messages", [])), request, streamed)
+                    done = {"model": request.get("model"), "done": True, "prompt_eval_count": prefill, "eval_count": completion}
+                    if streamed:
+                        # Streamed replies arrive as one NDJSON line per token
+                        lines = [{"message": {"role": "assistant", "content": word + " "}, "done": False} for word in reply.split()]
+                        lines.append(dict(done, message={"role": "assistant", "content": ""}))
+                        self._send_stream(lines)
+                    else:
+                        self._send(200, json.dumps(dict(done, message={"role": "assistant", "content": reply})).encode())
+                elif self.path == "/api/generate":
+                    prompt = " ".join(p for p in (request.get("system"), request.get("prompt")) if p)
+                    streamed = request.get("stream", True)
+                    reply, prefill, completion = stub._generate("generate", prompt, request, streamed)
+                    done = {"done": True, "prompt_eval_count": prefill, "eval_count": completion}
+                    if streamed:
+                        # Ollama streams NDJSON from /api/generate unless stream is false
+                        lines = [{"response": word + " ", "done": False} for word in reply.split()]
+                        lines.append(dict(done, response=""))
+                        self._send_stream(lines)
+                    else:
+                        self._send(200, json.dumps(dict(done, response=reply)).encode())
+                else:
+                    self._send(404, b'{"error": "not found"}')
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.rag.agent_actions import parse_action, AgentAction
+from app.rag.agent_context import AgentContext
+from app.rag.chunk import Chunk
+
+def test_parse_json_action():
+    assert parse_action('{"action": "SEARCH", "input": "handover checklist"}') == AgentAction("SEARCH", "handover checklist")
+    fenced = '```json\n{"action": "get_sop_section", "input": {"sop": "Handover", "section": "Keys"}}\n```'
+    assert parse_action(fenced) == AgentAction("GET_SOP_SECTION", ("Handover", "Keys"))
+    assert parse_action('Sure! {"action": "FINAL_ANSWER", "input": "done"}') == AgentAction("FINAL_ANSWER", "done")
+
+def test_parse_legacy_and_invalid():
+    assert parse_action("LIST_SOPS: handover") == AgentAction("LIST_SOPS", "handover")
+    assert parse_action("GET_SOP_SECTION: Handover, Keys") == AgentAction("GET_SOP_SECTION", ("Handover", "Keys"))
+    assert parse_action("I think the answer is to sign the checklist.") is None
+    assert parse_action('{"action": "DELETE", "input": "x"}') is None
+    assert parse_action("") is None
+
+class FakeSession:
+    def __init__(self):
+        self.messages = [{"role": "system", "content": "system prompt"}]
+    def send(self, content, max_tokens=512):
+        self.messages.append({"role": "user", "content": content})
+        self.messages.append({"role": "assistant", "content": "ok"})
+        return "ok"
+
+def test_context_compacts_older_observations_under_budget():
+    session = FakeSession()
+    context = AgentContext(session, budget_tokens=400)
+    chunks = [Chunk(title=f"Chunk {i}", content="word " * 60, summary="short summary") for i in range(3)]
+    for step in range(4):
+        context.send(context.observation(f"SEARCH results {step}", chunks))
+        assert context.prompt_tokens() <= 400
+    assert context.compactions > 0
+    assert context.max_prompt_tokens <= 400
+    # The newest observation keeps full chunks; the oldest has been compacted
+    assert "word word" in session.messages[-2]["content"]
+    assert "word word" not in session.messages[1]["content"]
+    assert session.messages[0]["content"] == "system prompt"
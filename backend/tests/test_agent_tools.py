@@ -0,0 +1,106 @@
+import sys
+import os
+import types
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.rag import agent_tools
+from app.rag.agent_tools import AgentToolExecutor
+from app.rag.catalog import SopCatalog
+from app.rag.expansion import QueryExpander
+
+def _obj(uid, title, tags="", sop="SOP1"):
+    return types.SimpleNamespace(uuid=uid, metadata=None, properties={"title": title, "content": f"{title} body", "sop": sop, "tags": tags})
+
+# Part 1 was ingested second, so its UUID sorts after Part 2's
+KEYS_1 = "00000000-0000-0000-0000-000000000002"
+KEYS_2 = "00000000-0000-0000-0000-000000000001"
+
+class FakeQuery:
+    def __init__(self):
+        self.calls = []
+    def hybrid(self, query, vector=None, limit=10, return_properties=None, **kw):
+        self.calls.append(query)
+        # Every query returns the shared object plus one of its own
+        return types.SimpleNamespace(objects=[_obj("shared", "Shared"), _obj(f"id-{query}", query, tags="finance")])
+    def fetch_objects(self, filters=None, limit=None, return_properties=None):
+        self.calls.append(("fetch", limit))
+        # Like Weaviate, fetched objects come back in UUID order
+        return types.SimpleNamespace(objects=[_obj(KEYS_2, "Keys (Part 2)"), _obj(KEYS_1, "Keys (Part 1)")])
+
+class FakeClient:
+    def __init__(self):
+        self.query = FakeQuery()
+        self.collections = self
+    def get(self, name):
+        return self
+    def iterator(self, return_properties=None, cache_size=None):
+        # Catalog source, walked in UUID order like the cursor iterator: SOP1 has a public section, SOP2 is finance-only
+        return iter([_obj(KEYS_2, "Keys (Part 2)"), _obj(KEYS_1, "Keys (Part 1)"), _obj("pay", "Payments", tags="finance", sop="SOP2")])
+
+def _expander(monkeypatch, tmp_path):
+    path = tmp_path / "synonyms.json"
+    path.write_text('{"expansion": ["growth", "client expansion"]}')
+    expander = QueryExpander(str(path), embed=lambda texts: [[1.0]] * len(texts)).refresh()
+    monkeypatch.setattr(agent_tools, "get_query_expander", lambda: expander)
+
+def test_search_is_memoized_and_expanded_in_one_query(monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_tools, "get_embedding", lambda text: [0.0])
+    _expander(monkeypatch, tmp_path)
+    client = FakeClient()
+    with AgentToolExecutor({"role": "finance"}, top_k=10, client=client) as tools:
+        first = tools.search("client expansion")
+        # Same query modulo case/whitespace hits the memo
+        second = tools.search("  Client   Expansion ")
+    assert first is second
+    assert tools.cache_hits == 1
+    # One hybrid search whose keywords carry the synonyms
+    assert client.query.calls == ["client expansion growth"]
+    assert [c.uuid for c in first] == ["shared", "id-client expansion growth"]
+
+def test_access_control_and_deadline(monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_tools, "get_embedding", lambda text: [0.0])
+    _expander(monkeypatch, tmp_path)
+    with AgentToolExecutor({"role": "bdm"}, top_k=10, timeout=60, client=FakeClient(), catalog=SopCatalog()) as tools:
+        assert [c.uuid for c in tools.search("handover")] == ["shared"]
+        assert tools.list_sops("") == ["SOP1"]
+        assert tools.list_sops("sop") == ["SOP1"]
+        assert not tools.expired()
+        tools.deadline = 0
+        assert tools.expired() and tools.remaining() == 0
+
+def test_catalog_orders_parts_by_number():
+    catalog = SopCatalog().load(FakeClient())
+    assert catalog.section_ids("SOP1", "Keys") == [KEYS_1, KEYS_2]
+
+def test_get_sop_section_uses_catalog_ids(monkeypatch):
+    monkeypatch.setattr(agent_tools, "get_embedding", lambda text: 1 / 0)
+    client = FakeClient()
+    with AgentToolExecutor({}, top_k=10, client=client, catalog=SopCatalog()) as tools:
+        parts = tools.get_sop_section("sop1", "keys")
+    # Exact ID fetch, no embedding or hybrid query, parts back in part order
+    assert [c.uuid for c in parts] == [KEYS_1, KEYS_2]
+    assert client.query.calls == [("fetch", 2)]
+
+def test_catalog_miss_falls_back_to_index_and_refreshes(monkeypatch):
+    monkeypatch.setattr(agent_tools, "get_embedding", lambda text: 1 / 0)
+    client = FakeClient()
+    # Catalog built before the Keys sections were ingested by another process
+    client.iterator = lambda return_properties=None, cache_size=None: iter([_obj("pay", "Payments", tags="finance", sop="SOP2")])
+    catalog = SopCatalog().load(client)
+    refreshes = []
+    monkeypatch.setattr(catalog, "refresh_async", lambda: refreshes.append(1) or True)
+    with AgentToolExecutor({}, top_k=10, client=client, catalog=catalog) as tools:
+        assert [c.uuid for c in tools.get_sop_section("SOP1", "Keys")] == [KEYS_1, KEYS_2]
+        assert tools.get_sop_section("SOP1", "Alarm codes") == []
+    assert refreshes == [1]
+
+def test_stale_catalog_rebuilds_in_background(monkeypatch):
+    catalog = SopCatalog().load(FakeClient())
+    refreshes = []
+    monkeypatch.setattr(catalog, "refresh_async", lambda: refreshes.append(1) or True)
+    with AgentToolExecutor({}, top_k=10, client=FakeClient(), catalog=catalog) as tools:
+        tools.list_sops("")
+        assert refreshes == []
+        catalog.loaded_at -= 10 ** 6
+        # Served from the current catalog while the rebuild runs
+        assert tools.list_sops("sop") == ["SOP1"]
+    assert refreshes == [1]
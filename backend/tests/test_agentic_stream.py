@@ -0,0 +1,89 @@
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+import pytest
+from fastapi.testclient import TestClient
+from stub_ollama import StubOllama
+from app.main import app
+from app.api import rag
+from app.ollama import client as ollama_client
+from app.rag.chunk import Chunk
+
+client = TestClient(app)
+
+class FakeTools:
+    cache_hits = 0
+    def __init__(self, *args, **kwargs):
+        pass
+    def expired(self):
+        return False
+    def search(self, query):
+        return [Chunk(title="Handover", content="Walk through the space with the client.", tags="")]
+    def list_sops(self, filter_str):
+        return ["Space Handover SOP"]
+    def get_sop_section(self, sop, section):
+        return []
+    def close(self):
+        pass
+
+@pytest.fixture
+def stub(monkeypatch):
+    actions = iter(["SEARCH: handover", "LIST_SOPS: handover", "FINAL_ANSWER: ready"])
+    def responder(kind, prompt, request):
+        last = request["messages"][-1]["content"]
+        if last.startswith(("Question:", "Observation")):
+            return next(actions)
+        return "Walk through the space and sign the checklist."
+    server = StubOllama(responder=responder)
+    monkeypatch.setattr(ollama_client, "OLLAMA_URL", server.start())
+    monkeypatch.setattr(ollama_client, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(rag, "AgentToolExecutor", FakeTools)
+    yield server
+    server.stop()
+
+def test_agentic_stream_emits_steps_then_answer(stub):
+    response = client.post("/rag/agentic_query/stream", json={"question": "How do I hand over a space?"})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    kinds = [e["event"] for e in events]
+    assert kinds[:2] == ["step", "step"]
+    assert [e["action"] for e in events if e["event"] == "step"] == ["SEARCH", "LIST_SOPS", "FINAL_ANSWER"]
+    # Answer tokens stream before the FINAL_ANSWER step event and the answer event
+    first_token = kinds.index("answer_token")
+    assert first_token < kinds.index("answer") < kinds.index("reasoning_summary") < kinds.index("done")
+    answer = next(e for e in events if e["event"] == "answer")["answer"]
+    assert answer == "".join(e["token"] for e in events if e["event"] == "answer_token").strip()
+    assert events[0]["result_summary"] == {"count": 1, "items": ["Handover"]}
+
+def test_agentic_query_reasoning_summary_optional(stub):
+    response = client.post("/rag/agentic_query", json={"question": "How do I hand over a space?", "include_reasoning_summary": False, "trace": True})
+    body = response.json()
+    assert body["answer"] == "Walk through the space and sign the checklist."
+    assert body["reasoning_summary"] is None
+    assert len(body["steps"]) == 3
+    # Per-request trace: stage timings and LLM counters, mirrored in Server-Timing
+    assert {"agent.llm", "agent.search", "agent.answer"} <= set(body["trace"]["stages_ms"])
+    assert body["trace"]["counters"]["llm_requests"] == 4
+    assert "agent.llm;dur=" in response.headers["Server-Timing"]
+
+def test_agentic_query_repairs_invalid_action(monkeypatch):
+    replies = iter(["Let me look that up.", '{"action": "FINAL_ANSWER", "input": "ready"}'])
+    def responder(kind, prompt, request):
+        last = request["messages"][-1]["content"]
+        if last.startswith("Question:") or last.startswith("Your last reply"):
+            return next(replies)
+        return "Walk through the space and sign the checklist."
+    server = StubOllama(responder=responder)
+    monkeypatch.setattr(ollama_client, "OLLAMA_URL", server.start())
+    monkeypatch.setattr(ollama_client, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(rag, "AgentToolExecutor", FakeTools)
+    try:
+        body = client.post("/rag/agentic_query", json={"question": "How do I hand over a space?", "include_reasoning_summary": False}).json()
+    finally:
+        server.stop()
+    assert body["answer"] == "Walk through the space and sign the checklist."
+    assert body["usage"]["repairs"] == 1
+    assert body["usage"]["wasted_generations"] == 1
+    assert body["usage"]["llm_calls"] == 3
@@ -1,11 +1,14 @@
 import sys
 import os
 import tempfile
+import time
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
 from fastapi.testclient import TestClient
 from app.main import app
 import pytest
 from docx import Document
+from fake_weaviate import FakeWeaviateClient
 
 client = TestClient(app)
 
@@ -14,38 +17,66 @@ def test_health():
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
 
-def test_ingest(monkeypatch):
-    # Mock the actual ingestion logic to avoid real DOCX/Weaviate/Ollama calls
-    monkeypatch.setattr("app.ingestion.docx_ingest.ingest_docx", lambda x: None)
+def _docx_upload(name="test.docx"):
     with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as tmp:
         doc = Document()
         doc.add_paragraph("Test content")
         doc.save(tmp.name)
         tmp.seek(0)
-        files = {"file": ("test.docx", tmp.read(), "application/vnd.openxmlformats-officedocument.wordprocessingml.document")}
-    response = client.post("/api/ingest", files=files)
-    assert response.status_code == 200
-    assert response.json()["status"] == "success"
+        data = tmp.read()
     os.unlink(tmp.name)
+    return (name, data, "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+
+def _wait_for_job(job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/api/ingest/{job_id}").json()
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.02)
+    return status
+
+def test_ingest(monkeypatch):
+    # Mock the actual ingestion logic to avoid real DOCX/Weaviate/Ollama calls
+    seen_paths = []
+    def fake_ingest(path, progress=None):
+        seen_paths.append(path)
+        progress("parsed", 2)
+        progress("embedded", 2)
+        progress("stored", 2)
+    monkeypatch.setattr("app.ingestion.docx_ingest.ingest_docx", fake_ingest)
+    response = client.post("/api/ingest", files={"file": _docx_upload()})
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    status = _wait_for_job(response.json()["job_id"])
+    assert status["status"] == "completed"
+    assert status["sections_stored"] == 2
+    # Temp upload is removed once the job finishes
+    assert seen_paths and not os.path.exists(seen_paths[0])
+
+def test_ingest_batch(monkeypatch):
+    monkeypatch.setattr("app.ingestion.docx_ingest.ingest_docx", lambda path, progress=None: None)
+    files = [("files", _docx_upload("a.docx")), ("files", _docx_upload("b.docx"))]
+    response = client.post("/api/ingest/batch", files=files)
+    assert response.status_code == 202
+    jobs = response.json()["jobs"]
+    assert [j["filename"] for j in jobs] == ["a.docx", "b.docx"]
+    assert all(_wait_for_job(j["job_id"])["status"] == "completed" for j in jobs)
+    assert client.get("/api/ingest/unknown").status_code == 404
 
 def test_rag_query(monkeypatch):
     # Mock embedding and LLM completion
-    monkeypatch.setattr("app.ollama.client.get_embedding", lambda x: [0.1]*384)
-    monkeypatch.setattr("app.ollama.client.get_llm_completion", lambda x: "Mocked answer")
-    # Mock Weaviate client
-    class DummyQuery:
-        def with_near_vector(self, *a, **kw): return self
-        def with_limit(self, *a, **kw): return self
-        def with_where(self, *a, **kw): return self
-        def do(self):
-            return {"data": {"Get": {"Section": [{"title": "Sec1", "content": "Some content", "sop": "SOP1"}]}}}
-    class DummyClient:
-        def __init__(self):
-            self.query = self
-        def get(self, *a, **kw): return DummyQuery()
-    monkeypatch.setattr("app.weaviate_client.client.get_client", lambda: DummyClient())
+    monkeypatch.setattr("app.api.rag.get_embedding", lambda x: [0.1]*384)
+    monkeypatch.setattr("app.api.rag.get_llm_completion", lambda prompt, max_tokens=512: "Mocked answer")
+    monkeypatch.setattr("app.api.rag.load_ragas", lambda: None)
+    # In-memory stand-in for the v4 Section collection
+    weaviate = FakeWeaviateClient()
+    weaviate.collections.get("Section").data.insert({"title": "Sec1", "content": "SOP1 covers the client handover.", "sop": "SOP1", "tags": ""})
+    monkeypatch.setattr("app.api.rag.get_client", lambda: weaviate)
     req = {"question": "What is SOP1?"}
     response = client.post("/rag/query", json=req)
     assert response.status_code == 200
     assert "answer" in response.json()
-    assert response.json()["answer"] == "Mocked answer" 
\ No newline at end of file
+    assert response.json()["answer"] == "Mocked answer"
+    assert [m["title"] for m in response.json()["matches"]] == ["Sec1"]
+    assert weaviate.stats["hybrid"] == 1
@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import sqlite3
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.feedback_store import FeedbackStore
+from app.rag.batch_eval import BatchEvaluator, load_questions, feedback_questions
+
+
+def _answer(item):
+    if item["question"] == "broken":
+        raise RuntimeError("backend down")
+    return {"answer": f"answer to {item['question']}", "contexts": ["ctx"], "latency_ms": 100.0,
+            "stages_ms": {"retrieval.hybrid": 20.0, "generate": 60.0}}
+
+
+def _score(batches):
+    def score(samples):
+        batches.append(len(samples))
+        return [{"faithfulness": 1.0, "context_relevance": 0.5, "completeness": 0.75} for _ in samples]
+    return score
+
+
+def test_questions_from_file_and_feedback(tmp_path):
+    path = tmp_path / "q.jsonl"
+    path.write_text('{"question": "What is SOP1?", "top_k": 5, "extra": 1}\nplain question\n\n')
+    assert load_questions(str(path)) == [{"question": "What is SOP1?", "top_k": 5}, {"question": "plain question"}]
+    store = FeedbackStore(str(tmp_path / "fb.db"))
+    for question, rating in (("good", 3), ("bad", 1), ("neutral", 2)):
+        store.add_feedback(timestamp="2025-01-01T00:00:00", question=question, rating=rating)
+    store.flush()
+    assert feedback_questions(store, min_rating=2) == [{"question": "neutral"}, {"question": "good"}]
+    store.close()
+
+
+def test_batches_checkpoints_and_resumes(tmp_path):
+    store = FeedbackStore(str(tmp_path / "fb.db"))
+    checkpoint = str(tmp_path / "run.jsonl")
+    batches = []
+    items = [{"question": f"q{i}"} for i in range(5)] + [{"question": "Q1 "}, {"question": "broken"}]
+    first = BatchEvaluator("rerank=llm", checkpoint, store, answer=_answer, score=_score(batches),
+                           concurrency=3, processes=0, batch_size=2)
+    summary = first.run(items[:3] + items[5:])
+    assert summary["questions"] == 3 and summary["errors"] == 1
+    assert sorted(batches) == [1, 2]
+    # A resumed run only answers what is not checkpointed yet
+    answered = []
+    second = BatchEvaluator("", checkpoint, store, answer=lambda item: answered.append(item) or _answer(item),
+                            score=_score(batches), processes=0, batch_size=2)
+    summary = second.run(items)
+    assert second.run_id == first.run_id and second.label == "rerank=llm"
+    assert sorted(item["question"] for item in answered) == ["broken", "q3", "q4"]
+    assert summary["questions"] == 5 and summary["errors"] == 1 and summary["faithfulness"] == 1.0
+    assert summary["latency_ms"]["p95"] == 100.0 and summary["stages_ms"]["generate"] == 60.0
+    with sqlite3.connect(store.path) as conn:
+        rows = conn.execute("SELECT question, config, latency_ms, stages_ms FROM evaluation WHERE run_id = ?", (first.run_id,)).fetchall()
+    per_question = [r for r in rows if r[0] is not None]
+    assert len(per_question) == 5 and all(r[1] == "rerank=llm" for r in rows)
+    assert json.loads(per_question[0][3]) == {"retrieval.hybrid": 20.0, "generate": 60.0}
+    # A session with nothing left to answer still reports the run's checkpointed failure
+    third = BatchEvaluator("", checkpoint, store, answer=_answer, score=_score(batches), processes=0)
+    assert third.run(items[:5])["errors"] == 1
+    with sqlite3.connect(store.path) as conn:
+        aggregates = conn.execute("SELECT latency_ms FROM evaluation WHERE run_id = ? AND question IS NULL", (first.run_id,)).fetchall()
+    # One aggregate row per run, replaced by each session
+    assert aggregates == [(100.0,)]
+    store.close()
+
+
+def test_existing_evaluation_table_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE evaluation (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, question TEXT, answer TEXT, "
+                     "context TEXT, faithfulness REAL, context_relevance REAL, completeness REAL)")
+        conn.execute("INSERT INTO evaluation (question) VALUES ('old')")
+    store = FeedbackStore(path)
+    store.add_evaluation(question="new", run_id="r1", latency_ms=12.5)
+    store.flush()
+    assert [row["question"] for row in store.page("evaluation")] == ["new", "old"]
+    assert store.page("evaluation")[0]["latency_ms"] == 12.5
+    store.close()
@@ -0,0 +1,39 @@
+import sys
+import os
+import uuid
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.rag.catalog import SopCatalog
+
+ROWS = [
+    {"sop": "Space Handover SOP", "title": "Purpose", "department": "BDM", "tags": ""},
+    {"sop": "Space Handover SOP", "title": "Key Transfer (Part 1)", "department": "BDM", "tags": ""},
+    {"sop": "Space Handover SOP", "title": "Key Transfer (Part 2)", "department": "BDM", "tags": ""},
+    {"sop": "Vendor Payments SOP", "title": "Approvals", "department": "Finance", "tags": "finance"},
+]
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.objects = [SimpleNamespace(uuid=uuid.uuid4(), properties=row) for row in rows]
+    def iterator(self, return_properties=None, cache_size=None):
+        return iter(self.objects)
+
+def make_catalog():
+    collection = FakeCollection(ROWS)
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: collection))
+    return SopCatalog().load(client), collection
+
+def test_list_sops_respects_access_and_filter():
+    catalog, _ = make_catalog()
+    assert catalog.list_sops("", {}) == ["Space Handover SOP"]
+    assert catalog.list_sops("", {"role": "Finance"}) == ["Space Handover SOP", "Vendor Payments SOP"]
+    assert catalog.list_sops("vendor payment", {"role": "finance"}) == ["Vendor Payments SOP"]
+
+def test_section_ids_exact_and_fuzzy():
+    catalog, collection = make_catalog()
+    part_ids = [str(o.uuid) for o in collection.objects[1:3]]
+    # Parts of one section share a key and keep ingestion order
+    assert catalog.section_ids("Space Handover SOP", "Key Transfer") == part_ids
+    assert catalog.section_ids("space handover", "key transfer (Part 2)") == part_ids
+    assert catalog.section_ids(None, "Aprovals") == [str(collection.objects[3].uuid)]
+    assert catalog.section_ids("Space Handover SOP", "Completely unrelated") == []
@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+from stub_ollama import StubOllama
+from app.ollama import client as ollama_client
+
+def test_chat_session_reuses_prefix(monkeypatch):
+    stub = StubOllama(responder=lambda kind, prompt, request: "SEARCH: handover")
+    monkeypatch.setattr(ollama_client, "OLLAMA_URL", stub.start())
+    monkeypatch.setattr(ollama_client, "OPENAI_API_KEY", None)
+    try:
+        session = ollama_client.ChatSession("You are an SOP assistant. " * 50)
+        assert session.send("Question: how do I hand over a space?") == "SEARCH: handover"
+        first_prefill = session.prompt_eval_tokens
+        session.send("Observation: two short results.")
+    finally:
+        stub.stop()
+    assert [m["role"] for m in session.messages] == ["system", "user", "assistant", "user", "assistant"]
+    # The second turn only prefills the new observation, not the system prompt again
+    assert session.prompt_eval_tokens - first_prefill < 10
+    assert stub.stats["cached_tokens"] > first_prefill
+
+def _prefill_per_step(monkeypatch, compact_target, steps=12):
+    from app.rag.agent_context import AgentContext
+    from app.rag.chunk import Chunk
+    stub = StubOllama(responder=lambda kind, prompt, request: '{"action": "SEARCH", "input": "more"}')
+    monkeypatch.setattr(ollama_client, "OLLAMA_URL", stub.start())
+    monkeypatch.setattr(ollama_client, "OPENAI_API_KEY", None)
+    prefills = []
+    try:
+        session = ollama_client.ChatSession("You are an SOP assistant.")
+        context = AgentContext(session, budget_tokens=900, compact_target=compact_target)
+        for step in range(steps):
+            chunks = [Chunk(title=f"Step {step} chunk {i}", content=f"detail{step} " * 40, summary="short") for i in range(2)]
+            before = session.prompt_eval_tokens
+            context.send(context.observation(f"SEARCH results {step}", chunks))
+            prefills.append(session.prompt_eval_tokens - before)
+    finally:
+        stub.stop()
+    assert context.max_prompt_tokens <= 900
+    # A step that rewrote an earlier message re-prefills from there; the others only their new turn
+    rewrites = sum(1 for p in prefills if p > 2 * prefills[1])
+    assert rewrites == context.compaction_passes
+    return rewrites
+
+def test_compaction_rarely_invalidates_the_prefix(monkeypatch):
+    # Compacting just enough to fit rewrites history on every step once the budget is reached
+    just_fits = _prefill_per_step(monkeypatch, compact_target=1.0)
+    low_water = _prefill_per_step(monkeypatch, compact_target=0.7)
+    assert 1 <= low_water <= 2 < just_fits
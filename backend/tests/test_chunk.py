@@ -0,0 +1,29 @@
+import sys
+import os
+import types
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import numpy as np
+from app.rag.chunk import to_chunks, chunks_to_json
+
+
+def _obj(title, embedding, score=0.5):
+    return types.SimpleNamespace(uuid=f"id-{title}", metadata=types.SimpleNamespace(score=score),
+                                 properties={"title": title, "content": f"{title} body", "sop": "SOP1", "tags": "", "embedding": embedding})
+
+
+def test_result_set_shares_one_vector_block():
+    chunks = to_chunks([_obj("A", [1.0, 0.0]), _obj("B", None), _obj("C", [0.0, 2.0]), _obj("D", [1.0])])
+    assert chunks[0].vectors is chunks[2].vectors
+    assert chunks[0].vectors.dtype == np.float32 and chunks[0].vectors.shape == (2, 2)
+    assert chunks[1].embedding is None and chunks[3].embedding is None
+    assert chunks[2].embedding.tolist() == [0.0, 2.0]
+    assert not hasattr(chunks[0], "__dict__")
+
+
+def test_json_shape_at_the_boundary():
+    chunk = to_chunks([_obj("A", [0.5, 0.25])])[0]
+    assert chunk.to_dict() == {"uuid": "id-A", "title": "A", "content": "A body", "section": None, "summary": None,
+                               "sop": "SOP1", "tags": "", "embedding": [0.5, 0.25], "score": 0.5}
+    merged = chunk.replace(title="A (Parts 1-2)", embedding=None)
+    assert merged.to_dict()["embedding"] is None and chunk.embedding is not None
+    assert chunks_to_json(["SOP1", [chunk]], include_embedding=False)[1][0]["title"] == "A"
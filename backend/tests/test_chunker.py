@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.ingestion.chunker import chunk_paragraphs, token_histogram
+from app.tokenizer import count_tokens
+
+PARAGRAPHS = [
+    " ".join(f"Step {p}.{i}: record the client requirement in the tracker." for i in range(12))
+    for p in range(6)
+]
+
+def test_chunks_respect_max_and_target():
+    chunks = chunk_paragraphs(PARAGRAPHS, target_tokens=60, max_tokens=90, overlap_tokens=0)
+    sizes = [count_tokens(c) for c in chunks]
+    assert len(chunks) > 1
+    assert max(sizes) <= 90
+    # Every chunk but the last reaches the target, and each ends on a sentence
+    assert all(size >= 60 for size in sizes[:-1])
+    assert all(c.endswith(".") for c in chunks)
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = chunk_paragraphs(PARAGRAPHS, target_tokens=60, max_tokens=90, overlap_tokens=20)
+    last_sentence = chunks[0].split(". ")[-1]
+    assert chunks[1].startswith(last_sentence.rstrip("."))
+
+def test_oversized_sentence_is_hard_split():
+    chunks = chunk_paragraphs(["word " * 500], target_tokens=100, max_tokens=120, overlap_tokens=0)
+    assert all(count_tokens(c) <= 120 for c in chunks)
+    assert sum(count_tokens(c) for c in chunks) == 500
+
+def test_token_histogram():
+    assert token_histogram([10, 100, 2000], bins=(64, 512)) == [("<=64", 1), ("<=512", 1), (">512", 1)]
@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import numpy as np
+from app.rag.chunk import Chunk
+from app.rag.context import pack_context, collapse_near_duplicates, merge_adjacent_parts
+
+def _chunk(title, content, embedding=None, sop="Handover SOP"):
+    vectors = np.asarray([embedding], dtype=np.float32) if embedding else None
+    return Chunk(title=title, content=content, sop=sop, tags="", vectors=vectors, row=0 if embedding else -1)
+
+def test_near_duplicates_collapse_into_higher_ranked():
+    chunks = [
+        _chunk("A", "Walk through the space.", [1.0, 0.0, 0.0]),
+        _chunk("A copy", "Walk the space through.", [0.99, 0.01, 0.0]),
+        _chunk("B", "Sign the checklist.", [0.0, 1.0, 0.0]),
+        _chunk("B again", "Sign the checklist."),
+    ]
+    assert [c.title for c in collapse_near_duplicates(chunks, threshold=0.95)] == ["A", "B"]
+
+def test_adjacent_parts_merge_without_overlap():
+    chunks = [
+        _chunk("Keys (Part 2)", "Collect all keys. Record serial numbers on the form."),
+        _chunk("Other", "Unrelated."),
+        _chunk("Keys (Part 1)", "Book the walkthrough. Collect all keys."),
+        _chunk("Keys (Part 4)", "Archive the form."),
+    ]
+    merged, merges = merge_adjacent_parts(chunks)
+    assert merges == 1
+    assert [c.title for c in merged] == ["Keys (Parts 1-2)", "Other", "Keys (Part 4)"]
+    assert merged[0].content == "Book the walkthrough. Collect all keys. Record serial numbers on the form."
+
+def test_pack_respects_budget_and_reports_savings():
+    body = "word " * 100
+    chunks = [_chunk(f"S{i}", f"{i} {body}", [float(i == j) for j in range(10)]) for i in range(10)]
+    chunks.insert(1, chunks[0].replace(title="dup"))
+    packed = pack_context(chunks, budget_tokens=350, max_chunks=8)
+    assert packed.stats["tokens_after"] <= 350
+    assert packed.stats["duplicates_collapsed"] == 1
+    assert packed.stats["packed_chunks"] == 3
+    assert packed.stats["tokens_saved"] == packed.stats["tokens_before"] - packed.stats["tokens_after"] > 0
+    assert packed.text.startswith("[S0] 0 word")
+
+def test_top_chunk_is_kept_when_over_budget():
+    chunks = [_chunk("Top", "word " * 500, [1.0, 0.0]), _chunk("Small", "Sign the checklist.", [0.0, 1.0])]
+    packed = pack_context(chunks, budget_tokens=100, max_chunks=8)
+    assert packed.chunks[0].title == "Top"
+    assert packed.stats["tokens_after"] <= 100
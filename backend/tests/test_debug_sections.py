@@ -0,0 +1,64 @@
+import sys
+import os
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import rag
+from fake_weaviate import FakeWeaviateClient, seed_sections
+
+client = TestClient(app)
+
+
+def setup_fake(monkeypatch):
+    fake = FakeWeaviateClient()
+    sops = seed_sections(fake, sops=3, sections_per_sop=5, words_per_section=20, embed_dim=8)
+    monkeypatch.setattr(rag, "get_client", lambda: fake)
+    return fake, sops
+
+
+def walk(params):
+    pages, after = [], None
+    while True:
+        body = client.get("/rag/debug/sections", params={**params, **({"after": after} if after else {})}).json()
+        pages.append(body["sections"])
+        after = body["next_after"]
+        if not after:
+            return pages
+
+
+def test_cursor_pages_cover_the_collection(monkeypatch):
+    fake, sops = setup_fake(monkeypatch)
+    pages = walk({"limit": 4})
+    uuids = [s["uuid"] for page in pages for s in page]
+    assert len(uuids) == len(set(uuids)) == 15
+    assert [len(p) for p in pages] == [4, 4, 4, 3]
+    # Filtered by SOP: paged over the SOP's IDs read from the index
+    sop_pages = walk({"limit": 2, "sop": sops[1]})
+    assert [s["sop"] for page in sop_pages for s in page] == [sops[1]] * 5
+
+
+def test_sop_pages_continue_past_deleted_ids(monkeypatch):
+    fake, sops = setup_fake(monkeypatch)
+    ids = rag._sop_ids(fake.collections.get("Section"), sops[0])
+    assert len(ids) == 5
+    # An object deleted between the ID pass and the fetch shortens the page but not the walk
+    missing = "00000000-0000-0000-0000-000000000000"
+    monkeypatch.setattr(rag, "_sop_ids", lambda collection, sop: sorted(ids + [missing]))
+    pages = walk({"limit": 2, "sop": sops[0]})
+    # 6 IDs in pages of 2: the last full page is followed by an empty one
+    assert [len(p) for p in pages] == [1, 2, 2, 0]
+    assert sorted(s["uuid"] for page in pages for s in page) == ids
+
+
+def test_stream_and_aggregates(monkeypatch):
+    fake, sops = setup_fake(monkeypatch)
+    body = client.get("/rag/debug/sections", params={"aggregate": "true", "limit": 1}).json()
+    assert {a["sop"]: a["sections"] for a in body["sops"]} == {s: 5 for s in sops}
+    response = client.get("/rag/debug/sections", params={"format": "ndjson", "aggregate": "true", "content_chars": 10})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 16 and all(len(line["content"]) <= 10 for line in lines[:-1])
+    summary = lines[-1]["aggregate"]
+    assert [a["sections"] for a in summary] == [5, 5, 5]
+    assert all(a["avg_content_length"] > 10 for a in summary)
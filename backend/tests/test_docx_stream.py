@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from docx import Document
+from app.ingestion.docx_stream import iter_docx_blocks
+
+def _build_docx(path):
+    doc = Document()
+    doc.add_heading("Client Office Tour", level=1)
+    doc.add_paragraph("Confirm the visit date with the client.")
+    doc.add_paragraph("Preparation:")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Step"
+    table.cell(0, 1).text = "Owner"
+    table.cell(1, 0).text = "Book meeting room"
+    table.cell(1, 1).text = "BDM"
+    doc.add_paragraph("Share the agenda in advance.")
+    doc.save(path)
+
+def test_iter_docx_blocks(tmp_path):
+    path = tmp_path / "tour.docx"
+    _build_docx(path)
+    blocks = list(iter_docx_blocks(path))
+    assert [(b.kind, b.text) for b in blocks] == [
+        ("heading", "Client Office Tour"),
+        ("paragraph", "Confirm the visit date with the client."),
+        ("heading", "Preparation:"),
+        ("table_row", "Step | Owner"),
+        ("table_row", "Book meeting room | BDM"),
+        ("paragraph", "Share the agenda in advance."),
+    ]
+    # Style-based headings carry their level, regex-detected ones do not
+    assert blocks[0].level == 1
+    assert blocks[2].level is None
+
+def test_ingest_docx_single_pass(tmp_path, monkeypatch):
+    from app.ingestion import docx_ingest
+    path = tmp_path / "tour.docx"
+    _build_docx(path)
+    stored = []
+    monkeypatch.setattr(docx_ingest, "get_client", lambda: None)
+    monkeypatch.setattr(docx_ingest, "create_schema", lambda client: None)
+    monkeypatch.setattr(docx_ingest, "upsert_department", lambda client, name: None)
+    monkeypatch.setattr(docx_ingest, "upsert_sop", lambda client, title, department: None)
+    monkeypatch.setattr(docx_ingest, "get_embedding", lambda text: [0.0])
+    monkeypatch.setattr(docx_ingest, "store_section_in_weaviate", lambda obj: stored.append(obj) or True)
+    docx_ingest.ingest_docx(str(path))
+    assert [s["title"] for s in stored] == ["Overview", "Client Office Tour", "Preparation"]
+    assert "Book meeting room | BDM" in stored[2]["content"]
@@ -0,0 +1,83 @@
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import numpy as np
+from app.rag.expansion import QueryExpander, lemma
+
+TABLE = {"expansion": ["expand", "growth"], "closure": ["close", "account closure"]}
+
+
+def _expander(tmp_path, table=TABLE, reload_seconds=60):
+    path = tmp_path / "synonyms.json"
+    path.write_text(json.dumps(table))
+    batches = []
+    def embed(texts):
+        batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+    return QueryExpander(str(path), embed=embed, reload_seconds=reload_seconds).refresh(), path, batches
+
+
+def _rewrite(path, table, bump):
+    path.write_text(table if isinstance(table, str) else json.dumps(table))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + bump))
+
+
+def test_lemmatized_and_fuzzy_matches(tmp_path):
+    expander, _, batches = _expander(tmp_path)
+    assert lemma("expanding") == lemma("expand") == lemma("expands")
+    assert expander.expand("How do I handle a client expanding?").terms == ["expansion"]
+    assert expander.expand("steps for account closing").phrases == ["closure", "account closure"]
+    assert expander.expand("clinet expanson rules").terms == ["expansion"]
+    assert expander.expand("holiday policy").phrases == []
+    # Every phrase embedded once, in one batch
+    assert len(batches) == 1 and sorted(batches[0]) == sorted({"expansion", "expand", "growth", "closure", "close", "account closure"})
+
+
+def test_reload_embeds_only_new_phrases(tmp_path):
+    expander, path, batches = _expander(tmp_path)
+    assert expander.expand("downsizing plan").terms == []
+    _rewrite(path, dict(TABLE, downsizing=["reduce"]), 5)
+    # Requests never reload or embed; the next refresh does
+    assert expander.expand("downsizing plan").terms == [] and len(batches) == 1
+    expander.refresh()
+    assert expander.expand("downsizing plan").phrases == ["reduce"]
+    assert batches[1] == ["downsizing", "reduce"]
+    # A broken file keeps the previous table
+    _rewrite(path, "{not json", 10)
+    expander.refresh()
+    assert expander.expand("downsizing plan").phrases == ["reduce"]
+
+
+def test_watcher_swaps_in_reloads(tmp_path):
+    path = tmp_path / "synonyms.json"
+    path.write_text(json.dumps(TABLE))
+    def down(texts):
+        raise ConnectionError("embedding backend down")
+    expander = QueryExpander(str(path), embed=down, reload_seconds=0.05).start()
+    try:
+        deadline = time.monotonic() + 5
+        while expander.reloads < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Loaded in the background; without vectors it expands by keywords only
+        expansion = expander.expand("client growth")
+        assert expansion.terms == ["expansion"] and expansion.vectors is None
+        _rewrite(path, dict(TABLE, downsizing=["reduce"]), 5)
+        while expander.reloads < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert expander.expand("downsizing plan").phrases == ["reduce"]
+    finally:
+        expander.stop()
+
+
+def test_fuse_blends_unit_vectors(tmp_path):
+    expander, _, _ = _expander(tmp_path)
+    expansion = expander.expand("client growth")
+    assert expansion.phrases == ["expansion", "expand"] and expansion.vectors.shape == (2, 2)
+    fused = np.asarray(expansion.fuse([0.0, 5.0], weight=0.5))
+    assert abs(np.linalg.norm(fused) - 1) < 1e-6 and fused[0] > 0
+    assert expansion.fuse([0.0, 5.0], weight=0) == [0.0, 1.0]
+    assert expansion.fuse([1.0, 2.0, 3.0]) == [1.0, 2.0, 3.0]
+    assert expander.expand("holiday").fuse([1.0, 2.0]) == [1.0, 2.0]
@@ -0,0 +1,96 @@
+import sys
+import os
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from fastapi.testclient import TestClient
+from app import feedback_store
+from app.feedback_store import FeedbackStore
+from app.main import app
+
+
+def test_writes_are_batched_and_flushed(tmp_path):
+    store = FeedbackStore(str(tmp_path / "fb.db"), batch_size=50, flush_interval=5.0)
+    threads = [threading.Thread(target=lambda i=i: store.add_feedback(timestamp=f"2025-01-01T00:00:{i:02d}", question=f"q{i}", rating=i % 3 + 1))
+               for i in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.add_evaluation(timestamp="2025-01-01T00:01:00", question="q", answer="a", faithfulness=0.9)
+    # flush() commits the partial batch without waiting for flush_interval
+    assert store.flush(timeout=2)
+    with store.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0] == 40
+        assert conn.execute("SELECT faithfulness FROM evaluation").fetchone()[0] == 0.9
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[1] for row in conn.execute("SELECT * FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_feedback_timestamp", "idx_feedback_rating", "idx_evaluation_timestamp"} <= indexes
+    store.close()
+
+
+def test_close_commits_queued_rows(tmp_path):
+    path = str(tmp_path / "fb.db")
+    store = FeedbackStore(path, batch_size=1000, flush_interval=60)
+    for i in range(10):
+        store.add_feedback(question=f"q{i}", rating=3)
+    store.close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0] == 10
+    conn.close()
+
+
+def test_feedback_endpoint_enqueues(tmp_path, monkeypatch):
+    store = FeedbackStore(str(tmp_path / "fb.db"), flush_interval=0.01)
+    monkeypatch.setattr(feedback_store, "_store", store)
+    client = TestClient(app)
+    response = client.post("/rag/feedback", json={"question": "q", "answer": "a", "context": ["c1", "c2"], "rating": 3})
+    assert response.json() == {"status": "ok"}
+    store.flush()
+    rows = client.get("/rag/admin/feedback").json()
+    assert rows[0]["question"] == "q" and rows[0]["context"] == "c1\nc2"
+    store.close()
+
+
+def test_admin_pagination_and_streaming_exports(tmp_path, monkeypatch):
+    store = FeedbackStore(str(tmp_path / "fb.db"), flush_interval=0.01)
+    monkeypatch.setattr(feedback_store, "_store", store)
+    for day in range(1, 6):
+        store.add_feedback(timestamp=f"2025-03-0{day}T12:00:00", question=f"q{day}", answer="a", rating=3)
+    store.flush()
+    client = TestClient(app)
+
+    first = client.get("/rag/admin/feedback", params={"limit": 2})
+    assert [r["question"] for r in first.json()] == ["q5", "q4"]
+    second = client.get("/rag/admin/feedback", params={"limit": 2, "after_id": first.headers["X-Next-After-Id"]})
+    assert [r["question"] for r in second.json()] == ["q3", "q2"]
+    in_range = client.get("/rag/admin/feedback", params={"since": "2025-03-02", "until": "2025-03-04"})
+    assert [r["question"] for r in in_range.json()] == ["q3", "q2"]
+    assert "X-Next-After-Id" not in in_range.headers
+    assert client.get("/rag/admin/feedback", params={"since": "yesterday"}).status_code == 400
+
+    monkeypatch.setattr(feedback_store, "EXPORT_BATCH_ROWS", 2)
+    ndjson = client.get("/rag/admin/feedback/ndjson", params={"since": "2025-03-02"})
+    assert [json.loads(line)["question"] for line in ndjson.text.splitlines()] == ["q5", "q4", "q3", "q2"]
+    gz = client.get("/rag/admin/feedback/csv", params={"gzip": "true"})
+    assert gz.headers["content-type"] == "application/gzip"
+    rows = list(csv.reader(io.StringIO(gzip.decompress(gz.content).decode("utf-8"))))
+    assert rows[0][:2] == ["id", "timestamp"] and len(rows) == 6
+    store.close()
+
+
+def test_full_queue_drops_without_blocking(tmp_path):
+    store = FeedbackStore(str(tmp_path / "fb.db"), queue_max=2)
+    # No writer draining the queue
+    store._ensure_writer = lambda: None
+    dropped = feedback_store.FEEDBACK_DROPPED.value(table="feedback")
+    started = time.perf_counter()
+    for i in range(3):
+        store.add_feedback(question=f"q{i}", rating=3)
+    assert time.perf_counter() - started < 0.1
+    assert feedback_store.FEEDBACK_DROPPED.value(table="feedback") == dropped + 1
@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+import numpy as np
+from weaviate.classes.query import Filter
+from app.rag import retrieval
+from app.rag.local_index import LocalSectionIndex
+from app.weaviate_client.snapshot import export_snapshot
+from fake_weaviate import FakeWeaviateClient
+from stub_ollama import stub_embedding
+
+DIM = 16
+ROWS = [
+    ("00000000-0000-0000-0000-000000000001", {"title": "Key handover", "content": "Collect keys and badges from the client at handover.", "sop": "Handover SOP", "department": "BDM", "tags": ""}),
+    ("00000000-0000-0000-0000-000000000002", {"title": "Walkthrough", "content": "Walk the space with the client before handover.", "sop": "Handover SOP", "department": "BDM", "tags": ""}),
+    ("00000000-0000-0000-0000-000000000003", {"title": "Invoice approval", "content": "Vendor invoices need finance approval before payment.", "sop": "Vendor Payments SOP", "department": "Finance", "tags": "finance"}),
+    ("00000000-0000-0000-0000-000000000004", {"title": "Visitor booking", "content": "Book a meeting room and register the visitor at reception.", "sop": "Reception SOP", "department": "Facilities", "tags": ""}),
+]
+
+
+def make_index():
+    rows = [(uid, dict(props, embedding=stub_embedding(props["content"], DIM))) for uid, props in ROWS]
+    return LocalSectionIndex().load_rows(rows)
+
+
+def titles(result):
+    return [obj.properties["title"] for obj in result.objects]
+
+
+def test_bm25_only_returns_keyword_matches_in_rank_order():
+    index = make_index()
+    result = index.hybrid(query="client handover keys", alpha=0.0, limit=10)
+    assert titles(result) == ["Key handover", "Walkthrough"]
+    assert result.objects[0].metadata.score >= result.objects[1].metadata.score
+
+
+def test_vector_search_finds_exact_embedding():
+    index = make_index()
+    content = ROWS[3][1]["content"]
+    result = index.hybrid(query="", vector=stub_embedding(content, DIM), alpha=1.0, limit=1)
+    assert titles(result) == ["Visitor booking"]
+    assert str(result.objects[0].uuid) == ROWS[3][0]
+    # The embedding property comes back from the vector matrix
+    assert np.allclose(result.objects[0].properties["embedding"], stub_embedding(content, DIM), atol=1e-6)
+
+
+def test_filters():
+    index = make_index()
+    by_department = index.hybrid(query="approval handover", alpha=0.0, filters=Filter.by_property("department").equal("Finance"))
+    assert titles(by_department) == ["Invoice approval"]
+    both = Filter.by_property("department").equal("BDM") & Filter.by_property("sop").like("hand*")
+    assert set(titles(index.fetch_objects(filters=both))) == {"Key handover", "Walkthrough"}
+    either = Filter.by_property("tags").equal("finance") | Filter.by_property("department").not_equal("BDM")
+    assert set(titles(index.fetch_objects(filters=either))) == {"Invoice approval", "Visitor booking"}
+    by_id = index.fetch_objects(filters=Filter.by_id().contains_any([ROWS[1][0], ROWS[3][0]]), return_properties=["title"])
+    assert titles(by_id) == ["Walkthrough", "Visitor booking"]
+    assert set(by_id.objects[0].properties) == {"title"}
+
+
+def test_sync_from_weaviate_and_snapshot_agree(tmp_path):
+    client = FakeWeaviateClient()
+    collection = client.collections.get("Section")
+    for uid, props in ROWS:
+        collection.data._store(dict(props, embedding=stub_embedding(props["content"], DIM)), uuid=uid)
+    replica = LocalSectionIndex().load_from_client(client)
+    export_snapshot(str(tmp_path), client=client)
+    standalone = LocalSectionIndex().load_snapshot(str(tmp_path))
+    assert replica.size == standalone.size == len(ROWS)
+    vector = stub_embedding(ROWS[2][1]["content"], DIM)
+    for index in (replica, standalone):
+        result = index.hybrid(query="vendor invoice approval", vector=vector, alpha=0.5, limit=2)
+        assert titles(result)[0] == "Invoice approval"
+
+
+def test_section_search_prefers_loaded_local_index(monkeypatch):
+    index = make_index()
+    monkeypatch.setattr(retrieval, "RETRIEVAL_BACKEND", "local")
+    monkeypatch.setattr(retrieval, "get_local_index", lambda: index)
+    def no_weaviate():
+        raise AssertionError("Weaviate should not be contacted")
+    assert retrieval.section_search(no_weaviate) is index
+    monkeypatch.setattr(retrieval, "get_local_index", lambda: LocalSectionIndex())
+    client = FakeWeaviateClient()
+    assert isinstance(retrieval.section_search(lambda: client), retrieval.WeaviateSectionSearch)
@@ -0,0 +1,54 @@
+import sys
+import os
+import io
+import json
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app import log
+
+def _capture(fmt="text"):
+    log.shutdown_logging()
+    stream = io.StringIO()
+    log.setup_logging(level="DEBUG", fmt=fmt, stream=stream)
+    return stream
+
+def _flush():
+    log.shutdown_logging()
+    # Later tests (and the app) get the default handler back
+    log.setup_logging()
+
+def test_truncates_large_payloads():
+    stream = _capture()
+    logging.getLogger("app.test").info("chunk: %s", "x" * 5000)
+    _flush()
+    line = stream.getvalue().strip()
+    assert "more chars]" in line
+    assert len(line) < 2200
+
+def test_debug_records_follow_request_sampling():
+    stream = _capture(fmt="json")
+    logger = logging.getLogger("app.test")
+    token = log.start_request_sampling(rate=0.0)
+    assert not log.debug_enabled(logger)
+    logger.debug("dropped")
+    logger.info("kept")
+    log.end_request_sampling(token)
+    token = log.start_request_sampling(rate=1.0)
+    logger.debug("sampled")
+    log.end_request_sampling(token)
+    _flush()
+    output = stream.getvalue()
+    assert "dropped" not in output
+    assert '"msg": "kept"' in output and '"msg": "sampled"' in output
+
+def test_json_records_carry_the_whole_traceback():
+    stream = _capture(fmt="json")
+    try:
+        raise ValueError("x" * 5000)
+    except ValueError:
+        logging.getLogger("app.test").exception("ingest failed")
+    _flush()
+    entry = json.loads(stream.getvalue().strip())
+    assert entry["msg"] == "ingest failed"
+    assert entry["exc"].startswith("Traceback") and "more chars]" not in entry["exc"]
+    assert entry["exc"].endswith("x" * 100)
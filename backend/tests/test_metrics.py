@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from fastapi.testclient import TestClient
+from app.main import app
+from app import metrics
+
+client = TestClient(app)
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    requests_total = registry.counter("demo_requests_total", "Demo requests", ["route"])
+    latency = registry.histogram("demo_seconds", "Demo latency", buckets=(0.1, 1.0))
+    requests_total.inc(route="/a")
+    requests_total.inc(2, route="/a")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    text = registry.render()
+    assert '# TYPE demo_requests_total counter' in text
+    assert 'demo_requests_total{route="/a"} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 2' in text
+    assert 'demo_seconds_count 2' in text
+
+def test_stage_records_into_active_trace():
+    before = metrics.STAGE_SECONDS.count(stage="unit")
+    trace, token = metrics.start_trace()
+    try:
+        with metrics.stage("unit"):
+            pass
+        metrics.record_weaviate("hybrid")
+    finally:
+        metrics.end_trace(token)
+    assert metrics.STAGE_SECONDS.count(stage="unit") == before + 1
+    assert list(trace.totals()) == ["unit"]
+    assert trace.counters["weaviate_requests"] == 1
+    assert trace.server_timing().startswith("unit;dur=")
+
+def test_server_timing_header_and_metrics_endpoint():
+    response = client.get("/health")
+    assert "total;dur=" in response.headers["Server-Timing"]
+    text = client.get("/metrics").text
+    assert 'http_request_seconds_count{method="GET",route="/health",status="200"}' in text
@@ -0,0 +1,40 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.profile_store import ProfileStore
+from app.rag.search import UserContext, filter_by_access
+from app.rag.chunk import Chunk
+
+CHUNKS = [Chunk(title="Public", tags=""), Chunk(title="Finance", tags="Finance, HR"), Chunk(title="Legal", tags=["legal"])]
+
+
+def test_profile_stored_once_and_overlays_not_persisted(tmp_path):
+    store = ProfileStore(str(tmp_path / "profiles.db"))
+    ctx = store.user_context("u1", {"role": "Finance"})
+    assert ctx == {"role": "Finance"} and ctx.roles == {"finance"}
+    # A later request's profile overlays the stored one for that request only
+    assert store.user_context("u1", {"role": ["Legal"]}).roles == {"legal"}
+    assert store.user_context("u1").roles == {"finance"}
+    assert store.user_context(None, {"role": "hr"}).roles == {"hr"}
+
+
+def test_workers_share_profiles_and_cache_is_bounded(tmp_path):
+    path = str(tmp_path / "profiles.db")
+    worker_a = ProfileStore(path, cache_size=2, ttl=0)
+    worker_b = ProfileStore(path, cache_size=2, ttl=60)
+    worker_a.user_context("u1", {"role": "finance"})
+    # First writer wins: another worker sees the same stored profile
+    assert worker_b.user_context("u1", {"role": "legal"}).roles == {"legal"}
+    assert worker_b.user_context("u1").roles == {"finance"}
+    for i in range(5):
+        worker_b.user_context(f"user{i}", {"role": "hr"})
+    assert len(worker_b._cache) == 2
+    # Updates reach a worker once its cached copy expires (ttl=0 here)
+    worker_b.put("u1", {"role": "hr"})
+    assert worker_a.user_context("u1").roles == {"hr"}
+
+
+def test_filter_by_access_with_compiled_roles():
+    assert [c.title for c in filter_by_access(CHUNKS, UserContext(role="hr"))] == ["Public", "Finance"]
+    assert [c.title for c in filter_by_access(CHUNKS, {"role": ["LEGAL"]})] == ["Public", "Legal"]
+    assert [c.title for c in filter_by_access(CHUNKS, None)] == ["Public"]
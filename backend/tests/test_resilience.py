@@ -0,0 +1,104 @@
+import sys
+import os
+import time
+import types
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+import pytest
+from fastapi.testclient import TestClient
+from stub_ollama import StubOllama
+from fake_weaviate import FakeWeaviateClient
+from app.main import app
+from app.ollama import client as ollama_client
+from app.ollama import resilience
+from app.ollama.resilience import CircuitBreaker, Failover, ProviderUnavailable
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubOllama(responder=lambda kind, prompt, request: "ollama reply")
+    monkeypatch.setattr(ollama_client, "OLLAMA_URL", stub.start())
+    monkeypatch.setattr(ollama_client, "OPENAI_API_KEY", None)
+    # Fresh breakers and near-zero backoff per test
+    breakers = {name: CircuitBreaker(name, failure_threshold=2, reset_timeout=60) for name in ("ollama", "openai")}
+    monkeypatch.setattr(ollama_client, "BREAKERS", breakers)
+    monkeypatch.setattr(ollama_client, "_failover", Failover(breakers, retries=2, base_delay=0.001, max_delay=0.001))
+    yield stub
+    stub.stop()
+
+
+def _fake_openai(monkeypatch, calls):
+    def create(**kwargs):
+        calls.append(kwargs)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message={"content": "openai reply"})], usage={})
+    monkeypatch.setattr(ollama_client, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(ollama_client, "_openai", types.SimpleNamespace(ChatCompletion=types.SimpleNamespace(create=create)))
+
+
+def test_transient_errors_are_retried(stub):
+    retries = resilience.RETRIES.value(backend="ollama", operation="generate")
+    stub.fail("/api/generate", times=2, status=503)
+    assert ollama_client.get_llm_completion("q") == "ollama reply"
+    assert resilience.RETRIES.value(backend="ollama", operation="generate") == retries + 2
+    assert ollama_client.BREAKERS["ollama"].state == "closed"
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.fail("/api/generate", times=1, status=400)
+    with pytest.raises(Exception) as error:
+        ollama_client.get_llm_completion("q")
+    assert not isinstance(error.value, ProviderUnavailable)
+    assert ollama_client.get_llm_completion("q") == "ollama reply"
+
+
+def test_breaker_opens_and_fails_over(stub, monkeypatch):
+    calls = []
+    _fake_openai(monkeypatch, calls)
+    monkeypatch.setattr(ollama_client, "LLM_BACKEND_ORDER", "ollama,openai")
+    stub.fail("/api/generate", times=100, status=500)
+    assert ollama_client.get_llm_completion("q") == "openai reply"
+    assert ollama_client.get_llm_completion("q") == "openai reply"
+    assert ollama_client.BREAKERS["ollama"].state == "open"
+    assert resilience.BREAKER_STATE.value(backend="ollama") == 2
+    assert 'llm_breaker_state{backend="ollama"} 2' in resilience.metrics.REGISTRY.render()
+    # Open circuit: Ollama is skipped without a request
+    requests_before = stub._failures["/api/generate"][0]
+    assert ollama_client.get_llm_completion("q") == "openai reply"
+    assert stub._failures["/api/generate"][0] == requests_before
+    assert len(calls) == 3 and calls[0]["request_timeout"]
+
+
+def test_all_backends_down_raises_provider_unavailable(stub):
+    stub.fail("/api/chat", times=100, status=502)
+    session = ollama_client.ChatSession("system")
+    with pytest.raises(ProviderUnavailable):
+        session.send("hello")
+
+
+def test_read_timeout_is_retried(stub, monkeypatch):
+    monkeypatch.setattr(ollama_client, "EMBED_TIMEOUT", 0.2)
+    stub.stall("/api/embed", 1.0, times=1)
+    assert len(ollama_client.get_embedding("text")) == stub.embed_dim
+
+
+def test_slow_embedding_is_hedged(stub, monkeypatch):
+    monkeypatch.setattr(ollama_client, "EMBED_HEDGE_DELAY", 0.05)
+    stub.stall("/api/embed", 1.0, times=1)
+    hedge_wins = resilience.HEDGES.value(operation="embed", winner="hedge")
+    started = time.perf_counter()
+    assert len(ollama_client.get_embedding("text")) == stub.embed_dim
+    assert time.perf_counter() - started < 0.8
+    assert resilience.HEDGES.value(operation="embed", winner="hedge") == hedge_wins + 1
+
+
+def test_rerank_surfaces_outage(monkeypatch):
+    def unavailable(prompt, max_tokens=512):
+        raise ProviderUnavailable("generate unavailable (ollama: circuit open)")
+    weaviate = FakeWeaviateClient()
+    weaviate.collections.get("Section").data.insert({"title": "Sec1", "content": "SOP1 covers the client handover.", "sop": "SOP1", "tags": ""})
+    monkeypatch.setattr("app.api.rag.get_client", lambda: weaviate)
+    monkeypatch.setattr("app.api.rag.get_embedding", lambda x: [0.1] * 384)
+    monkeypatch.setattr("app.api.rag.get_llm_completion", unavailable)
+    response = TestClient(app).post("/rag/query", json={"question": "What is SOP1?"})
+    assert response.status_code == 503
+    assert "circuit open" in response.json()["error"]
@@ -0,0 +1,45 @@
+import sys
+import os
+import time
+import types
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+from app.ollama.ratelimit import TokenBucket
+from app.ingestion import semantic_ingest
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    for _ in range(7):
+        bucket.acquire()
+    # 2 from the burst, the remaining 5 at 50/s
+    assert time.monotonic() - start >= 0.09
+    assert not bucket.try_acquire()
+
+def test_token_bucket_rejects_more_than_capacity():
+    bucket = TokenBucket(rate=50, capacity=2)
+    with pytest.raises(ValueError):
+        bucket.acquire(3)
+    bucket.acquire(2)
+
+def test_summaries_are_cached_by_content(tmp_path, monkeypatch):
+    calls = []
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = {"content": "Short summary."}
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+    fake_openai = types.SimpleNamespace(ChatCompletion=types.SimpleNamespace(create=create), api_key=None)
+    monkeypatch.setattr(semantic_ingest, "openai", fake_openai)
+    monkeypatch.setattr(semantic_ingest, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr("app.ingestion.llm_cache.LLM_CACHE_DIR", str(tmp_path))
+    assert semantic_ingest.generate_summary("Book the meeting room.", "Tour SOP") == "Short summary."
+    assert semantic_ingest.generate_summary("Book the meeting room.", "Tour SOP") == "Short summary."
+    assert len(calls) == 1
+    semantic_ingest.generate_summary("Share the agenda.", "Tour SOP")
+    assert len(calls) == 2
+
+def test_long_documents_are_windowed():
+    text = "\n".join(f"Step {i}: confirm the requirement with the client." for i in range(400))
+    windows = semantic_ingest.split_into_windows(text, window_tokens=300)
+    assert len(windows) > 1
+    assert all(semantic_ingest.count_tokens(w) <= 300 for w in windows)
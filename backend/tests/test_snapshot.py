@@ -0,0 +1,57 @@
+import sys
+import os
+import types
+import uuid
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+import numpy as np
+from app.weaviate_client import snapshot
+
+class FakeBatch:
+    def __init__(self, store):
+        self.store = store
+        self.failed_objects = []
+    def fixed_size(self, batch_size):
+        return self
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def add_object(self, properties, uuid=None, vector=None):
+        self.store.append({"uuid": uuid, "properties": properties, "vector": vector})
+
+class FakeCollection:
+    def __init__(self, objects):
+        self.objects = objects
+        self.inserted = []
+        self.batch = FakeBatch(self.inserted)
+    def iterator(self, include_vector=False, cache_size=None):
+        return iter(self.objects)
+
+class FakeClient:
+    def __init__(self, collection):
+        self.collection = collection
+        self.collections = self
+    def get(self, name):
+        return self.collection
+
+def _objects():
+    return [
+        types.SimpleNamespace(uuid=uuid.uuid4(), vector={}, properties={"title": f"Sec{i}", "content": f"Body {i}", "sop": "SOP1", "embedding": [float(i), 0.5, -1.0]})
+        for i in range(5)
+    ] + [types.SimpleNamespace(uuid=uuid.uuid4(), vector={}, properties={"title": "NoVec", "content": "x", "sop": "SOP1", "embedding": None})]
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "create_schema", lambda client: None)
+    source = FakeCollection(_objects())
+    manifest = snapshot.export_snapshot(str(tmp_path), FakeClient(source), dtype="float16")
+    assert manifest["objects"] == 6 and manifest["vectors"] == 5 and manifest["dim"] == 3
+    vectors = np.load(tmp_path / "vectors.npy", mmap_mode="r")
+    assert vectors.dtype == np.float16 and vectors.shape == (5, 3)
+
+    target = FakeCollection([])
+    assert snapshot.import_snapshot(str(tmp_path), FakeClient(target)) == 0
+    assert [o["uuid"] for o in target.inserted] == [str(o.uuid) for o in source.objects]
+    assert target.inserted[2]["properties"]["embedding"] == [2.0, 0.5, -1.0]
+    assert "embedding" not in target.inserted[5]["properties"]
+    # Objects had no Weaviate-side vectors, so none are set on import
+    assert all(o["vector"] is None for o in target.inserted)
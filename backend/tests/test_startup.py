@@ -0,0 +1,58 @@
+import sys
+import os
+import subprocess
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../benchmarks')))
+from fastapi.testclient import TestClient
+from fake_weaviate import FakeWeaviateClient, seed_sections
+from app import main, startup
+from app.rag import catalog
+from app.startup import Readiness
+
+
+def _wait(readiness, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not readiness.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_ready_after_background_warm_up(monkeypatch):
+    weaviate = FakeWeaviateClient()
+    seed_sections(weaviate, sops=3, sections_per_sop=2, words_per_section=20, embed_dim=8)
+    attempts = []
+
+    def flaky_client():
+        # Weaviate not accepting connections on the first attempt
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("connection refused")
+        return weaviate
+
+    readiness = Readiness()
+    monkeypatch.setattr(startup, "get_client", flaky_client)
+    monkeypatch.setattr(startup, "STARTUP_RETRY_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(catalog, "_catalog", catalog.SopCatalog())
+    monkeypatch.setattr(main, "readiness", readiness)
+    client = TestClient(main.app)
+
+    pending = client.get("/ready")
+    assert pending.status_code == 503 and pending.json()["status"] == "starting"
+    assert client.get("/health").status_code == 200
+
+    readiness.start()
+    _wait(readiness)
+    ready = client.get("/ready")
+    assert ready.status_code == 200
+    body = ready.json()
+    assert body["attempts"] == 2
+    assert {"weaviate", "schema", "catalog"} <= set(body["checks"])
+    assert catalog.get_catalog().loaded
+    readiness.stop()
+
+
+def test_import_does_not_load_optional_dependencies():
+    code = "import sys, app.main; print(','.join(m for m in ('ragas', 'openai') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(os.path.dirname(__file__), '..'),
+                         check=True, capture_output=True, text=True)
+    assert out.stdout.strip() == ""